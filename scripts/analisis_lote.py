@@ -0,0 +1,233 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from lectura_json import iterar_peliculas, en_bloques
+from columnar import es_columnar, bloques_columnar, EXTENSION
+from validacion import validar_columnas
+from estadisticas import AcumuladorEstadisticas
+
+CARPETA_ANALISIS = "analisis_lote"
+TAM_BLOQUE = 50_000
+COLUMNAS = ["title", "release_date", "vote_average"]
+
+
+def resolver_archivos(origen):
+    """Lista ordenada de volcados a analizar: una carpeta, un patrón glob o un solo archivo.
+
+    En una carpeta se toman los .json, .jsonl y las carpetas columnar que contenga.
+    """
+    if os.path.isdir(origen) and not es_columnar(origen):
+        candidatos = [os.path.join(origen, nombre) for nombre in os.listdir(origen)]
+    else:
+        candidatos = glob.glob(origen)
+    return sorted(ruta for ruta in candidatos
+                  if es_columnar(ruta) or (os.path.isfile(ruta) and ruta.endswith((".json", ".jsonl"))))
+
+
+def _bloques(ruta, tam_bloque):
+    if es_columnar(ruta):
+        return bloques_columnar(ruta, COLUMNAS, tam_bloque)
+    return (pd.DataFrame.from_records(bloque, columns=COLUMNAS)
+            for bloque in en_bloques(iterar_peliculas(ruta), tam_bloque))
+
+
+def analizar_archivo(ruta, carpeta_parciales, tam_bloque=TAM_BLOQUE, indice=0):
+    """Valida un volcado por bloques y devuelve su resultado parcial (se ejecuta en otro proceso).
+
+    Las filas válidas y las descartadas se escriben en CSV parciales dentro de
+    `carpeta_parciales`, con nombres que empiezan por `indice` (la posición del archivo en
+    el lote) para que no choquen dos volcados con el mismo nombre en carpetas distintas.
+    No vuelven al proceso principal; lo que regresa es
+    pequeño: conteos, tiempos y el AcumuladorEstadisticas del archivo, que se combina
+    con los de los demás.
+    """
+    inicio = time.perf_counter()
+    nombre = os.path.basename(ruta.rstrip(os.sep))
+    base = os.path.join(carpeta_parciales, f"{indice:05d}-{nombre}")
+    parcial = {"archivo": ruta, "validas": 0, "rechazadas": 0, "validas_csv": base + ".validas.csv",
+               "rechazadas_csv": base + ".rechazadas.csv"}
+    acumulador = AcumuladorEstadisticas()
+    # El encabezado va sólo en el primer bloque que se escribe en cada parcial (aunque venga
+    # vacío): decidirlo por el número de filas lo repetía hasta el primer bloque con filas
+    primero = True
+    try:
+        with open(parcial["validas_csv"], "w", encoding="utf-8", newline="") as validas, \
+                open(parcial["rechazadas_csv"], "w", encoding="utf-8", newline="") as rechazadas:
+            for crudo in _bloques(ruta, tam_bloque):
+                limpio, descartados = validar_columnas(crudo, puntaje_min=0, puntaje_max=10)
+                acumulador.agregar(limpio["vote_average"])
+                limpio["release_date"] = limpio["release_date"].dt.strftime("%Y-%m-%d")
+                limpio.insert(0, "archivo", ruta)
+                descartados.insert(0, "archivo", ruta)
+                limpio.to_csv(validas, header=primero, index=False)
+                descartados.to_csv(rechazadas, header=primero, index=False)
+                primero = False
+                parcial["validas"] += len(limpio)
+                parcial["rechazadas"] += len(descartados)
+    except Exception as e:
+        parcial["error"] = f"{type(e).__name__}: {e}"
+    parcial["acumulador"] = acumulador
+    parcial["segundos"] = time.perf_counter() - inicio
+    return parcial
+
+
+def _unir_csv(rutas, destino):
+    """Concatena CSV con el mismo encabezado copiando bytes (el encabezado sólo una vez)."""
+    escrito = False
+    with open(destino, "wb") as salida:
+        for ruta in rutas:
+            if not os.path.exists(ruta) or not os.path.getsize(ruta):
+                continue
+            with open(ruta, "rb") as entrada:
+                encabezado = entrada.readline()
+                if not escrito:
+                    salida.write(encabezado)
+                    escrito = True
+                shutil.copyfileobj(entrada, salida, 1 << 20)
+
+
+def _celda(valor):
+    # NaN (por ejemplo, la media de un archivo sin filas válidas) no se puede escribir en Excel
+    return None if isinstance(valor, float) and valor != valor else valor
+
+
+def analizar_lote(origen, carpeta=CARPETA_ANALISIS, procesos=None, excel=True, tam_bloque=TAM_BLOQUE):
+    """Analiza en paralelo todos los volcados de `origen` y consolida los resultados en `carpeta`.
+
+    Cada archivo se procesa en un proceso del pool; sus estadísticas parciales se unen con
+    AcumuladorEstadisticas.combinar (el resultado es el mismo que analizar todo junto).
+    Escribe peliculas.csv, rechazadas.csv, resumen.json y, con `excel`, analisis.xlsx
+    con los datos, las estadísticas consolidadas y una hoja por archivo con sus tiempos.
+    """
+    archivos = resolver_archivos(origen)
+    if not archivos:
+        raise FileNotFoundError(f"No hay volcados JSON, JSON Lines ni columnar en {origen!r}")
+    procesos = min(procesos or os.cpu_count() or 1, len(archivos))
+    parciales_dir = os.path.join(carpeta, "parciales")
+    os.makedirs(parciales_dir, exist_ok=True)
+
+    inicio = time.perf_counter()
+    if procesos == 1:
+        parciales = [analizar_archivo(ruta, parciales_dir, tam_bloque, i) for i, ruta in enumerate(archivos)]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            # map conserva el orden de los archivos: el consolidado no depende de quién termina antes
+            parciales = list(ejecutor.map(analizar_archivo, archivos, [parciales_dir] * len(archivos),
+                                          [tam_bloque] * len(archivos), range(len(archivos))))
+    segundos_analisis = time.perf_counter() - inicio
+
+    marca = time.perf_counter()
+    total = AcumuladorEstadisticas()
+    for parcial in parciales:
+        total.combinar(parcial["acumulador"])
+    ruta_csv = os.path.join(carpeta, "peliculas.csv")
+    _unir_csv([p["validas_csv"] for p in parciales], ruta_csv)
+    _unir_csv([p["rechazadas_csv"] for p in parciales], os.path.join(carpeta, "rechazadas.csv"))
+    shutil.rmtree(parciales_dir, ignore_errors=True)
+
+    estadisticas = total.resultado()
+    por_archivo = []
+    for parcial in parciales:
+        fila = {"archivo": parcial["archivo"], "validas": parcial["validas"], "rechazadas": parcial["rechazadas"],
+                "segundos": parcial["segundos"], **parcial["acumulador"].resultado()}
+        if "error" in parcial:
+            fila["error"] = parcial["error"]
+        por_archivo.append(fila)
+
+    if excel:
+        from excel_streaming import exportar_excel_streaming
+
+        columnas = list(por_archivo[0]) + (["error"] if any("error" in fila for fila in por_archivo) else [])
+        hojas = {
+            "Estadísticas": [list(estadisticas), [_celda(v) for v in estadisticas.values()]],
+            "Archivos": [columnas] + [[_celda(fila.get(c)) for c in columnas] for fila in por_archivo],
+        }
+        bloques = pd.read_csv(ruta_csv, chunksize=tam_bloque) if os.path.getsize(ruta_csv) else iter(())
+        exportar_excel_streaming(os.path.join(carpeta, "analisis.xlsx"), bloques, "Películas", hojas)
+    segundos_consolidacion = time.perf_counter() - marca
+
+    resumen = {
+        "archivos": len(archivos),
+        "procesos": procesos,
+        "validas": total.conteo,
+        "rechazadas": sum(p["rechazadas"] for p in parciales),
+        "segundos_analisis": segundos_analisis,
+        "segundos_consolidacion": segundos_consolidacion,
+        "estadisticas": estadisticas,
+        "por_archivo": por_archivo,
+    }
+    with open(os.path.join(carpeta, "resumen.json"), "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=4, default=str)
+    return resumen
+
+
+def imprimir_resumen(resumen):
+    e = resumen["estadisticas"]
+    print(f"\n=== Análisis de {resumen['archivos']} archivos con {resumen['procesos']} procesos: "
+          f"{resumen['segundos_analisis']:.2f}s + {resumen['segundos_consolidacion']:.2f}s de consolidación ===")
+    print(f"Películas válidas: {resumen['validas']}, descartadas: {resumen['rechazadas']}")
+    if e["conteo"]:
+        print(f"Media: {e['media']:.2f}, mediana: {e['mediana']:.2f}, moda: {e['moda']}, "
+              f"desviación: {e['desviacion']:.2f}")
+    for fila in resumen["por_archivo"]:
+        estado = f"ERROR {fila['error']}" if "error" in fila else f"{fila['validas']} válidas, {fila['rechazadas']} descartadas"
+        print(f"- {fila['archivo']}: {estado}, {fila['segundos']:.2f}s")
+
+
+def benchmark(archivos=8, peliculas_por_archivo=50_000, carpeta="benchmark_analisis_lote"):
+    """Mide el análisis de `archivos` volcados sintéticos con 1 proceso y con todos los núcleos."""
+    from servidor_tmdb_local import generar_peliculas
+
+    volcados = os.path.join(carpeta, "volcados")
+    os.makedirs(volcados, exist_ok=True)
+    for i in range(archivos):
+        ruta = os.path.join(volcados, f"peliculas_{i:03d}.json")
+        if not os.path.exists(ruta):
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(generar_peliculas(peliculas_por_archivo, semilla=i), f, ensure_ascii=False)
+
+    nucleos = os.cpu_count() or 1
+    tiempos = {}
+    for procesos in sorted({1, nucleos}):
+        resumen = analizar_lote(volcados, os.path.join(carpeta, f"salida_{procesos}"), procesos=procesos, excel=False)
+        tiempos[procesos] = resumen["segundos_analisis"]
+        print(f"{procesos} proceso(s): {resumen['validas']} películas de {archivos} archivos en "
+              f"{resumen['segundos_analisis']:.2f}s (+{resumen['segundos_consolidacion']:.2f}s al consolidar)")
+        estadisticas = resumen["estadisticas"]
+
+    # Las estadísticas combinadas deben coincidir con las de todas las películas juntas
+    todo = pd.read_csv(os.path.join(carpeta, f"salida_{nucleos}", "peliculas.csv"))
+    directo = AcumuladorEstadisticas().agregar(todo["vote_average"]).resultado()
+    assert directo["conteo"] == estadisticas["conteo"] and directo["mediana"] == estadisticas["mediana"]
+    assert abs(directo["media"] - estadisticas["media"]) < 1e-9
+    if nucleos > 1:
+        print(f"Aceleración con {nucleos} núcleos: {tiempos[1] / tiempos[nucleos]:.1f}x")
+    return tiempos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analiza en paralelo una carpeta (o patrón glob) de volcados de películas.")
+    parser.add_argument("origen", nargs="?", help=f"carpeta, patrón glob (entre comillas) o archivo; "
+                                                  f"acepta .json, .jsonl y {EXTENSION}")
+    parser.add_argument("--salida", default=CARPETA_ANALISIS, help="carpeta de resultados")
+    parser.add_argument("--procesos", type=int, help="procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--sin-excel", action="store_true", help="escribir sólo el CSV y el resumen")
+    parser.add_argument("--benchmark", action="store_true", help="medir con volcados sintéticos")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+    elif args.origen is None:
+        parser.error("falta el origen (o --benchmark)")
+    else:
+        try:
+            imprimir_resumen(analizar_lote(args.origen, args.salida, args.procesos, excel=not args.sin_excel))
+        except FileNotFoundError as e:
+            sys.exit(str(e))
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos de los scripts interactivos que deben quedar listos para mostrar el menú
+MODULOS = ["codigo-final", "script2(mejorado)", "main"]
+
+# Librerías que sólo hacen falta al graficar o exportar: no deben cargarse al arrancar
+PESADAS = ["pandas", "numpy", "matplotlib", "openpyxl"]
+
+# Segundos extra (sobre un intérprete vacío) que se permiten hasta poder mostrar el menú
+PRESUPUESTO = 0.5
+
+# Se mide en un proceso nuevo para que nada quede cargado de una medición anterior
+_MEDIR = """
+import sys, time, json, importlib
+sys.argv = [sys.argv[0]]
+inicio = time.perf_counter()
+importlib.import_module({modulo!r})
+segundos = time.perf_counter() - inicio
+print(json.dumps({{"segundos": segundos, "cargadas": [m for m in {pesadas!r} if m in sys.modules]}}))
+"""
+
+
+def medir(modulo, repeticiones=5):
+    """Arranca un intérprete nuevo por repetición e importa el módulo; devuelve la mediana y qué librerías pesadas cargó."""
+    tiempos = []
+    cargadas = set()
+    for _ in range(repeticiones):
+        codigo = _MEDIR.format(modulo=modulo, pesadas=PESADAS)
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=CARPETA, capture_output=True,
+                                text=True, check=True).stdout
+        datos = json.loads(salida.strip().splitlines()[-1])
+        tiempos.append(datos["segundos"])
+        cargadas.update(datos["cargadas"])
+    return statistics.median(tiempos), sorted(cargadas)
+
+
+def medir_total(repeticiones=5):
+    """Tiempo de pared de `python -c pass` contra el de importar cada módulo, para comparar."""
+    def pared(codigo):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            subprocess.run([sys.executable, "-c", codigo], cwd=CARPETA, check=True)
+            tiempos.append(time.perf_counter() - inicio)
+        return statistics.median(tiempos)
+
+    resultado = {"interprete": pared("pass")}
+    for modulo in MODULOS:
+        resultado[modulo] = pared(f"import importlib; importlib.import_module({modulo!r})")
+    return resultado
+
+
+def benchmark(presupuesto=PRESUPUESTO, repeticiones=5, salida=None):
+    """Mide el arranque de cada script y falla si se pasa del presupuesto o carga librerías pesadas."""
+    resultados = []
+    fallas = []
+    paredes = medir_total(repeticiones)
+    print(f"Intérprete vacío: {paredes['interprete']:.3f}s")
+    for modulo in MODULOS:
+        segundos, cargadas = medir(modulo, repeticiones)
+        print(f"- {modulo}: import {segundos:.3f}s, proceso completo {paredes[modulo]:.3f}s"
+              + (f", cargó {', '.join(cargadas)}" if cargadas else ""))
+        resultados.append({"modulo": modulo, "import": segundos, "proceso": paredes[modulo], "pesadas": cargadas})
+        if segundos > presupuesto:
+            fallas.append(f"{modulo} tarda {segundos:.3f}s en importarse (presupuesto {presupuesto:.3f}s)")
+        if cargadas:
+            fallas.append(f"{modulo} carga al arrancar: {', '.join(cargadas)}")
+
+    if salida:
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump({"presupuesto": presupuesto, "interprete": paredes["interprete"], "modulos": resultados},
+                      f, ensure_ascii=False, indent=4)
+
+    for falla in fallas:
+        print(f"FALLA: {falla}")
+    return not fallas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de los scripts hasta el menú.")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO,
+                        help="segundos máximos de import por script (por defecto %(default)s)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="guarda los resultados en este archivo JSON")
+    args = parser.parse_args()
+    sys.exit(0 if benchmark(args.presupuesto, args.repeticiones, args.salida) else 1)
@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from servidor_tmdb_local import ServidorTMDbLocal, generar_peliculas, GENEROS_TMDB
+from validacion import validar_columnas
+from estadisticas import AcumuladorEstadisticas
+from graficas import renderizar_graficas
+
+# "codigo-final" lleva guion, así que se importa con importlib
+codigo_final = importlib.import_module("codigo-final")
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+CARPETA_RESULTADOS = os.path.join(CARPETA, "..", "benchmark_resultados")
+
+# Tamaños del catálogo sintético con los que se mide cada etapa
+ESCALAS = (1_000, 10_000, 100_000)
+
+# Las gráficas muestran el top pedido, no el catálogo entero, así que tienen sus propias escalas
+# (desde unos cientos de películas se dibujan las vistas agregadas: el tiempo no debe crecer)
+ESCALAS_GRAFICAS = (10, 100, 500, 5_000)
+
+# Un resultado es regresión si tarda más que esto veces el de la referencia
+# (y al menos DIFERENCIA_MINIMA segundos más, para no marcar ruido en etapas de milisegundos)
+UMBRAL_REGRESION = 1.25
+DIFERENCIA_MINIMA = 0.02
+
+
+def _medir(funcion, repeticiones):
+    """Ejecuta `funcion` varias veces; devuelve la mediana de los segundos y el último resultado."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def medir_descarga(peliculas, repeticiones, latencia, prob_429, top_n=20, por_genero=False):
+    """TMDbAPI.obtener_peliculas contra el servidor local, con todos los géneros.
+
+    Con `por_genero` se hace una consulta por género (sin juntarlos en una), que es lo
+    que más páginas pide y más ejercita la concurrencia.
+    """
+    with ServidorTMDbLocal(peliculas, latencia=latencia, prob_429=prob_429, retry_after=0) as servidor:
+        # Sin caché ni catálogo (siempre se va a la red) y sin el límite de 4 peticiones por segundo
+        api = codigo_final.TMDbAPI(codigo_final.API_KEY, cache=False, catalogo=False, tasa=10_000, rafaga=10_000,
+                                   max_generos_por_consulta=1 if por_genero else None, base_url=servidor.url)
+        generos = [g["id"] for g in GENEROS_TMDB]
+        segundos, resultado = _medir(
+            lambda: api.obtener_peliculas(generos, "1990-01-01", "2020-12-31", top_n, concurrente=True),
+            repeticiones)
+        resumen = api.http.resumen()
+        api.http.cerrar()
+        return segundos, {
+            "peliculas": len(resultado),
+            "peticiones": servidor.peticiones // repeticiones,
+            "respuestas_429": servidor.respuestas_429,
+            "reintentos": resumen["reintentos"],
+        }
+
+
+def medir_validacion(peliculas, repeticiones):
+    """Validación por columnas más las estadísticas de una sola pasada."""
+    crudo = pd.DataFrame.from_records(peliculas, columns=["title", "release_date", "vote_average"])
+
+    def etapa():
+        limpio, rechazados = validar_columnas(crudo, puntaje_min=0, puntaje_max=10)
+        return limpio, AcumuladorEstadisticas().agregar(limpio["vote_average"]).resultado()
+
+    segundos, (limpio, _) = _medir(etapa, repeticiones)
+    return segundos, {"validas": len(limpio)}
+
+
+def medir_graficas(peliculas, repeticiones):
+    """Las cuatro gráficas del Excel, dibujadas con todas las películas recibidas."""
+    df = pd.DataFrame(peliculas)[['title', 'vote_average', 'release_date']]
+    segundos, (imagenes, tiempos) = _medir(lambda: renderizar_graficas(df), repeticiones)
+    return segundos, {"por_grafica": tiempos}, imagenes
+
+
+def medir_excel(peliculas, imagenes, repeticiones):
+    """guardar_en_excel con las hojas de datos, métricas y gráficas."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "peliculas_analisis.xlsx")
+        segundos, _ = _medir(lambda: codigo_final.guardar_en_excel(peliculas, imagenes, ruta=ruta), repeticiones)
+        return segundos, {"bytes": os.path.getsize(ruta)}
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CARPETA, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(escalas=ESCALAS, escalas_graficas=ESCALAS_GRAFICAS, repeticiones=3, latencia=0.005, prob_429=0.0):
+    """Mide cada etapa a cada escala y devuelve los resultados listos para guardar como JSON."""
+    catalogo = generar_peliculas(max(max(escalas), max(escalas_graficas)))
+    resultados = []
+
+    def registrar(etapa, escala, segundos, detalle):
+        print(f"- {etapa:<24} {escala:>8} películas: {segundos:8.3f}s")
+        resultados.append({"etapa": etapa, "escala": escala, "segundos": segundos, **detalle})
+
+    imagenes = None
+    for escala in escalas_graficas:
+        segundos, detalle, imagenes = medir_graficas(catalogo[:escala], repeticiones)
+        registrar("graficas", escala, segundos, detalle)
+
+    for escala in escalas:
+        peliculas = catalogo[:escala]
+        registrar("descarga", escala, *medir_descarga(peliculas, repeticiones, latencia, prob_429))
+        registrar("descarga_por_genero", escala,
+                  *medir_descarga(peliculas, repeticiones, latencia, prob_429, por_genero=True))
+        registrar("validacion_estadisticas", escala, *medir_validacion(peliculas, repeticiones))
+        registrar("excel", escala, *medir_excel(peliculas, imagenes, repeticiones))
+
+    return {
+        "commit": _commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "parametros": {"repeticiones": repeticiones, "latencia": latencia, "prob_429": prob_429},
+        "resultados": resultados,
+    }
+
+
+def comparar(actual, referencia, umbral=UMBRAL_REGRESION):
+    """Compara dos corridas etapa por etapa; devuelve la lista de regresiones encontradas."""
+    anteriores = {(r["etapa"], r["escala"]): r["segundos"] for r in referencia["resultados"]}
+    regresiones = []
+    print(f"\nComparación contra {referencia.get('commit')} ({referencia.get('fecha')}):")
+    for r in actual["resultados"]:
+        antes = anteriores.get((r["etapa"], r["escala"]))
+        if not antes:
+            continue
+        razon = r["segundos"] / antes
+        es_regresion = razon > umbral and r["segundos"] - antes > DIFERENCIA_MINIMA
+        marca = "  <-- regresión" if es_regresion else ""
+        print(f"- {r['etapa']:<24} {r['escala']:>8}: {antes:.3f}s -> {r['segundos']:.3f}s ({razon:.2f}x){marca}")
+        if es_regresion:
+            regresiones.append((r["etapa"], r["escala"], razon))
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta contra un servidor TMDb local.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS))
+    parser.add_argument("--escalas-graficas", type=int, nargs="+", default=list(ESCALAS_GRAFICAS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.005, help="segundos por respuesta del servidor")
+    parser.add_argument("--prob-429", type=float, default=0.0, help="probabilidad de que el servidor responda 429")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto benchmark_resultados/<fecha>_<commit>.json)")
+    parser.add_argument("--comparar", metavar="JSON", help="resultados de otra corrida para detectar regresiones")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION)
+    args = parser.parse_args()
+
+    corrida = ejecutar(args.escalas, args.escalas_graficas, args.repeticiones, args.latencia, args.prob_429)
+
+    salida = args.salida
+    if salida is None:
+        os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+        marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+        salida = os.path.join(CARPETA_RESULTADOS, f"{marca}_{corrida['commit'] or 'sin-commit'}.json")
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(corrida, f, ensure_ascii=False, indent=4)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(corrida, json.load(f), args.umbral)
+        sys.exit(1 if regresiones else 0)
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache_tmdb.sqlite")
+
+# Los géneros casi nunca cambian; los resultados de /discover sí (votos nuevos cada día)
+TTL_POR_ENDPOINT = {
+    "/genre/movie/list": 7 * 24 * 3600,
+    "/discover/movie": 3600,
+}
+TTL_POR_DEFECTO = 24 * 3600
+
+# Parámetros que no cambian la respuesta y no deben formar parte de la clave
+PARAMETROS_IGNORADOS = {"api_key"}
+
+
+class SinCacheError(LookupError):
+    """Se pidió en modo offline una respuesta que no está en la caché."""
+
+
+def normalizar_clave(url, params=None):
+    """Clave estable para una petición: endpoint + parámetros ordenados, sin la API key."""
+    partes = urlsplit(url)
+    consulta = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k not in PARAMETROS_IGNORADOS]
+    consulta += [(k, str(v)) for k, v in (params or {}).items() if k not in PARAMETROS_IGNORADOS]
+    return f"{partes.path}?{urlencode(sorted(consulta))}"
+
+
+class CacheRespuestas:
+    """Caché en disco (SQLite) de respuestas JSON de TMDb, con TTL por endpoint y desalojo por tamaño."""
+
+    def __init__(self, ruta=RUTA_CACHE, ttl=None, max_bytes=50 * 1024 * 1024, offline=False):
+        self.ruta = ruta
+        self.ttl = dict(TTL_POR_ENDPOINT, **(ttl or {}))
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY, cuerpo TEXT NOT NULL, tamano INTEGER NOT NULL,"
+            " guardado REAL NOT NULL, usado REAL NOT NULL)"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_usado ON respuestas(usado)")
+        self._conexion.commit()
+
+    def ttl_para(self, clave):
+        endpoint = clave.split("?", 1)[0]
+        for sufijo, ttl in self.ttl.items():
+            if endpoint.endswith(sufijo):
+                return ttl
+        return TTL_POR_DEFECTO
+
+    def obtener(self, clave):
+        """Devuelve la respuesta guardada o None. En modo offline se ignora el TTL."""
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT cuerpo, guardado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                self.fallos += 1
+                return None
+            cuerpo, guardado = fila
+            if not self.offline and ahora - guardado > self.ttl_para(clave):
+                self.expirados += 1
+                self.fallos += 1
+                return None
+            self._conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+            self.aciertos += 1
+        return json.loads(cuerpo)
+
+    def guardar(self, clave, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False)
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, cuerpo, tamano, guardado, usado) VALUES (?, ?, ?, ?, ?)",
+                (clave, cuerpo, len(cuerpo.encode("utf-8")), ahora, ahora),
+            )
+            self._desalojar()
+            self._conexion.commit()
+
+    def _desalojar(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar por debajo de max_bytes."""
+        total = self._conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        filas = self._conexion.execute("SELECT clave, tamano FROM respuestas ORDER BY usado").fetchall()
+        borrar = []
+        for clave, tamano in filas:
+            if total <= self.max_bytes:
+                break
+            borrar.append((clave,))
+            total -= tamano
+        self._conexion.executemany("DELETE FROM respuestas WHERE clave = ?", borrar)
+
+    def obtener_o_pedir(self, url, pedir):
+        """Sirve `url` desde la caché o llama a `pedir()` y guarda el resultado."""
+        clave = normalizar_clave(url)
+        datos = self.obtener(clave)
+        if datos is not None:
+            return datos
+        if self.offline:
+            raise SinCacheError(f"Modo offline: no hay respuesta en caché para {clave}")
+        datos = pedir()
+        self.guardar(clave, datos)
+        return datos
+
+    def resumen(self):
+        with self._lock:
+            entradas, tamano = self._conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM respuestas"
+            ).fetchone()
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "expirados": self.expirados,
+            "entradas": entradas,
+            "bytes": tamano,
+        }
+
+    def imprimir_resumen(self):
+        r = self.resumen()
+        print(f"Caché: {r['aciertos']} aciertos, {r['fallos']} fallos, {r['entradas']} entradas ({r['bytes'] / 1024:.0f} KB)")
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
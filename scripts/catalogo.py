@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+RUTA_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "catalogo_peliculas.sqlite")
+
+
+class CatalogoPeliculas:
+    """Catálogo local de películas (SQLite) que se va llenando con cada descarga de TMDb.
+
+    Guarda cada película por `id` con índices sobre fecha, puntuación, número de votos y
+    cada uno de sus géneros, para responder localmente las mismas consultas que /discover.
+    """
+
+    def __init__(self, ruta=RUTA_CATALOGO):
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS peliculas (
+                id INTEGER PRIMARY KEY,
+                title TEXT,
+                release_date TEXT,
+                vote_average REAL,
+                vote_count INTEGER,
+                datos TEXT NOT NULL,
+                actualizado REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pelicula_generos (
+                id INTEGER NOT NULL,
+                genre_id INTEGER NOT NULL,
+                PRIMARY KEY (id, genre_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_peliculas_fecha ON peliculas(release_date);
+            CREATE INDEX IF NOT EXISTS idx_peliculas_puntuacion ON peliculas(vote_average);
+            CREATE INDEX IF NOT EXISTS idx_peliculas_votos ON peliculas(vote_count);
+            CREATE INDEX IF NOT EXISTS idx_generos_genero ON pelicula_generos(genre_id, id);
+            """
+        )
+        self._conexion.commit()
+
+    def guardar(self, peliculas):
+        """Inserta o actualiza (upsert) las películas recibidas; la descarga más reciente gana."""
+        peliculas = [p for p in peliculas if "id" in p]
+        if not peliculas:
+            return 0
+        ahora = time.time()
+        filas = [
+            (p["id"], p.get("title"), p.get("release_date"), p.get("vote_average"), p.get("vote_count"),
+             json.dumps(p, ensure_ascii=False), ahora)
+            for p in peliculas
+        ]
+        generos = [(p["id"], g) for p in peliculas for g in p.get("genre_ids", [])]
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT INTO peliculas (id, title, release_date, vote_average, vote_count, datos, actualizado)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET title = excluded.title, release_date = excluded.release_date,"
+                " vote_average = excluded.vote_average, vote_count = excluded.vote_count,"
+                " datos = excluded.datos, actualizado = excluded.actualizado",
+                filas,
+            )
+            self._conexion.executemany("DELETE FROM pelicula_generos WHERE id = ?", [(p["id"],) for p in peliculas])
+            self._conexion.executemany("INSERT OR IGNORE INTO pelicula_generos (id, genre_id) VALUES (?, ?)", generos)
+            self._conexion.commit()
+        return len(filas)
+
+    def consultar(self, generos=None, desde=None, hasta=None, top_n=10, mejor=True, modo="union", votos_minimos=100):
+        """Mejores o peores películas del catálogo para unos géneros y un rango de fechas.
+
+        `generos=None` no filtra por género. En modo "union" basta con uno de los géneros;
+        en modo "interseccion" la película debe tenerlos todos.
+        """
+        condiciones, parametros = ["vote_count >= ?"], [votos_minimos]
+        if desde:
+            condiciones.append("release_date >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("release_date <= ?")
+            parametros.append(hasta)
+        if generos is not None:
+            ids = sorted({int(g) for g in generos})
+            if not ids:
+                return []
+            marcas = ", ".join("?" * len(ids))
+            subconsulta = f"SELECT id FROM pelicula_generos WHERE genre_id IN ({marcas})"
+            if modo == "interseccion":
+                subconsulta += f" GROUP BY id HAVING COUNT(*) = {len(ids)}"
+            condiciones.append(f"id IN ({subconsulta})")
+            parametros.extend(ids)
+
+        direccion = "DESC" if mejor else "ASC"
+        sql = (
+            f"SELECT datos FROM peliculas WHERE {' AND '.join(condiciones)}"
+            f" ORDER BY vote_average {direccion}, id LIMIT ?"
+        )
+        with self._lock:
+            filas = self._conexion.execute(sql, parametros + [top_n]).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    def todas(self):
+        """Todas las películas del catálogo con los campos del análisis y sus `genre_ids`."""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT p.id, p.title, p.release_date, p.vote_average, p.vote_count, GROUP_CONCAT(g.genre_id)"
+                " FROM peliculas p LEFT JOIN pelicula_generos g ON g.id = p.id GROUP BY p.id"
+            ).fetchall()
+        return [{"id": id_, "title": titulo, "release_date": fecha, "vote_average": puntuacion, "vote_count": votos,
+                 "genre_ids": [int(g) for g in generos.split(",")] if generos else []}
+                for id_, titulo, fecha, puntuacion, votos, generos in filas]
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM peliculas").fetchone()[0]
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -1,13 +1,16 @@
 import re
-import requests
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-import statistics
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as ExcelImage
-from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from sesion_http import SesionHTTP, LimitadorTasa
+from paginacion import paginar, TopN
+from cache_respuestas import CacheRespuestas, SinCacheError
+from planificador import planificar_consultas
+from catalogo import CatalogoPeliculas
+from pelicula import proyectar, a_dicts
+from detalles import Enriquecedor, SUBRECURSOS
+from instrumentacion import medir, etapa, registrar
+from incremental import huella, fuentes
 
 API_KEY = "8672905b631a8a0b3a41a62affffec7f"
 RE_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
@@ -19,34 +22,106 @@ diccionario_curioso = {
 }
 
 class TMDbAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, pool=10, timeout=(3.05, 10), reintentos=3, max_concurrencia=8, tasa=4.0, rafaga=40,
+                 cache=True, offline=False, max_generos_por_consulta=None, catalogo=True,
+                 base_url="https://api.themoviedb.org/3", completo=False):
         self.api_key = api_key
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = base_url
+        # completo=True conserva el dict entero de TMDb (overview, posters...) en lugar del registro compacto
+        self.completo = completo
+        self.max_concurrencia = max_concurrencia
+        self.max_generos_por_consulta = max_generos_por_consulta
+        self.consultas_ahorradas = 0
+        self.http = SesionHTTP(pool=pool, timeout=timeout, reintentos=reintentos,
+                               limitador=LimitadorTasa(tasa=tasa, capacidad=rafaga))
+        if cache is True:
+            cache = CacheRespuestas(offline=offline)
+        self.cache = cache or None
+        if catalogo is True:
+            catalogo = CatalogoPeliculas()
+        self.catalogo = catalogo if catalogo is not False else None
+        # Detalles por id compartidos por todas las consultas de la ejecución
+        self.detalles = Enriquecedor(self.detalle_pelicula, max_concurrencia)
 
+    def _get_json(self, url):
+        if self.cache is None:
+            return self.http.get(url).json()
+        return self.cache.obtener_o_pedir(url, lambda: self.http.get(url).json())
+
+    @medir("generos")
     def obtener_generos(self):
         url = f"{self.base_url}/genre/movie/list?api_key={self.api_key}&language=es"
-        return requests.get(url).json()["genres"]
+        return self._get_json(url)["genres"]
 
-    def buscar_peliculas(self, genero, desde, hasta):
+    def pagina_discover(self, genero, desde, hasta, pagina=1, orden="desc"):
         url = (
             f"{self.base_url}/discover/movie?api_key={self.api_key}&language=es"
-            f"&sort_by=vote_average.desc&vote_count.gte=100"
-            f"&with_genres={genero}&primary_release_date.gte={desde}&primary_release_date.lte={hasta}&page=1"
+            f"&sort_by=vote_average.{orden}&vote_count.gte=100"
+            f"&with_genres={genero}&primary_release_date.gte={desde}&primary_release_date.lte={hasta}&page={pagina}"
+        )
+        datos = self._get_json(url)
+        # Todo lo descargado alimenta el catálogo local
+        if self.catalogo is not None:
+            self.catalogo.guardar(datos.get("results", []))
+        return datos
+
+    def detalle_pelicula(self, id_pelicula):
+        # Una sola petición trae la película, sus créditos y sus palabras clave
+        url = (
+            f"{self.base_url}/movie/{id_pelicula}?api_key={self.api_key}&language=es"
+            f"&append_to_response={','.join(SUBRECURSOS)}"
         )
-        return requests.get(url).json()["results"]
-
-    def obtener_peliculas(self, generos, desde, hasta, top_n):
-        peliculas_totales = []
-        for genero in generos:
-            peliculas_totales.extend(self.buscar_peliculas(genero, desde, hasta))
-        peliculas_totales = sorted(
-            {p['id']: p for p in peliculas_totales}.values(),
-            key=lambda x: x['vote_average'], reverse=True
-        )[:top_n]
-        return peliculas_totales
-
-def obtener_datos_peliculas():
-    api = TMDbAPI(API_KEY)
+        try:
+            return self._get_json(url)
+        except SinCacheError:
+            return None
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    @medir("detalles")
+    def enriquecer(self, peliculas):
+        """Añade duración, presupuesto, recaudación, director, reparto y palabras clave a las películas."""
+        return self.detalles.enriquecer(peliculas)
+
+    def buscar_peliculas(self, genero, desde, hasta, top_n=20, mejor=True):
+        # Recorre las páginas sólo hasta que el top del género ya no puede cambiar
+        orden = "desc" if mejor else "asc"
+        paginas = paginar(lambda pagina: self.pagina_discover(genero, desde, hasta, pagina, orden))
+        if not self.completo:
+            # Cada página se reduce a registros compactos en cuanto se parsea
+            paginas = map(proyectar, paginas)
+        return TopN(top_n, mejor=mejor).consumir(paginas).resultado()
+
+    def buscar_por_generos(self, generos, desde, hasta, top_n=20, concurrente=False, mejor=True):
+        # map() conserva el orden de los géneros, así el resultado es igual al modo en serie
+        if not concurrente or len(generos) < 2:
+            return [self.buscar_peliculas(genero, desde, hasta, top_n, mejor) for genero in generos]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrencia, len(generos))) as ejecutor:
+            return list(ejecutor.map(lambda genero: self.buscar_peliculas(genero, desde, hasta, top_n, mejor), generos))
+
+    def planificar(self, generos, modo="union"):
+        # Una consulta con with_genres=28|12|... en lugar de una por género
+        consultas = planificar_consultas(generos, modo, self.max_generos_por_consulta)
+        self.consultas_ahorradas += len(generos) - len(consultas)
+        return consultas
+
+    @medir("descarga")
+    def obtener_peliculas(self, generos, desde, hasta, top_n, concurrente=False, modo="union", local=False, mejor=True):
+        if local:
+            if self.catalogo is None:
+                raise ValueError("catálogo local deshabilitado (TMDbAPI se creó con catalogo=False)")
+            peliculas = self.catalogo.consultar(generos, desde, hasta, top_n, mejor=mejor, modo=modo)
+            return peliculas if self.completo else a_dicts(proyectar(peliculas))
+        consultas = self.planificar(generos, modo)
+        parciales = self.buscar_por_generos(consultas, desde, hasta, top_n, concurrente, mejor)
+        with etapa("descarga.combinar_top"):
+            # Sólo el top final vuelve a ser dict, para DataFrames, JSON y Excel
+            return a_dicts(TopN.combinar(parciales, top_n, mejor=mejor))
+
+def elegir_consulta(api):
+    """Pregunta los géneros y el rango de fechas; devuelve (generos, fecha_inicio, fecha_fin)."""
     generos_disponibles = api.obtener_generos()
 
     print("\nGÉNEROS DISPONIBLES:")
@@ -84,6 +159,20 @@ def obtener_datos_peliculas():
         fecha_fin = input("Fecha de fin (YYYY-MM-DD): ")
         if RE_FECHA.match(fecha_fin): break
 
+    return generos_seleccionados, fecha_inicio, fecha_fin
+
+def imprimir_resumen_api(api):
+    api.http.imprimir_resumen()
+    api.detalles.imprimir_resumen()
+    if api.consultas_ahorradas:
+        print(f"Planificador: {api.consultas_ahorradas} consultas a /discover ahorradas")
+    if api.cache is not None:
+        api.cache.imprimir_resumen()
+
+def obtener_datos_peliculas(offline=False, detalles=False):
+    api = TMDbAPI(API_KEY, offline=offline)
+    generos_seleccionados, fecha_inicio, fecha_fin = elegir_consulta(api)
+
     while True:
         try:
             top_n = int(input("¿Cuántas películas deseas mostrar? "))
@@ -91,51 +180,113 @@ def obtener_datos_peliculas():
         except ValueError:
             continue
 
-    peliculas = api.obtener_peliculas(generos_seleccionados, fecha_inicio, fecha_fin, top_n)
+    peliculas = api.obtener_peliculas(generos_seleccionados, fecha_inicio, fecha_fin, top_n, concurrente=True)
+    # Los detalles cuestan una petición por película: sólo se piden si se solicitan
+    if detalles:
+        peliculas = api.enriquecer(peliculas)
+    imprimir_resumen_api(api)
     return peliculas
 
-def generar_graficas(peliculas):
-    df = pd.DataFrame(peliculas)[['title', 'vote_average', 'release_date']]
-
-    plt.figure()
-    df.sort_values('vote_average').plot.barh(x='title', y='vote_average', legend=False, color='skyblue')
-    plt.title("Gráfico de Barras - Puntuaciones")
-    plt.xlabel("Puntuación")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("grafico_barras.png")
-    plt.close()
-
-    plt.figure()
-    plt.plot(df['title'], df['vote_average'], marker='o', color='orange')
-    plt.xticks(rotation=90)
-    plt.title("Gráfico de Líneas - Puntuaciones")
-    plt.ylabel("Puntuación")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("grafico_lineas.png")
-    plt.close()
-
-    plt.figure()
-    plt.scatter(range(len(df)), df['vote_average'], c='red')
-    plt.title("Diagrama de Dispersión")
-    plt.xlabel("Película (índice)")
-    plt.ylabel("Puntuación")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("grafico_dispersion.png")
-    plt.close()
-
-    plt.figure()
-    top5 = df.nlargest(5, 'vote_average')
-    plt.pie(top5['vote_average'], labels=top5['title'], autopct='%1.1f%%')
-    plt.title("Top 5 Puntuaciones - Gráfico de Pastel")
-    plt.tight_layout()
-    plt.savefig("grafico_pastel.png")
-    plt.close()
-
-def guardar_en_excel(peliculas):
-    df = pd.DataFrame(peliculas)[['title', 'vote_average', 'release_date']]
+# pandas, matplotlib, numpy y openpyxl se importan dentro de las funciones que los usan:
+# así el menú aparece sin esperar a cargarlos (ver benchmark_arranque.py)
+@medir("graficas")
+def generar_graficas(peliculas, procesos=None, guardar_png=True, incremental=None):
+    from graficas import GRAFICAS, AGREGADAS, renderizar_graficas, datos_de_grafica, anios_de_fechas
+
+    # Con `incremental` cada gráfica es una etapa: sólo se redibujan las que cambian
+    # (sus datos, sus funciones de dibujo o el resto de graficas.py, donde están _figura
+    # y el estilo común); las demás salen de .etapas sin cargar matplotlib
+    guardadas, claves = {}, {}
+    if incremental is not None:
+        codigo = fuentes("graficas")
+        titulos = [p['title'] for p in peliculas]
+        puntuaciones = [p['vote_average'] for p in peliculas]
+        anios = anios_de_fechas([p.get('release_date') for p in peliculas])
+        for nombre in GRAFICAS:
+            datos = datos_de_grafica(nombre, titulos, puntuaciones, anios)
+            claves[nombre] = huella(datos, GRAFICAS[nombre], AGREGADAS[nombre], guardar_png, codigo)
+            png = incremental.buscar(f"grafica:{nombre}", claves[nombre])
+            if png is not None:
+                guardadas[nombre] = png
+    pendientes = [nombre for nombre in GRAFICAS if nombre not in guardadas]
+
+    imagenes, tiempos = {}, {}
+    if pendientes:
+        import pandas as pd
+
+        df = pd.DataFrame(peliculas)[['title', 'vote_average', 'release_date']]
+        # Cada gráfica se dibuja en su propio proceso y vuelve como PNG en memoria
+        imagenes, tiempos = renderizar_graficas(df, procesos=procesos, carpeta="." if guardar_png else None,
+                                                nombres=pendientes)
+        if incremental is not None:
+            for nombre, png in imagenes.items():
+                incremental.guardar(f"grafica:{nombre}", claves[nombre], png, archivos=[nombre] if guardar_png else ())
+    imagenes = {nombre: guardadas.get(nombre) or imagenes[nombre] for nombre in GRAFICAS}
+    if not tiempos:
+        return imagenes
+
+    print("\nTiempo de renderizado por gráfica:")
+    for nombre, segundos in tiempos.items():
+        print(f"- {nombre}: {segundos:.2f}s")
+        # Se dibujan (y se hace savefig) en otros procesos: se registra el tiempo que reportan
+        registrar(f"graficas.{nombre}", segundos)
+    return imagenes
+
+@medir("excel")
+def guardar_en_excel(peliculas, imagenes=None, streaming=None, ruta="peliculas_analisis.xlsx", incremental=None):
+    # Si no cambiaron las películas, las gráficas ni esta función, el libro ya está escrito.
+    # Sin las imágenes en memoria se leen los PNG del disco, así que no se puede saltar
+    if incremental is not None and imagenes is not None:
+        return incremental.etapa("excel", (peliculas, imagenes, streaming, ruta, guardar_en_excel,
+                                           fuentes("estadisticas", "excel_streaming", "detalles")),
+                                 lambda: guardar_en_excel(peliculas, imagenes, streaming, ruta), archivos=[ruta])
+
+    import pandas as pd
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as ExcelImage
+    from openpyxl.utils.dataframe import dataframe_to_rows
+    from estadisticas import AcumuladorEstadisticas
+    from excel_streaming import exportar_excel_streaming, bloques_de, UMBRAL_STREAMING
+    from detalles import CAMPOS_DETALLE
+
+    df = pd.DataFrame(peliculas)
+    # Las columnas de detalle sólo están si las películas pasaron por TMDbAPI.enriquecer
+    df = df[['title', 'vote_average', 'release_date'] + [c for c in CAMPOS_DETALLE if c in df.columns]]
+
+    # Una sola pasada sobre las puntuaciones para las cuatro métricas
+    with etapa("excel.estadisticas"):
+        estadisticas = AcumuladorEstadisticas().agregar(df['vote_average']).resultado()
+    media = estadisticas["media"]
+    mediana = estadisticas["mediana"]
+    moda = estadisticas["moda"]
+    desviacion = estadisticas["desviacion"]
+
+    metricas = [
+        ["Métrica", "Valor"],
+        ["Media", media],
+        ["Mediana", mediana],
+        ["Moda", moda],
+        ["Desviación estándar", desviacion],
+    ]
+
+    graficas = []
+    for nombre, celda in zip(["grafico_barras.png", "grafico_lineas.png", "grafico_dispersion.png", "grafico_pastel.png"], ["A1", "A30", "A60", "A90"]):
+        # Si generar_graficas ya entregó los PNG en memoria no se vuelven a leer del disco
+        if imagenes is not None:
+            png = imagenes[nombre]
+        else:
+            with open(nombre, 'rb') as f:
+                png = f.read()
+        graficas.append(("Gráficas", celda, png))
+
+    # Con muchas filas se escribe por bloques en hojas de sólo escritura
+    if streaming is None:
+        streaming = len(df) > UMBRAL_STREAMING
+    if streaming:
+        with etapa("excel.guardar"):
+            exportar_excel_streaming(ruta, bloques_de(df), "Datos", {"Métricas": metricas}, graficas)
+        return
+
     wb = Workbook()
     ws_data = wb.active
     ws_data.title = "Datos"
@@ -144,24 +295,13 @@ def guardar_en_excel(peliculas):
         ws_data.append(r)
 
     ws_metricas = wb.create_sheet("Métricas")
-    puntuaciones = df['vote_average']
-
-    media = np.mean(puntuaciones)
-    mediana = np.median(puntuaciones)
-    moda = statistics.mode(puntuaciones)
-    desviacion = np.std(puntuaciones)
-
-    ws_metricas.append(["Métrica", "Valor"])
-    ws_metricas.append(["Media", media])
-    ws_metricas.append(["Mediana", mediana])
-    ws_metricas.append(["Moda", moda])
-    ws_metricas.append(["Desviación estándar", desviacion])
+    for fila in metricas:
+        ws_metricas.append(fila)
 
     ws_graficas = wb.create_sheet("Gráficas")
-    for nombre, celda in zip(["grafico_barras.png", "grafico_lineas.png", "grafico_dispersion.png", "grafico_pastel.png"], ["A1", "A30", "A60", "A90"]):
-        with open(nombre, 'rb') as f:
-            img_data = BytesIO(f.read())
-        img = ExcelImage(img_data)
+    for _, celda, png in graficas:
+        img = ExcelImage(BytesIO(png))
         ws_graficas.add_image(img, celda)
 
-    wb.save("peliculas_analisis.xlsx")
+    with etapa("excel.guardar"):
+        wb.save(ruta)
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import shutil
+
+import numpy as np
+
+# Un archivo columnar es una carpeta con un .npy por columna (los textos van como bytes UTF-8
+# más un arreglo de offsets) y un esquema.json que se escribe al final
+FORMATO = "columnar-peliculas"
+VERSION = 1
+EXTENSION = ".columnar"
+
+
+class ColumnaTexto:
+    """Columna de texto guardada como bytes UTF-8 contiguos más los offsets de cada fila."""
+
+    def __init__(self, datos, offsets):
+        self.datos = datos
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.a_lista(*i.indices(len(self))[:2])
+        inicio, fin = self.offsets[i], self.offsets[i + 1]
+        return self.datos[inicio:fin].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.a_lista())
+
+    def a_lista(self, desde=0, hasta=None):
+        """Decodifica las filas [desde, hasta) leyendo de una vez sólo esa parte del buffer."""
+        hasta = len(self) if hasta is None else hasta
+        if hasta <= desde:
+            return []
+        offsets = self.offsets[desde:hasta + 1].tolist()
+        crudo = self.datos[offsets[0]:offsets[-1]].tobytes()
+        base = offsets[0]
+        return [crudo[a - base:b - base].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+
+def _es_numerica(valores):
+    return isinstance(valores, np.ndarray) and valores.dtype.kind in "biufmM"
+
+
+def _columna(valores):
+    """Convierte una columna (Series, arreglo o lista) en un arreglo de NumPy."""
+    if hasattr(valores, "to_numpy"):
+        return valores.to_numpy()
+    return np.asarray(valores)
+
+
+def guardar_columnar(ruta, columnas):
+    """Guarda un DataFrame o un dict nombre -> valores como carpeta columnar en `ruta`.
+
+    Las columnas numéricas, booleanas y de fechas se guardan tal cual; el resto se guarda
+    como texto (None/NaN quedan como cadena vacía). Devuelve el número de filas.
+    """
+    if hasattr(columnas, "columns"):
+        columnas = {nombre: columnas[nombre] for nombre in columnas.columns}
+    temporal = ruta + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    esquema = {"formato": FORMATO, "version": VERSION, "filas": None, "columnas": []}
+    for i, (nombre, valores) in enumerate(columnas.items()):
+        valores = _columna(valores)
+        archivo = f"c{i}"
+        if _es_numerica(valores):
+            np.save(os.path.join(temporal, archivo + ".npy"), valores, allow_pickle=False)
+            tipo = str(valores.dtype)
+        else:
+            codificados = [v.encode("utf-8") if isinstance(v, str) else b"" for v in valores]
+            offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in codificados], out=offsets[1:])
+            np.save(os.path.join(temporal, archivo + ".datos.npy"),
+                    np.frombuffer(b"".join(codificados), dtype=np.uint8), allow_pickle=False)
+            np.save(os.path.join(temporal, archivo + ".offsets.npy"), offsets, allow_pickle=False)
+            tipo = "texto"
+        if esquema["filas"] is None:
+            esquema["filas"] = len(valores)
+        elif esquema["filas"] != len(valores):
+            raise ValueError(f"La columna {nombre!r} tiene {len(valores)} filas y se esperaban {esquema['filas']}")
+        esquema["columnas"].append({"nombre": nombre, "tipo": tipo, "archivo": archivo})
+    esquema["filas"] = esquema["filas"] or 0
+
+    with open(os.path.join(temporal, "esquema.json"), "w", encoding="utf-8") as f:
+        json.dump(esquema, f, ensure_ascii=False, indent=4)
+    # Se reemplaza de una vez: quien lea nunca ve una carpeta a medio escribir
+    shutil.rmtree(ruta, ignore_errors=True)
+    os.replace(temporal, ruta)
+    return esquema["filas"]
+
+
+def fechas_dia(textos):
+    """Convierte textos YYYY-MM-DD en datetime64[D]; los vacíos o inválidos quedan como NaT."""
+    try:
+        return np.array([t or "NaT" for t in textos], dtype="datetime64[D]")
+    except ValueError:
+        fechas = []
+        for t in textos:
+            try:
+                fechas.append(np.datetime64(t, "D") if isinstance(t, str) and len(t) == 10 else np.datetime64("NaT"))
+            except ValueError:
+                fechas.append(np.datetime64("NaT"))
+        return np.array(fechas, dtype="datetime64[D]")
+
+
+def guardar_peliculas_columnar(ruta, peliculas):
+    """Guarda películas (dicts de TMDb o registros compactos) con las columnas del análisis."""
+    from pelicula import mascara_generos
+
+    peliculas = list(peliculas)
+    return guardar_columnar(ruta, {
+        "id": np.array([p["id"] for p in peliculas], dtype=np.int64),
+        "title": [p.get("title") for p in peliculas],
+        "release_date": fechas_dia([p.get("release_date") for p in peliculas]),
+        "vote_average": np.array([p.get("vote_average") for p in peliculas], dtype=np.float64),
+        "vote_count": np.array([p.get("vote_count") or 0 for p in peliculas], dtype=np.int64),
+        "generos": np.array([mascara_generos(p.get("genre_ids", ())) for p in peliculas], dtype=np.uint64),
+    })
+
+
+class TablaColumnar:
+    """Abre una carpeta columnar; cada columna numérica es un memmap de sólo lectura (sin copia)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(os.path.join(ruta, "esquema.json"), encoding="utf-8") as f:
+            esquema = json.load(f)
+        if esquema.get("formato") != FORMATO or esquema.get("version") != VERSION:
+            raise ValueError(f"{ruta} no es un archivo columnar compatible")
+        self.filas = esquema["filas"]
+        self._columnas = {c["nombre"]: c for c in esquema["columnas"]}
+        self._abiertas = {}
+
+    @property
+    def columnas(self):
+        return list(self._columnas)
+
+    def __len__(self):
+        return self.filas
+
+    def __contains__(self, nombre):
+        return nombre in self._columnas
+
+    def __getitem__(self, nombre):
+        if nombre not in self._abiertas:
+            columna = self._columnas[nombre]
+            base = os.path.join(self.ruta, columna["archivo"])
+            if columna["tipo"] == "texto":
+                self._abiertas[nombre] = ColumnaTexto(np.load(base + ".datos.npy", mmap_mode="r"),
+                                                      np.load(base + ".offsets.npy", mmap_mode="r"))
+            else:
+                self._abiertas[nombre] = np.load(base + ".npy", mmap_mode="r")
+        return self._abiertas[nombre]
+
+    def a_dataframe(self, columnas=None):
+        """Arma un DataFrame con las columnas pedidas (los textos sí se decodifican)."""
+        import pandas as pd
+
+        datos = {}
+        for nombre in columnas or self.columnas:
+            valores = self[nombre]
+            datos[nombre] = valores.a_lista() if isinstance(valores, ColumnaTexto) else np.asarray(valores)
+        return pd.DataFrame(datos)
+
+
+def es_columnar(ruta):
+    return os.path.isfile(os.path.join(ruta, "esquema.json"))
+
+
+def bloques_columnar(ruta, columnas=None, tam_bloque=50_000):
+    """Generador de DataFrames de hasta `tam_bloque` filas leídos de un archivo columnar.
+
+    Las columnas numéricas de cada bloque son vistas del memmap; sólo los textos del
+    bloque se decodifican.
+    """
+    import pandas as pd
+
+    tabla = TablaColumnar(ruta)
+    columnas = columnas or tabla.columnas
+    for inicio in range(0, len(tabla), tam_bloque):
+        fin = min(inicio + tam_bloque, len(tabla))
+        yield pd.DataFrame({nombre: tabla[nombre][inicio:fin] for nombre in columnas})
+
+
+def benchmark(n=200_000, carpeta=None):
+    """Compara cargar `n` películas desde JSON (indent=4), CSV y el formato columnar."""
+    import tempfile
+    import pandas as pd
+    from servidor_tmdb_local import generar_peliculas
+
+    peliculas = generar_peliculas(n)
+    with tempfile.TemporaryDirectory(dir=carpeta) as tmp:
+        ruta_json = os.path.join(tmp, "peliculas.json")
+        ruta_csv = os.path.join(tmp, "peliculas.csv")
+        ruta_col = os.path.join(tmp, "peliculas" + EXTENSION)
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump(peliculas, f, ensure_ascii=False, indent=4)
+        pd.DataFrame(peliculas)[["title", "release_date", "vote_average"]].to_csv(ruta_csv, index=False)
+        guardar_peliculas_columnar(ruta_col, peliculas)
+        del peliculas
+
+        tiempos = {}
+        inicio = time.perf_counter()
+        with open(ruta_json, encoding="utf-8") as f:
+            media_json = float(np.mean([p["vote_average"] for p in json.load(f)]))
+        tiempos["json"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        media_csv = float(pd.read_csv(ruta_csv)["vote_average"].mean())
+        tiempos["csv"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        media_columnar = float(TablaColumnar(ruta_col)["vote_average"].mean())
+        tiempos["columnar"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        TablaColumnar(ruta_col).a_dataframe(["title", "release_date", "vote_average"])
+        tiempos["columnar_dataframe"] = time.perf_counter() - inicio
+
+    assert abs(media_json - media_csv) < 1e-9 and abs(media_json - media_columnar) < 1e-9
+    print(f"{n} películas, media de vote_average: JSON {tiempos['json']:.2f}s, CSV {tiempos['csv']:.2f}s, "
+          f"columnar {tiempos['columnar']:.3f}s (DataFrame completo {tiempos['columnar_dataframe']:.2f}s)")
+    return tiempos
+
+
+if __name__ == "__main__":
+    benchmark()
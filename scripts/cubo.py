@@ -0,0 +1,227 @@
+import time
+
+import numpy as np
+
+from estadisticas import AcumuladorEstadisticas
+from pelicula import mascara_generos, generos_de_mascara, GENERO_OTRO
+
+# Ancho de las celdas del histograma de puntuaciones: la mediana y la moda del cubo tienen
+# un error de a lo más la mitad (igual que AcumuladorEstadisticas con `error`)
+ANCHO_CELDA = 0.1
+
+# Rango de las puntuaciones de TMDb: las de fuera (y las NaN) no entran al cubo
+PUNTAJE_MIN, PUNTAJE_MAX = 0, 10
+
+_CAMPOS = ("anios", "mascaras", "conteo", "suma", "suma_cuadrados", "minimo", "maximo",
+           "hist_celda", "hist_bin", "hist_conteo")
+
+
+class CuboPeliculas:
+    """Agregados de puntuación por (año, géneros), para responder cortes sin volver a descargar.
+
+    Cada celda es un año y una combinación exacta de géneros (la máscara de bits de
+    pelicula.py), con conteo, suma, suma de cuadrados, mínimo, máximo e histograma.
+    Un corte por rango de años y conjunto de géneros sólo suma las celdas que entran:
+    como cada película está en una sola celda, una película con varios de los géneros
+    pedidos se cuenta una sola vez.
+    """
+
+    def __init__(self, anios, mascaras, conteo, suma, suma_cuadrados, minimo, maximo,
+                 hist_celda, hist_bin, hist_conteo, ancho=ANCHO_CELDA):
+        self.anios = anios
+        self.mascaras = mascaras
+        self.conteo = conteo
+        self.suma = suma
+        self.suma_cuadrados = suma_cuadrados
+        self.minimo = minimo
+        self.maximo = maximo
+        # Histograma disperso: (celda, bin) -> conteo, sólo para los pares que aparecen
+        self.hist_celda = hist_celda
+        self.hist_bin = hist_bin
+        self.hist_conteo = hist_conteo
+        self.ancho = ancho
+
+    @classmethod
+    def construir(cls, anios, mascaras, puntuaciones, ancho=ANCHO_CELDA):
+        """Arma el cubo en una pasada vectorizada; ignora las puntuaciones NaN o fuera de [0, 10]."""
+        x = np.asarray(puntuaciones, dtype=float)
+        # Las comparaciones con NaN dan False: el mismo filtro descarta las NaN
+        validas = (x >= PUNTAJE_MIN) & (x <= PUNTAJE_MAX)
+        x = x[validas]
+        claves = np.empty(x.size, dtype=[("anio", np.int64), ("mascara", np.uint64)])
+        claves["anio"] = np.asarray(anios, dtype=np.int64)[validas]
+        claves["mascara"] = np.broadcast_to(np.asarray(mascaras, dtype=np.uint64), validas.shape)[validas]
+
+        celdas, celda = np.unique(claves, return_inverse=True)
+        celda = celda.ravel()
+        k = len(celdas)
+        conteo = np.bincount(celda, minlength=k)
+        # Ordenando por (celda, puntuación), el mínimo y el máximo son el primero y el último de cada celda
+        orden = np.lexsort((x, celda))
+        finales = np.cumsum(conteo)
+        iniciales = finales - conteo
+        ordenadas = x[orden]
+
+        bins = np.round(x / ancho).astype(np.int64)
+        # celda * ancho_bins + bin sólo se puede deshacer si cada bin está en [0, ancho_bins)
+        ancho_bins = round(PUNTAJE_MAX / ancho) + 1
+        if bins.size and (bins.min() < 0 or bins.max() >= ancho_bins):
+            raise ValueError(f"Bin de puntuación fuera de rango [0, {ancho_bins}) con ancho {ancho}")
+        pares, hist_conteo = np.unique(celda * ancho_bins + bins, return_counts=True)
+        return cls(
+            anios=celdas["anio"].copy(),
+            mascaras=celdas["mascara"].copy(),
+            conteo=conteo,
+            suma=np.bincount(celda, weights=x, minlength=k),
+            suma_cuadrados=np.bincount(celda, weights=x * x, minlength=k),
+            minimo=ordenadas[iniciales] if k else np.empty(0),
+            maximo=ordenadas[finales - 1] if k else np.empty(0),
+            hist_celda=pares // ancho_bins,
+            hist_bin=pares % ancho_bins,
+            hist_conteo=hist_conteo,
+            ancho=ancho,
+        )
+
+    def __len__(self):
+        return len(self.conteo)
+
+    def _rango(self, desde=None, hasta=None):
+        # Las celdas están ordenadas por (año, máscara): un rango de años es un tramo contiguo
+        inicio = 0 if desde is None else int(np.searchsorted(self.anios, desde, side="left"))
+        fin = len(self) if hasta is None else int(np.searchsorted(self.anios, hasta, side="right"))
+        return inicio, max(inicio, fin)
+
+    @staticmethod
+    def _filtro_generos(mascaras, generos, modo="union"):
+        if generos is None:
+            return np.ones(len(mascaras), dtype=bool)
+        buscada = np.uint64(mascara_generos(generos))
+        comunes = mascaras & buscada
+        if modo == "union":
+            return comunes != 0
+        if modo == "interseccion":
+            return comunes == buscada
+        raise ValueError(f"Modo de consulta desconocido: {modo!r} (usa 'union' o 'interseccion')")
+
+    def combinar(self, seleccion, inicio=0, fin=None):
+        """Une en un AcumuladorEstadisticas las celdas marcadas en `seleccion` dentro de [inicio, fin)."""
+        fin = len(self) if fin is None else fin
+        conteo = int(self.conteo[inicio:fin][seleccion].sum())
+        if not conteo:
+            return AcumuladorEstadisticas(self.ancho)
+        # El histograma también está ordenado por celda: sólo se mira el tramo del rango
+        h_inicio, h_fin = np.searchsorted(self.hist_celda, [inicio, fin])
+        hist = seleccion[self.hist_celda[h_inicio:h_fin] - inicio]
+        frecuencias = np.bincount(self.hist_bin[h_inicio:h_fin][hist], weights=self.hist_conteo[h_inicio:h_fin][hist])
+        no_vacios = np.flatnonzero(frecuencias)
+        return AcumuladorEstadisticas.desde_sumas(
+            conteo,
+            float(self.suma[inicio:fin][seleccion].sum()),
+            float(self.suma_cuadrados[inicio:fin][seleccion].sum()),
+            self.minimo[inicio:fin][seleccion].min(),
+            self.maximo[inicio:fin][seleccion].max(),
+            dict(zip(no_vacios.tolist(), frecuencias[no_vacios].astype(np.int64).tolist())),
+            error=self.ancho,
+        )
+
+    def acumulador(self, desde=None, hasta=None, generos=None, modo="union"):
+        """AcumuladorEstadisticas de las películas con año en [desde, hasta] y alguno (o todos) los géneros."""
+        inicio, fin = self._rango(desde, hasta)
+        return self.combinar(self._filtro_generos(self.mascaras[inicio:fin], generos, modo), inicio, fin)
+
+    def consultar(self, desde=None, hasta=None, generos=None, modo="union"):
+        """Estadísticas (como AcumuladorEstadisticas.resultado) de un corte del cubo."""
+        return self.acumulador(desde, hasta, generos, modo).resultado()
+
+    def anios_presentes(self):
+        return np.unique(self.anios).tolist()
+
+    def generos_presentes(self):
+        mascara = int(np.bitwise_or.reduce(self.mascaras)) if len(self) else 0
+        return generos_de_mascara(mascara)
+
+    def por_anio(self, generos=None, modo="union"):
+        """Lista de (año, estadísticas) para cada año con películas."""
+        return [(anio, self.consultar(anio, anio, generos, modo)) for anio in self.anios_presentes()]
+
+    def por_genero(self, desde=None, hasta=None):
+        """Lista de (género, estadísticas); una película cuenta en cada uno de sus géneros."""
+        return [(genero, self.consultar(desde, hasta, [genero])) for genero in self.generos_presentes()]
+
+    def hojas_excel(self, nombres_generos=None):
+        """Hojas "Por año", "Por género" y "Año x género" (media) como listas de filas."""
+        nombres_generos = {GENERO_OTRO: "Otros", **(nombres_generos or {})}
+        nombre = lambda genero: nombres_generos.get(genero, genero)
+        columnas = ["conteo", "media", "mediana", "moda", "desviacion"]
+
+        def fila(estadisticas):
+            return [None if isinstance(v, float) and np.isnan(v) else v for v in (estadisticas[c] for c in columnas)]
+
+        por_anio = [["Año"] + columnas] + [[anio] + fila(e) for anio, e in self.por_anio()]
+        por_genero = [["Género"] + columnas] + [[nombre(g)] + fila(e) for g, e in self.por_genero()]
+
+        generos = self.generos_presentes()
+        cruce = [["Año"] + [nombre(g) for g in generos]]
+        for anio in self.anios_presentes():
+            medias = []
+            inicio, fin = self._rango(anio, anio)
+            for genero in generos:
+                seleccion = self._filtro_generos(self.mascaras[inicio:fin], [genero])
+                conteo = self.conteo[inicio:fin][seleccion].sum()
+                medias.append(float(self.suma[inicio:fin][seleccion].sum() / conteo) if conteo else None)
+            cruce.append([anio] + medias)
+        return {"Por año": por_anio, "Por género": por_genero, "Año x género": cruce}
+
+    def guardar(self, ruta):
+        np.savez(ruta, ancho=self.ancho, **{campo: getattr(self, campo) for campo in _CAMPOS})
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as datos:
+            return cls(**{campo: datos[campo] for campo in _CAMPOS}, ancho=float(datos["ancho"]))
+
+
+def benchmark(n=200_000, cortes=200, semilla=0):
+    """Compara responder cortes (años x géneros) con el cubo contra filtrar todas las películas."""
+    from servidor_tmdb_local import generar_peliculas, GENEROS_TMDB
+
+    peliculas = generar_peliculas(n, semilla)
+    anios = np.array([int(p["release_date"][:4]) for p in peliculas])
+    mascaras = np.array([mascara_generos(p["genre_ids"]) for p in peliculas], dtype=np.uint64)
+    puntuaciones = np.array([p["vote_average"] for p in peliculas])
+
+    inicio = time.perf_counter()
+    cubo = CuboPeliculas.construir(anios, mascaras, puntuaciones)
+    construccion = time.perf_counter() - inicio
+
+    rng = np.random.default_rng(semilla)
+    ids = [g["id"] for g in GENEROS_TMDB]
+    consultas = []
+    for _ in range(cortes):
+        desde = int(rng.integers(1950, 2020))
+        consultas.append((desde, desde + int(rng.integers(0, 20)),
+                          rng.choice(ids, size=int(rng.integers(1, 4)), replace=False).tolist()))
+
+    inicio = time.perf_counter()
+    con_cubo = [cubo.consultar(d, h, g) for d, h, g in consultas]
+    tiempo_cubo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    directas = []
+    for desde, hasta, generos in consultas:
+        seleccion = (anios >= desde) & (anios <= hasta) & (mascaras & np.uint64(mascara_generos(generos)) != 0)
+        directas.append(AcumuladorEstadisticas(ANCHO_CELDA).agregar(puntuaciones[seleccion]).resultado())
+    tiempo_directo = time.perf_counter() - inicio
+
+    for a, b in zip(con_cubo, directas):
+        assert a["conteo"] == b["conteo"]
+        if a["conteo"]:
+            assert abs(a["media"] - b["media"]) < 1e-9 and abs(a["desviacion"] - b["desviacion"]) < 1e-6
+            assert a["mediana"] == b["mediana"]
+    print(f"{n} películas, cubo de {len(cubo)} celdas armado en {construccion:.2f}s; {cortes} cortes: "
+          f"cubo {tiempo_cubo:.2f}s, filtrando las películas {tiempo_directo:.2f}s")
+    return {"construccion": construccion, "cubo": tiempo_cubo, "directo": tiempo_directo}
+
+
+if __name__ == "__main__":
+    benchmark()
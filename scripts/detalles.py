@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Sub-recursos que /movie/{id} trae en la misma respuesta con append_to_response
+SUBRECURSOS = ("credits", "keywords")
+
+# Columnas que el enriquecimiento añade a cada película
+CAMPOS_DETALLE = ("runtime", "budget", "revenue", "director", "reparto", "palabras_clave")
+
+# Actores por película que se guardan en "reparto"
+MAX_REPARTO = 5
+
+
+def extraer_detalle(datos):
+    """Reduce la respuesta de /movie/{id} (con credits y keywords) a las columnas de CAMPOS_DETALLE."""
+    if datos is None:
+        return dict.fromkeys(CAMPOS_DETALLE)
+    creditos = datos.get("credits") or {}
+    reparto = sorted(creditos.get("cast", []), key=lambda actor: actor.get("order", 0))[:MAX_REPARTO]
+    directores = [p["name"] for p in creditos.get("crew", []) if p.get("job") == "Director"]
+    palabras = (datos.get("keywords") or {}).get("keywords", [])
+    return {
+        # TMDb usa 0 cuando no conoce la duración, el presupuesto o la recaudación
+        "runtime": datos.get("runtime") or None,
+        "budget": datos.get("budget") or None,
+        "revenue": datos.get("revenue") or None,
+        "director": ", ".join(directores) or None,
+        "reparto": ", ".join(actor["name"] for actor in reparto) or None,
+        "palabras_clave": ", ".join(p["name"] for p in palabras) or None,
+    }
+
+
+class Enriquecedor:
+    """Completa películas con sus detalles pidiendo cada id a lo más una vez por ejecución.
+
+    `pedir(id)` devuelve el JSON de /movie/{id} (o None si la película no existe). Los
+    detalles se guardan por id como futuros: si dos consultas (o dos hilos) piden la misma
+    película a la vez, la segunda espera la petición de la primera en lugar de repetirla.
+    Las peticiones nuevas se reparten entre `max_concurrencia` hilos. Si falla la
+    petición de una película, sus columnas quedan vacías (como si no existiera) y se
+    vuelve a intentar la próxima vez que se pida.
+    """
+
+    def __init__(self, pedir, max_concurrencia=8):
+        self.pedir = pedir
+        self.max_concurrencia = max_concurrencia
+        self.peticiones = 0
+        self.peliculas = 0
+        self.reutilizadas = 0
+        self.fallidas = 0
+        self._detalles = {}
+        self._lock = threading.Lock()
+
+    def _descargar(self, id_pelicula, futuro):
+        try:
+            detalle = extraer_detalle(self.pedir(id_pelicula))
+        except BaseException as e:
+            # Un error de red no queda guardado: la próxima vez se vuelve a intentar
+            with self._lock:
+                del self._detalles[id_pelicula]
+            futuro.set_exception(e)
+        else:
+            futuro.set_result(detalle)
+
+    def enriquecer(self, peliculas):
+        """Devuelve copias de las películas (dicts) con las columnas de CAMPOS_DETALLE añadidas."""
+        ids = list(dict.fromkeys(p["id"] for p in peliculas))
+        with self._lock:
+            nuevos = [i for i in ids if i not in self._detalles]
+            for i in nuevos:
+                self._detalles[i] = Future()
+            futuros = {i: self._detalles[i] for i in ids}
+            self.peticiones += len(nuevos)
+            self.peliculas += len(peliculas)
+            self.reutilizadas += len(peliculas) - len(nuevos)
+
+        if len(nuevos) == 1:
+            self._descargar(nuevos[0], futuros[nuevos[0]])
+        elif nuevos:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrencia, len(nuevos))) as ejecutor:
+                for i in nuevos:
+                    ejecutor.submit(self._descargar, i, futuros[i])
+        detalles, fallidas = {}, 0
+        for i, futuro in futuros.items():
+            try:
+                detalles[i] = futuro.result()
+            except Exception:
+                detalles[i] = extraer_detalle(None)
+                fallidas += 1
+        if fallidas:
+            with self._lock:
+                self.fallidas += fallidas
+        return [{**p, **detalles[p["id"]]} for p in peliculas]
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "peticiones": self.peticiones,
+                "peliculas": self.peliculas,
+                "reutilizadas": self.reutilizadas,
+                "fallidas": self.fallidas,
+                "peticiones_por_pelicula": self.peticiones / self.peliculas if self.peliculas else None,
+            }
+
+    def imprimir_resumen(self):
+        datos = self.resumen()
+        if not datos["peliculas"]:
+            return
+        print(f"Detalles: {datos['peticiones']} peticiones para {datos['peliculas']} películas "
+              f"({datos['peticiones_por_pelicula']:.2f} por película, {datos['reutilizadas']} ya enriquecidas"
+              + (f", {datos['fallidas']} fallidas)" if datos["fallidas"] else ")"))
+
+
+def benchmark(n_peliculas=5_000, consultas=12, top_n=40, latencia=0.01):
+    """Compara pedir el detalle de cada película de cada consulta contra el Enriquecedor.
+
+    Las consultas se solapan (comparten géneros), como en un lote real, así que muchas
+    películas salen en varias.
+    """
+    import time
+    import importlib
+    from servidor_tmdb_local import ServidorTMDbLocal, GENEROS_TMDB
+
+    codigo_final = importlib.import_module("codigo-final")
+    ids = [g["id"] for g in GENEROS_TMDB]
+    with ServidorTMDbLocal(n_peliculas=n_peliculas, latencia=latencia) as servidor:
+        api = codigo_final.TMDbAPI(codigo_final.API_KEY, cache=False, catalogo=False, tasa=10_000, rafaga=10_000,
+                                   base_url=servidor.url)
+        resultados = [api.obtener_peliculas(ids[i % 6:i % 6 + 2], "1950-01-01", "2024-12-31", top_n, concurrente=True)
+                      for i in range(consultas)]
+        total = sum(len(peliculas) for peliculas in resultados)
+
+        antes = servidor.peticiones
+        inicio = time.perf_counter()
+        ingenuas = [[{**p, **extraer_detalle(api.detalle_pelicula(p["id"]))} for p in peliculas]
+                    for peliculas in resultados]
+        tiempo_ingenuo = time.perf_counter() - inicio
+        peticiones_ingenuas = servidor.peticiones - antes
+
+        antes = servidor.peticiones
+        inicio = time.perf_counter()
+        enriquecidas = [api.enriquecer(peliculas) for peliculas in resultados]
+        tiempo = time.perf_counter() - inicio
+        peticiones = servidor.peticiones - antes
+        api.http.cerrar()
+
+    assert enriquecidas == ingenuas
+    print(f"{consultas} consultas, {total} películas ({len({p['id'] for r in resultados for p in r})} distintas)")
+    print(f"- una petición por película y consulta: {peticiones_ingenuas} peticiones en {tiempo_ingenuo:.2f}s")
+    print(f"- Enriquecedor: {peticiones} peticiones en {tiempo:.2f}s "
+          f"({peticiones / total:.2f} por película)")
+    return {"ingenuo": tiempo_ingenuo, "enriquecedor": tiempo, "peticiones": peticiones,
+            "peticiones_ingenuas": peticiones_ingenuas}
+
+
+if __name__ == "__main__":
+    benchmark()
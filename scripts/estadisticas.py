@@ -0,0 +1,120 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+
+class AcumuladorEstadisticas:
+    """Calcula media, mediana, moda y desviación estándar en una sola pasada, por bloques.
+
+    - Conteo, media y varianza con Welford (combinando bloques con la fórmula de Chan).
+    - Moda con un Counter; en empates gana el primer valor visto, igual que statistics.mode.
+    - Mediana exacta a partir de las frecuencias. Con `error`, los valores se agrupan en
+      celdas de ese ancho (un histograma fijo): la memoria queda acotada aunque los valores
+      sean continuos y la mediana y la moda tienen un error absoluto de a lo más error / 2.
+
+    Dos acumuladores de bloques distintos se pueden unir con `combinar`.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.conteo = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        # Frecuencias exactas por valor, o por celda de ancho `error` si se pidió aproximar
+        self.frecuencias = Counter()
+
+    @classmethod
+    def desde_sumas(cls, conteo, suma, suma_cuadrados, minimo, maximo, frecuencias, error=None):
+        """Arma un acumulador a partir de agregados ya calculados (por ejemplo, celdas de un cubo)."""
+        acumulador = cls(error)
+        if conteo:
+            acumulador.conteo = int(conteo)
+            acumulador.media = suma / conteo
+            # Σx² - (Σx)²/n puede quedar apenas negativo por redondeo
+            acumulador.m2 = max(suma_cuadrados - suma * suma / conteo, 0.0)
+            acumulador.minimo = float(minimo)
+            acumulador.maximo = float(maximo)
+            acumulador.frecuencias.update(frecuencias)
+        return acumulador
+
+    def agregar(self, valores):
+        """Añade un bloque de valores (lista, Series o arreglo); ignora los NaN."""
+        x = np.asarray(valores, dtype=float)
+        x = x[~np.isnan(x)]
+        if not x.size:
+            return self
+
+        n_b = x.size
+        media_b = float(x.mean())
+        m2_b = float(((x - media_b) ** 2).sum())
+        self._unir_momentos(n_b, media_b, m2_b)
+        self.minimo = min(self.minimo, float(x.min()))
+        self.maximo = max(self.maximo, float(x.max()))
+
+        claves = np.round(x / self.error).astype(np.int64) if self.error else x
+        # Sólo se recorre una vez cada valor distinto, en el orden en que aparecieron
+        valores_unicos, primeros, cuentas = np.unique(claves, return_index=True, return_counts=True)
+        orden = np.argsort(primeros, kind="stable")
+        for valor, cuenta in zip(valores_unicos[orden].tolist(), cuentas[orden].tolist()):
+            self.frecuencias[valor] += cuenta
+        return self
+
+    def _unir_momentos(self, n_b, media_b, m2_b):
+        n = self.conteo + n_b
+        delta = media_b - self.media
+        self.media += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.conteo * n_b / n
+        self.conteo = n
+
+    def combinar(self, otro):
+        """Une otro acumulador parcial a este (por ejemplo, el de otro bloque o proceso)."""
+        if otro.conteo:
+            self._unir_momentos(otro.conteo, otro.media, otro.m2)
+            self.minimo = min(self.minimo, otro.minimo)
+            self.maximo = max(self.maximo, otro.maximo)
+            self.frecuencias.update(otro.frecuencias)
+        return self
+
+    @property
+    def desviacion(self):
+        """Desviación estándar poblacional (como np.std)."""
+        return math.sqrt(self.m2 / self.conteo) if self.conteo else math.nan
+
+    @property
+    def moda(self):
+        if not self.frecuencias:
+            return None
+        valor = self.frecuencias.most_common(1)[0][0]
+        return valor * self.error if self.error else valor
+
+    @property
+    def mediana(self):
+        if not self.conteo:
+            return math.nan
+        valor = self._percentil_50(self.frecuencias)
+        return valor * self.error if self.error else valor
+
+    def _percentil_50(self, frecuencias):
+        # Igual que np.median: el valor central, o el promedio de los dos centrales
+        objetivos = ((self.conteo - 1) // 2, self.conteo // 2)
+        encontrados = []
+        acumulado = 0
+        for valor in sorted(frecuencias):
+            acumulado += frecuencias[valor]
+            while len(encontrados) < 2 and objetivos[len(encontrados)] < acumulado:
+                encontrados.append(valor)
+            if len(encontrados) == 2:
+                break
+        return (encontrados[0] + encontrados[1]) / 2
+
+    def resultado(self):
+        return {
+            "conteo": self.conteo,
+            "media": self.media if self.conteo else math.nan,
+            "mediana": self.mediana,
+            "moda": self.moda,
+            "desviacion": self.desviacion,
+        }
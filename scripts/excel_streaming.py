@@ -0,0 +1,68 @@
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as ExcelImage
+
+# Máximo de filas por hoja en Excel (incluye la fila de encabezados)
+LIMITE_FILAS_EXCEL = 1_048_576
+
+# A partir de este número de filas conviene escribir en modo streaming
+UMBRAL_STREAMING = 100_000
+
+
+def bloques_de(df, tam_bloque=50_000):
+    """Parte un DataFrame en bloques de filas sin copiarlo completo."""
+    for inicio in range(0, len(df), tam_bloque):
+        yield df.iloc[inicio:inicio + tam_bloque]
+
+
+def _filas(bloque):
+    # NaN/NaT no se pueden escribir en una celda: se dejan vacías
+    limpio = bloque.astype(object).where(bloque.notna(), None)
+    return limpio.itertuples(index=False, name=None)
+
+
+def exportar_excel_streaming(ruta, bloques, nombre_hoja="Datos", hojas_extra=None, imagenes=None,
+                             limite_filas=LIMITE_FILAS_EXCEL):
+    """Escribe un Excel con hojas de sólo escritura a partir de bloques de DataFrame.
+
+    Cada bloque se escribe en cuanto llega y no se guarda en memoria, así el consumo depende
+    del tamaño del bloque y no del total de filas. Al llegar al límite de filas de Excel se
+    continúa en una hoja nueva ("Datos 2", "Datos 3", ...). `hojas_extra` es un diccionario
+    nombre -> lista de filas (por ejemplo las métricas) e `imagenes` una lista de
+    (nombre_hoja, celda, png_en_bytes). Devuelve cuántas filas de datos se escribieron.
+    """
+    wb = Workbook(write_only=True)
+    hoja = None
+    hojas = 0
+    filas_en_hoja = 0
+    total = 0
+
+    for bloque in bloques:
+        encabezados = list(bloque.columns)
+        for fila in _filas(bloque):
+            if hoja is None or filas_en_hoja >= limite_filas:
+                hojas += 1
+                hoja = wb.create_sheet(nombre_hoja if hojas == 1 else f"{nombre_hoja} {hojas}")
+                hoja.append(encabezados)
+                filas_en_hoja = 1
+            hoja.append(fila)
+            filas_en_hoja += 1
+            total += 1
+
+    if hoja is None:
+        wb.create_sheet(nombre_hoja)
+
+    for nombre, filas in (hojas_extra or {}).items():
+        extra = wb.create_sheet(nombre)
+        for fila in filas:
+            extra.append(fila)
+
+    hojas_imagenes = {}
+    for nombre, celda, png in imagenes or []:
+        if nombre not in hojas_imagenes:
+            hojas_imagenes[nombre] = wb.create_sheet(nombre)
+        hojas_imagenes[nombre].add_image(ExcelImage(BytesIO(png)), celda)
+
+    wb.save(ruta)
+    return total
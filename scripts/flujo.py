@@ -0,0 +1,378 @@
+import os
+import json
+import time
+import queue
+import threading
+
+import instrumentacion
+from pelicula import CAMPOS, proyectar, a_dicts
+
+CARPETA_FLUJO = "resultados_flujo"
+
+# Elementos (páginas o bloques) que caben en cada cola entre etapas: si una etapa se atrasa,
+# las de antes se bloquean al llenarse su cola en lugar de acumular todo en memoria
+CAPACIDAD_COLA = 8
+
+# Páginas que la validación puede tomar juntas de su cola
+LOTE_VALIDACION = 50
+
+# Marca de fin que recorre el flujo detrás del último elemento
+FIN = object()
+
+COLUMNAS = list(CAMPOS)
+
+
+class Etapa:
+    """Un paso del flujo: `funcion(elemento, emitir)` procesa un elemento y entrega sus resultados
+    a la etapa siguiente con `emitir` (que se bloquea si la cola de salida está llena).
+
+    Con `lote` > 1 la función recibe una lista: el elemento que llegó más los que ya estaban
+    esperando en la cola (hasta `lote`), sin quedarse a esperar a que lleguen más.
+    """
+
+    def __init__(self, nombre, funcion, hilos=1, lote=1):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.hilos = hilos
+        self.lote = lote
+        self.entradas = 0
+        self.salidas = 0
+        self.trabajo = 0.0
+        self.espera = 0.0
+        self.bloqueo = 0.0
+        self.cola_max = 0
+        self.vivos = hilos
+        self.lock = threading.Lock()
+
+    def metricas(self):
+        return {"etapa": self.nombre, "hilos": self.hilos, "entradas": self.entradas, "salidas": self.salidas,
+                "segundos_trabajo": self.trabajo, "segundos_espera_entrada": self.espera,
+                "segundos_bloqueada_salida": self.bloqueo, "cola_salida_max": self.cola_max}
+
+
+class Flujo:
+    """Etapas conectadas por colas acotadas; cada etapa corre en sus propios hilos.
+
+    La primera etapa recibe tareas (con `agregar_tarea` puede crear más mientras corre) y
+    termina cuando no quedan tareas pendientes; las demás terminan al recibir FIN. Si una
+    etapa falla, se cancela todo y `ejecutar` vuelve a lanzar la excepción.
+    """
+
+    def __init__(self, etapas, capacidad=CAPACIDAD_COLA):
+        self.etapas = etapas
+        # La cola de tareas no se acota (son tuplas pequeñas); las de datos sí
+        self.colas = [queue.Queue()] + [queue.Queue(maxsize=capacidad) for _ in etapas[1:]]
+        self.error = None
+        self._cancelado = threading.Event()
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+    def agregar_tarea(self, tarea):
+        with self._lock:
+            self._pendientes += 1
+        self.colas[0].put(tarea)
+
+    def _poner(self, cola, elemento):
+        while not self._cancelado.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _sacar(self, cola):
+        while not self._cancelado.is_set():
+            try:
+                return cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return FIN
+
+    def _trabajar(self, i):
+        etapa = self.etapas[i]
+        entrada = self.colas[i]
+        salida = self.colas[i + 1] if i + 1 < len(self.colas) else None
+        bloqueada = [0.0]
+
+        def emitir(elemento):
+            if salida is None:
+                return
+            inicio = time.perf_counter()
+            self._poner(salida, elemento)
+            bloqueada[0] += time.perf_counter() - inicio
+            with etapa.lock:
+                etapa.salidas += 1
+                etapa.cola_max = max(etapa.cola_max, salida.qsize())
+
+        try:
+            while True:
+                inicio = time.perf_counter()
+                elemento = self._sacar(entrada)
+                espera = time.perf_counter() - inicio
+                if elemento is FIN:
+                    break
+                recibidos = 1
+                if etapa.lote > 1:
+                    elemento, fin = [elemento], False
+                    while len(elemento) < etapa.lote:
+                        try:
+                            siguiente = entrada.get_nowait()
+                        except queue.Empty:
+                            break
+                        if siguiente is FIN:
+                            fin = True
+                            break
+                        elemento.append(siguiente)
+                    recibidos = len(elemento)
+                bloqueada[0] = 0.0
+                inicio = time.perf_counter()
+                with instrumentacion.etapa(f"flujo.{etapa.nombre}"):
+                    etapa.funcion(elemento, emitir)
+                total = time.perf_counter() - inicio
+                with etapa.lock:
+                    etapa.entradas += recibidos
+                    etapa.espera += espera
+                    etapa.bloqueo += bloqueada[0]
+                    etapa.trabajo += total - bloqueada[0]
+                if i == 0:
+                    with self._lock:
+                        self._pendientes -= 1
+                        terminado = self._pendientes == 0
+                    if terminado:
+                        for _ in range(etapa.hilos):
+                            entrada.put(FIN)
+                if etapa.lote > 1 and fin:
+                    break
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            self._cancelado.set()
+        finally:
+            with etapa.lock:
+                etapa.vivos -= 1
+                ultimo = etapa.vivos == 0
+            # El último hilo de la etapa avisa a cada hilo de la siguiente que ya no llegará nada
+            if ultimo and salida is not None:
+                for _ in range(self.etapas[i + 1].hilos):
+                    self._poner(salida, FIN)
+
+    def ejecutar(self, tareas):
+        for tarea in tareas:
+            self.agregar_tarea(tarea)
+        if self._pendientes == 0:
+            for _ in range(self.etapas[0].hilos):
+                self.colas[0].put(FIN)
+        hilos = [threading.Thread(target=self._trabajar, args=(i,), name=f"flujo-{etapa.nombre}-{j}", daemon=True)
+                 for i, etapa in enumerate(self.etapas) for j in range(etapa.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        if self.error is not None:
+            raise self.error
+        return [etapa.metricas() for etapa in self.etapas]
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def flujo_peliculas(api, generos, desde, hasta, carpeta=CARPETA_FLUJO, modo="union", max_paginas=500,
+                    hilos_descarga=4, capacidad=CAPACIDAD_COLA, lote=LOTE_VALIDACION, patron_titulo=None, mejor=True):
+    """Descarga todas las películas de la consulta y las escribe en CSV y JSON Lines mientras llegan.
+
+    Etapas: descarga de páginas -> validación -> estadísticas -> escritura. Cada página pasa
+    a validarse en cuanto llega, sin esperar al resto, y las colas acotadas frenan la
+    descarga si la escritura se atrasa. Devuelve un resumen con las estadísticas, las
+    métricas de cada etapa y la latencia de punta a punta de cada bloque (desde que llegó
+    de TMDb su página más antigua hasta que quedó escrito).
+
+    `mejor` elige el orden en que se piden las páginas (las mejores puntuadas primero, o
+    las peores con False). Para no repetir películas entre consultas se guardan los ids ya
+    vistos: esa memoria crece con el número de películas distintas (O(n), unos 75 bytes
+    por id), aunque las colas estén acotadas.
+    """
+    import pandas as pd
+    from validacion import validar_columnas
+    from estadisticas import AcumuladorEstadisticas
+
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_csv = os.path.join(carpeta, "peliculas.csv")
+    ruta_jsonl = os.path.join(carpeta, "peliculas.jsonl")
+    vistos = set()
+    rechazadas = [0]
+    acumulador = AcumuladorEstadisticas()
+    latencias = []
+    primera_escritura = []
+    flujo = None
+
+    def descargar(tarea, emitir):
+        consulta, pagina = tarea
+        datos = api.pagina_discover(consulta, desde, hasta, pagina, "desc" if mejor else "asc")
+        if pagina == 1:
+            # La primera página dice cuántas hay: las demás se reparten entre los hilos de descarga
+            for siguiente in range(2, min(datos.get("total_pages", 1), max_paginas) + 1):
+                flujo.agregar_tarea((consulta, siguiente))
+        resultados = datos.get("results", [])
+        if resultados:
+            emitir((time.perf_counter(), a_dicts(proyectar(resultados))))
+
+    def validar(paginas, emitir):
+        if lote <= 1:
+            # Sin lote la etapa recibe una sola página, no una lista
+            paginas = [paginas]
+        # Se valida junto todo lo que ya llegó: con páginas de 20 películas, el costo fijo
+        # de pandas por bloque pesaría más que la validación misma
+        llegada = min(t for t, _ in paginas)
+        # Con varias consultas por género una película puede aparecer más de una vez
+        nuevos = []
+        for _, registros in paginas:
+            for registro in registros:
+                if registro["id"] not in vistos:
+                    vistos.add(registro["id"])
+                    nuevos.append(registro)
+        if not nuevos:
+            return
+        crudo = pd.DataFrame.from_records(nuevos, columns=COLUMNAS)
+        limpio, rechazados = validar_columnas(crudo, patron_titulo=patron_titulo, puntaje_min=0, puntaje_max=10,
+                                              conservar=["id", "vote_count", "genre_ids"])
+        rechazadas[0] += len(rechazados)
+        if not limpio.empty:
+            emitir((llegada, limpio[COLUMNAS]))
+
+    def acumular(elemento, emitir):
+        acumulador.agregar(elemento[1]["vote_average"])
+        emitir(elemento)
+
+    with open(ruta_csv, "w", encoding="utf-8", newline="") as csv, \
+            open(ruta_jsonl, "w", encoding="utf-8") as jsonl:
+        primera = [True]
+
+        def escribir(elemento, emitir):
+            llegada, bloque = elemento
+            bloque = bloque.assign(release_date=bloque["release_date"].dt.strftime("%Y-%m-%d"))
+            bloque.drop(columns="genre_ids").to_csv(csv, header=primera[0], index=False)
+            primera[0] = False
+            for registro in bloque.to_dict("records"):
+                jsonl.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            ahora = time.perf_counter()
+            latencias.append(ahora - llegada)
+            if not primera_escritura:
+                primera_escritura.append(ahora - inicio)
+
+        inicio = time.perf_counter()
+        flujo = Flujo([
+            Etapa("descarga", descargar, hilos=hilos_descarga),
+            Etapa("validacion", validar, lote=lote),
+            Etapa("estadisticas", acumular),
+            Etapa("escritura", escribir),
+        ], capacidad=capacidad)
+        metricas = flujo.ejecutar((consulta, 1) for consulta in api.planificar(generos, modo))
+        segundos = time.perf_counter() - inicio
+
+    return {
+        "peliculas": acumulador.conteo,
+        "rechazadas": rechazadas[0],
+        "segundos": segundos,
+        "primera_escritura": primera_escritura[0] if primera_escritura else None,
+        "estadisticas": acumulador.resultado(),
+        "latencia_p50": _percentil(latencias, 50),
+        "latencia_p99": _percentil(latencias, 99),
+        "etapas": metricas,
+        "archivos": [ruta_csv, ruta_jsonl],
+    }
+
+
+def imprimir_resumen(resumen):
+    print(f"\nFlujo: {resumen['peliculas']} películas escritas en {resumen['segundos']:.2f}s "
+          f"({resumen['rechazadas']} descartadas) -> {', '.join(resumen['archivos'])}")
+    if resumen["latencia_p50"] is not None:
+        print(f"Latencia por bloque (de TMDb al archivo): p50 {resumen['latencia_p50'] * 1000:.0f} ms, "
+              f"p99 {resumen['latencia_p99'] * 1000:.0f} ms")
+    # El pico de memoria por etapa sólo se mide con la instrumentación activa (main.py --memoria)
+    memoria = {}
+    if instrumentacion.activa():
+        datos = instrumentacion.reporte()
+        if datos["memoria_medida"]:
+            memoria = {e["nombre"]: e["memoria_pico"] for e in datos["etapas"]}
+    for e in resumen["etapas"]:
+        pico = memoria.get(f"flujo.{e['etapa']}")
+        extra = f", pico +{pico / 1024 / 1024:.1f} MB" if pico is not None else ""
+        print(f"- {e['etapa']}: {e['entradas']} entradas, trabajo {e['segundos_trabajo']:.2f}s, "
+              f"esperando {e['segundos_espera_entrada']:.2f}s, bloqueada {e['segundos_bloqueada_salida']:.2f}s, "
+              f"cola máx. {e['cola_salida_max']}{extra}")
+
+
+def _todo_junto(api, generos, desde, hasta, carpeta, hilos_descarga=4, max_paginas=500):
+    """Lo de antes: descarga todas las páginas, luego valida, calcula y escribe de una vez."""
+    from concurrent.futures import ThreadPoolExecutor
+    import pandas as pd
+    from validacion import validar_columnas
+    from estadisticas import AcumuladorEstadisticas
+
+    inicio = time.perf_counter()
+    consultas = api.planificar(generos, "union")
+    with ThreadPoolExecutor(hilos_descarga) as ejecutor:
+        primeras = list(ejecutor.map(lambda c: api.pagina_discover(c, desde, hasta, 1), consultas))
+        tareas = [(c, p) for c, datos in zip(consultas, primeras)
+                  for p in range(2, min(datos.get("total_pages", 1), max_paginas) + 1)]
+        resto = list(ejecutor.map(lambda t: api.pagina_discover(t[0], desde, hasta, t[1]), tareas))
+    registros = a_dicts(proyectar([r for datos in primeras + resto for r in datos.get("results", [])]))
+    crudo = pd.DataFrame.from_records(registros, columns=COLUMNAS).drop_duplicates("id")
+    limpio, _ = validar_columnas(crudo, puntaje_min=0, puntaje_max=10, conservar=["id", "vote_count", "genre_ids"])
+    acumulador = AcumuladorEstadisticas().agregar(limpio["vote_average"])
+    limpio = limpio[COLUMNAS].assign(release_date=limpio["release_date"].dt.strftime("%Y-%m-%d"))
+    os.makedirs(carpeta, exist_ok=True)
+    limpio.drop(columns="genre_ids").to_csv(os.path.join(carpeta, "peliculas.csv"), index=False)
+    with open(os.path.join(carpeta, "peliculas.jsonl"), "w", encoding="utf-8") as f:
+        for registro in limpio.to_dict("records"):
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    segundos = time.perf_counter() - inicio
+    # Nada se escribe hasta que llegó la última página
+    return {"peliculas": acumulador.conteo, "segundos": segundos, "primera_escritura": segundos}
+
+
+def benchmark(n_peliculas=20_000, latencia=0.01, hilos_descarga=4, carpeta="benchmark_flujo"):
+    """Compara el flujo por etapas con descargar todo y después procesar, contra el servidor TMDb local.
+
+    Mide el tiempo total, cuánto tarda en quedar escrita la primera fila y el pico de
+    memoria (tracemalloc) de cada forma.
+    """
+    import tracemalloc
+    import importlib
+    from servidor_tmdb_local import ServidorTMDbLocal, GENEROS_TMDB
+
+    codigo_final = importlib.import_module("codigo-final")
+    generos = [g["id"] for g in GENEROS_TMDB]
+    resultados = {}
+    with ServidorTMDbLocal(n_peliculas=n_peliculas, latencia=latencia) as servidor:
+        for nombre, correr in (
+            ("todo junto", lambda api: _todo_junto(api, generos, "1900-01-01", "2100-12-31",
+                                                   os.path.join(carpeta, "todo_junto"), hilos_descarga)),
+            ("flujo", lambda api: flujo_peliculas(api, generos, "1900-01-01", "2100-12-31",
+                                                  os.path.join(carpeta, "flujo"), hilos_descarga=hilos_descarga)),
+        ):
+            api = codigo_final.TMDbAPI(codigo_final.API_KEY, cache=False, catalogo=False, tasa=10_000,
+                                       rafaga=10_000, base_url=servidor.url)
+            resumen = correr(api)
+            # tracemalloc hace mucho más lento a pandas: la memoria se mide en otra corrida
+            tracemalloc.start()
+            correr(api)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            api.http.cerrar()
+            resultados[nombre] = {**resumen, "memoria_pico": pico}
+            print(f"{nombre}: {resumen['peliculas']} películas en {resumen['segundos']:.2f}s, primera fila escrita "
+                  f"a los {resumen['primera_escritura']:.2f}s, pico de memoria {pico / 1024 / 1024:.1f} MB")
+            if nombre == "flujo":
+                imprimir_resumen(resumen)
+    assert resultados["flujo"]["peliculas"] == resultados["todo junto"]["peliculas"]
+    return resultados
+
+
+if __name__ == "__main__":
+    benchmark()
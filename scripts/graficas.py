@@ -0,0 +1,337 @@
+import os
+import time
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Segundos que se quiere gastar como mucho en cada gráfica. Las vistas de detalle (una barra
+# o etiqueta por película) crecen con el número de películas; si no caben en el presupuesto
+# se usa una vista agregada (histograma, media por año, densidad) que tarda siempre lo mismo
+PRESUPUESTO_GRAFICA = 1.0
+
+# Por encima de este número de películas se agrega siempre, aunque la vista de detalle cupiera
+UMBRAL_AGREGADO = 1000
+
+# Costo estimado en modo detalle: una parte fija más un tanto por película (medido con
+# matplotlib 3.x). Son constantes: el modo de una gráfica depende sólo de cuántas películas
+# tiene, así que las mismas películas siempre se dibujan igual (y coinciden con la huella
+# de la etapa incremental y con lo que ya guardó el servicio)
+COSTO_BASE = 0.15
+COSTO_POR_PELICULA = {
+    "grafico_barras.png": 0.012,
+    "grafico_lineas.png": 0.010,
+    "grafico_dispersion.png": 0.0001,
+    "grafico_pastel.png": 0.0,
+}
+
+BINS_HISTOGRAMA = 20
+BINS_DENSIDAD_ANIOS = 60
+TOP_K_PASTEL = 5
+
+
+def _figura():
+    # Se usa la API orientada a objetos (Figure + savefig) en lugar de pyplot: no depende del
+    # backend interactivo, no comparte estado global y funciona igual dentro de otros procesos.
+    # matplotlib se carga al dibujar la primera gráfica, no al importar este módulo
+    from matplotlib.figure import Figure
+    return Figure()
+
+
+def _grafico_barras(titulos, puntuaciones):
+    pares = sorted(zip(titulos, puntuaciones), key=lambda p: p[1])
+    fig = _figura()
+    ax = fig.subplots()
+    ax.barh(range(len(pares)), [p[1] for p in pares], color='skyblue')
+    ax.set_yticks(range(len(pares)), labels=[p[0] for p in pares])
+    ax.set_title("Gráfico de Barras - Puntuaciones")
+    ax.set_xlabel("Puntuación")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def _grafico_lineas(titulos, puntuaciones):
+    fig = _figura()
+    ax = fig.subplots()
+    ax.plot(titulos, puntuaciones, marker='o', color='orange')
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.set_title("Gráfico de Líneas - Puntuaciones")
+    ax.set_ylabel("Puntuación")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def _grafico_dispersion(titulos, puntuaciones):
+    fig = _figura()
+    ax = fig.subplots()
+    ax.scatter(range(len(puntuaciones)), puntuaciones, c='red')
+    ax.set_title("Diagrama de Dispersión")
+    ax.set_xlabel("Película (índice)")
+    ax.set_ylabel("Puntuación")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def _grafico_pastel(titulos, puntuaciones):
+    top5 = sorted(zip(titulos, puntuaciones), key=lambda p: p[1], reverse=True)[:5]
+    fig = _figura()
+    ax = fig.subplots()
+    ax.pie([p[1] for p in top5], labels=[p[0] for p in top5], autopct='%1.1f%%')
+    ax.set_title("Top 5 Puntuaciones - Gráfico de Pastel")
+    fig.tight_layout()
+    return fig
+
+
+# Nombre de archivo -> función que dibuja la gráfica; el orden es el de la hoja "Gráficas"
+GRAFICAS = {
+    "grafico_barras.png": _grafico_barras,
+    "grafico_lineas.png": _grafico_lineas,
+    "grafico_dispersion.png": _grafico_dispersion,
+    "grafico_pastel.png": _grafico_pastel,
+}
+
+
+# --- Vistas agregadas: reciben los agregados ya calculados, su costo no depende de N ---------
+
+def _histograma(datos):
+    conteos, bordes, total = datos
+    fig = _figura()
+    ax = fig.subplots()
+    ax.bar(bordes[:-1], conteos, width=np.diff(bordes), align='edge', color='skyblue', edgecolor='white')
+    ax.set_title(f"Histograma de Puntuaciones ({total} películas)")
+    ax.set_xlabel("Puntuación")
+    ax.set_ylabel("Películas")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def _media_por_anio(datos):
+    anios, medias, desviaciones, total = datos
+    fig = _figura()
+    ax = fig.subplots()
+    if anios is None:
+        # Sin fechas: la curva de percentiles de las puntuaciones
+        ax.plot(np.arange(len(medias)), medias, color='orange')
+        ax.set_xlabel("Percentil")
+        ax.set_title(f"Puntuaciones por percentil ({total} películas)")
+    else:
+        ax.plot(anios, medias, marker='o', markersize=3, color='orange')
+        ax.fill_between(anios, medias - desviaciones, medias + desviaciones, color='orange', alpha=0.2)
+        ax.set_xlabel("Año")
+        ax.set_title(f"Puntuación media por año ± desviación ({total} películas)")
+    ax.set_ylabel("Puntuación")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def _densidad(datos):
+    densidad, bordes_x, bordes_y, etiqueta_x, total = datos
+    fig = _figura()
+    ax = fig.subplots()
+    malla = ax.pcolormesh(bordes_x, bordes_y, densidad.T, cmap='Reds')
+    fig.colorbar(malla, ax=ax, label="Películas")
+    ax.set_title(f"Densidad de Puntuaciones ({total} películas)")
+    ax.set_xlabel(etiqueta_x)
+    ax.set_ylabel("Puntuación")
+    fig.tight_layout()
+    return fig
+
+
+def _pastel_rangos(datos):
+    etiquetas, conteos = datos
+    fig = _figura()
+    ax = fig.subplots()
+    if conteos:
+        ax.pie(conteos, labels=etiquetas, autopct='%1.1f%%')
+    else:
+        ax.text(0.5, 0.5, "Sin películas", ha='center', va='center')
+        ax.set_axis_off()
+    ax.set_title("Películas por Rango de Puntuación")
+    fig.tight_layout()
+    return fig
+
+
+AGREGADAS = {
+    "grafico_barras.png": _histograma,
+    "grafico_lineas.png": _media_por_anio,
+    "grafico_dispersion.png": _densidad,
+    "grafico_pastel.png": _pastel_rangos,
+}
+
+
+def modo_grafica(nombre, n, presupuesto=PRESUPUESTO_GRAFICA, umbral=UMBRAL_AGREGADO):
+    """"detalle" si la vista por película cabe en el presupuesto de tiempo; si no, "agregado"."""
+    if n > umbral or COSTO_BASE + n * COSTO_POR_PELICULA[nombre] > presupuesto:
+        return "agregado"
+    return "detalle"
+
+
+def _agregar(nombre, puntuaciones, anios):
+    """Calcula (vectorizado) los agregados que dibuja la vista agregada de cada gráfica."""
+    x = np.asarray(puntuaciones, dtype=float)
+    validas = ~np.isnan(x)
+    # Las vistas por año sólo usan las películas con fecha; el histograma y el pastel, todas
+    con_anio = anios is not None and nombre in ("grafico_lineas.png", "grafico_dispersion.png")
+    if con_anio:
+        anios = np.asarray(anios, dtype=float)
+        validas &= ~np.isnan(anios)
+        anios = anios[validas].astype(np.int64)
+        con_anio = anios.size > 0
+    x = x[validas]
+    total = int(x.size)
+    rango = (min(0.0, x.min()), max(10.0, x.max())) if total else (0.0, 10.0)
+
+    if nombre == "grafico_barras.png":
+        conteos, bordes = np.histogram(x, bins=BINS_HISTOGRAMA, range=rango)
+        return conteos, bordes, total
+
+    if nombre == "grafico_lineas.png":
+        if not con_anio:
+            return None, np.percentile(x, np.arange(101)) if total else np.zeros(101), None, total
+        unicos, grupo = np.unique(anios, return_inverse=True)
+        conteo = np.bincount(grupo)
+        medias = np.bincount(grupo, weights=x) / conteo
+        varianzas = np.maximum(np.bincount(grupo, weights=x * x) / conteo - medias ** 2, 0.0)
+        return unicos, medias, np.sqrt(varianzas), total
+
+    if nombre == "grafico_dispersion.png":
+        if con_anio:
+            eje_x, etiqueta = anios, "Año"
+            bins_x = min(BINS_DENSIDAD_ANIOS, int(anios.max() - anios.min()) + 1)
+        else:
+            eje_x, etiqueta = np.arange(total), "Película (índice)"
+            bins_x = BINS_DENSIDAD_ANIOS
+        densidad, bordes_x, bordes_y = np.histogram2d(eje_x, x, bins=(max(bins_x, 1), BINS_HISTOGRAMA),
+                                                      range=(None if total else (0, 1), rango))
+        return densidad, bordes_x, bordes_y, etiqueta, total
+
+    # Pastel: los TOP_K_PASTEL rangos de un punto con más películas y el resto como "Otros"
+    piso = np.clip(np.floor(x), rango[0], rango[1] - 1).astype(np.int64)
+    inicio = int(rango[0])
+    conteos = np.bincount(piso - inicio)
+    orden = np.argsort(conteos, kind="stable")[::-1]
+    top = [i for i in orden[:TOP_K_PASTEL] if conteos[i]]
+    etiquetas = [f"{i + inicio}–{i + inicio + 1}" for i in top]
+    valores = [int(conteos[i]) for i in top]
+    otros = total - sum(valores)
+    if otros:
+        etiquetas.append("Otros")
+        valores.append(otros)
+    return etiquetas, valores
+
+
+def datos_de_grafica(nombre, titulos, puntuaciones, anios=None, presupuesto=PRESUPUESTO_GRAFICA):
+    """Lo que realmente dibuja cada gráfica, como `(modo, datos)`: si eso no cambia, la imagen tampoco.
+
+    En modo detalle son los títulos y puntuaciones que usa la gráfica; en modo agregado,
+    los agregados ya calculados (que son pocos, sin importar cuántas películas haya).
+    """
+    modo = modo_grafica(nombre, len(puntuaciones), presupuesto)
+    if modo == "agregado":
+        return modo, _agregar(nombre, puntuaciones, anios)
+    if nombre == "grafico_dispersion.png":
+        return modo, list(puntuaciones)
+    if nombre == "grafico_pastel.png":
+        return modo, sorted(zip(titulos, puntuaciones), key=lambda p: p[1], reverse=True)[:5]
+    return modo, (list(titulos), list(puntuaciones))
+
+
+def dibujar(nombre, modo, datos):
+    """Dibuja una gráfica a partir de datos_de_grafica y la devuelve como bytes PNG junto con lo que tardó."""
+    inicio = time.perf_counter()
+    if modo == "agregado":
+        fig = AGREGADAS[nombre](datos)
+    elif nombre == "grafico_dispersion.png":
+        fig = GRAFICAS[nombre]((), datos)
+    elif nombre == "grafico_pastel.png":
+        fig = GRAFICAS[nombre]([p[0] for p in datos], [p[1] for p in datos])
+    else:
+        fig = GRAFICAS[nombre](*datos)
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return nombre, buffer.getvalue(), time.perf_counter() - inicio
+
+
+def renderizar(nombre, titulos, puntuaciones, anios=None):
+    """Dibuja una gráfica (en detalle o agregada, según cuántas películas sean) y la devuelve como PNG."""
+    return dibujar(nombre, *datos_de_grafica(nombre, titulos, puntuaciones, anios))
+
+
+def anios_de(df):
+    """Años de estreno de un DataFrame (con NaN donde no hay fecha), o None si no trae fechas."""
+    if 'release_date' not in df:
+        return None
+    import pandas as pd
+
+    fechas = df['release_date']
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, format="%Y-%m-%d", errors="coerce")
+    return fechas.dt.year.to_numpy(dtype=float, na_value=np.nan)
+
+
+def anios_de_fechas(fechas):
+    """Años de una lista de fechas "AAAA-MM-DD" (NaN si falta o no empieza por un año), sin pandas."""
+    return [float(f[:4]) if isinstance(f, str) and f[:4].isdigit() else np.nan for f in fechas]
+
+
+def renderizar_graficas(df, procesos=None, carpeta=None, nombres=None, presupuesto=PRESUPUESTO_GRAFICA):
+    """Renderiza las cuatro gráficas (o sólo las de `nombres`), en paralelo si `procesos` > 1.
+
+    Por defecto usa un proceso por núcleo (hasta uno por gráfica); con un solo núcleo
+    se dibujan en serie, porque arrancar procesos no ganaría nada. Con muchas películas
+    cada gráfica pasa a su vista agregada (ver PRESUPUESTO_GRAFICA), y a los procesos
+    sólo se envían los agregados.
+    Devuelve `(imagenes, tiempos)`: los PNG en memoria y los segundos de cada gráfica.
+    Si se indica `carpeta`, además se guardan los PNG en disco.
+    """
+    titulos = df['title'].tolist()
+    puntuaciones = df['vote_average'].tolist()
+    anios = anios_de(df)
+    nombres = list(GRAFICAS) if nombres is None else list(nombres)
+    preparados = {nombre: datos_de_grafica(nombre, titulos, puntuaciones, anios, presupuesto) for nombre in nombres}
+
+    if procesos is None:
+        procesos = min(len(nombres), os.cpu_count() or 1)
+    if procesos > 1 and len(nombres) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(nombres))) as ejecutor:
+            futuros = [ejecutor.submit(dibujar, nombre, *preparados[nombre]) for nombre in nombres]
+            resultados = [futuro.result() for futuro in futuros]
+    else:
+        resultados = [dibujar(nombre, *preparados[nombre]) for nombre in nombres]
+
+    imagenes = {nombre: png for nombre, png, _ in resultados}
+    tiempos = {nombre: segundos for nombre, _, segundos in resultados}
+
+    if carpeta is not None:
+        for nombre, png in imagenes.items():
+            with open(os.path.join(carpeta, nombre), "wb") as f:
+                f.write(png)
+    return imagenes, tiempos
+
+
+def benchmark(escalas=(50, 500, 5_000, 50_000), procesos=1):
+    """Tiempo de las cuatro gráficas a varias escalas: con las vistas agregadas casi no crece con N."""
+    import pandas as pd
+    from servidor_tmdb_local import generar_peliculas
+
+    catalogo = pd.DataFrame(generar_peliculas(max(escalas)))[['title', 'vote_average', 'release_date']]
+    renderizar_graficas(catalogo.head(10), procesos=1)
+    resultados = {}
+    for n in escalas:
+        df = catalogo.head(n)
+        modos = {nombre: modo_grafica(nombre, n) for nombre in GRAFICAS}
+        inicio = time.perf_counter()
+        _, tiempos = renderizar_graficas(df, procesos=procesos)
+        resultados[n] = time.perf_counter() - inicio
+        modos = ", ".join(f"{nombre[8:-4]} {modos[nombre]} {tiempos[nombre]:.2f}s" for nombre in GRAFICAS)
+        print(f"{n:>7} películas: {resultados[n]:.2f}s ({modos})")
+    return resultados
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,186 @@
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import threading
+import importlib.util
+
+# Carpeta (relativa a donde se ejecuta el script) con los artefactos de cada etapa
+CARPETA_ETAPAS = ".etapas"
+
+
+def _actualizar(h, objeto):
+    """Mete `objeto` en el hash de forma canónica según su tipo."""
+    tipo = type(objeto).__name__
+    h.update(tipo.encode())
+    if objeto is None or isinstance(objeto, (bool, int, float, str)):
+        h.update(repr(objeto).encode("utf-8"))
+    elif isinstance(objeto, (bytes, bytearray, memoryview)):
+        h.update(bytes(objeto))
+    elif callable(objeto) and hasattr(objeto, "__code__"):
+        # El código de la etapa también es entrada: si cambia la función, se rehace
+        try:
+            h.update(inspect.getsource(objeto).encode("utf-8"))
+        except (OSError, TypeError):
+            h.update(objeto.__code__.co_code)
+    elif type(objeto).__module__.startswith("pandas"):
+        import pandas as pd
+
+        # DataFrame o Series: nombres y tipos de columna más un hash por fila
+        columnas = objeto.columns if hasattr(objeto, "columns") else [objeto.name]
+        tipos = objeto.dtypes if hasattr(objeto, "columns") else [objeto.dtype]
+        h.update(json.dumps([str(c) for c in columnas]).encode("utf-8"))
+        h.update(json.dumps([str(t) for t in tipos]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(objeto, index=False).to_numpy().tobytes())
+    elif hasattr(objeto, "dtype") and hasattr(objeto, "tobytes"):
+        h.update(f"{objeto.dtype}{getattr(objeto, 'shape', '')}".encode())
+        h.update(objeto.tobytes())
+    elif isinstance(objeto, dict):
+        h.update(str(len(objeto)).encode())
+        for clave in sorted(objeto, key=repr):
+            _actualizar(h, clave)
+            _actualizar(h, objeto[clave])
+    elif isinstance(objeto, (list, tuple)):
+        h.update(str(len(objeto)).encode())
+        for elemento in objeto:
+            _actualizar(h, elemento)
+    else:
+        h.update(repr(objeto).encode("utf-8"))
+
+
+def huella(*entradas):
+    """Hash SHA-256 del contenido de las entradas (datos, parámetros y funciones)."""
+    h = hashlib.sha256()
+    for entrada in entradas:
+        _actualizar(h, entrada)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta, tam_bloque=1 << 20):
+    """Hash del contenido de un archivo, o de todos los archivos de una carpeta (p. ej. columnar)."""
+    h = hashlib.sha256()
+    rutas = [ruta]
+    if os.path.isdir(ruta):
+        rutas = sorted(os.path.join(base, nombre) for base, _, nombres in os.walk(ruta) for nombre in nombres)
+    for actual in rutas:
+        h.update(os.path.relpath(actual, ruta).encode("utf-8"))
+        with open(actual, "rb") as f:
+            while bloque := f.read(tam_bloque):
+                h.update(bloque)
+    return h.hexdigest()
+
+
+def fuentes(*modulos):
+    """Huella del código de los módulos dados por nombre (p. ej. "validacion"), sin importarlos.
+
+    La huella de una función sólo cubre su propio código, no el de lo que llama: las etapas
+    añaden `fuentes(...)` de los módulos de los que dependen para rehacerse si éstos cambian.
+    """
+    rutas = []
+    for modulo in modulos:
+        spec = importlib.util.find_spec(modulo)
+        if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+            raise ModuleNotFoundError(f"No se encontró el código del módulo {modulo!r}")
+        rutas.append(spec.origin)
+    return {modulo: huella_archivo(ruta) for modulo, ruta in zip(modulos, rutas)}
+
+
+def _firma(ruta):
+    estado = os.stat(ruta)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+class Incremental:
+    """Grafo de etapas con caché por contenido: una etapa sólo se rehace si cambia su huella.
+
+    La huella de cada etapa sale de sus entradas (datos y parámetros) y del código de la
+    función que la calcula. El resultado se guarda con pickle en `carpeta`; si la etapa
+    además escribe archivos, se comprueba que sigan ahí sin cambios antes de saltarla.
+    Con `activo=False` todas las etapas se ejecutan siempre (como antes).
+    """
+
+    def __init__(self, carpeta=CARPETA_ETAPAS, activo=True):
+        self.carpeta = carpeta
+        self.activo = activo
+        self.ejecutadas = []
+        self.omitidas = []
+        self._lock = threading.Lock()
+        self._ruta_manifiesto = os.path.join(carpeta, "manifiesto.json")
+        self._manifiesto = {}
+        if activo and os.path.exists(self._ruta_manifiesto):
+            try:
+                with open(self._ruta_manifiesto, encoding="utf-8") as f:
+                    self._manifiesto = json.load(f)
+            except (OSError, ValueError):
+                self._manifiesto = {}
+
+    def _ruta_artefacto(self, nombre, clave):
+        seguro = "".join(c if c.isalnum() or c in "-_." else "_" for c in nombre)
+        return os.path.join(self.carpeta, f"{seguro}-{clave[:16]}.pkl")
+
+    def vigente(self, nombre, clave):
+        """Indica si la etapa ya tiene guardado un resultado para esta huella (y sus archivos intactos)."""
+        registro = self._manifiesto.get(nombre)
+        if not self.activo or registro is None or registro["clave"] != clave:
+            return False
+        if not os.path.exists(self._ruta_artefacto(nombre, clave)):
+            return False
+        for ruta, firma in registro["archivos"].items():
+            if not os.path.exists(ruta) or _firma(ruta) != firma:
+                return False
+        return True
+
+    def cargar(self, nombre, clave):
+        with open(self._ruta_artefacto(nombre, clave), "rb") as f:
+            return pickle.load(f)
+
+    def buscar(self, nombre, clave):
+        """Resultado guardado de la etapa para esta huella, o None si hay que calcularla."""
+        if not self.vigente(nombre, clave):
+            return None
+        self.omitidas.append(nombre)
+        return self.cargar(nombre, clave)
+
+    def guardar(self, nombre, clave, resultado, archivos=()):
+        """Guarda el resultado de la etapa y la firma (tamaño y fecha) de los archivos que escribió."""
+        self.ejecutadas.append(nombre)
+        if not self.activo:
+            return
+        os.makedirs(self.carpeta, exist_ok=True)
+        with open(self._ruta_artefacto(nombre, clave), "wb") as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            anterior = self._manifiesto.get(nombre)
+            self._manifiesto[nombre] = {"clave": clave, "archivos": {ruta: _firma(ruta) for ruta in archivos}}
+            temporal = self._ruta_manifiesto + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._manifiesto, f, ensure_ascii=False, indent=4)
+            os.replace(temporal, self._ruta_manifiesto)
+        # Sólo se conserva el último artefacto de cada etapa
+        if anterior and anterior["clave"] != clave:
+            try:
+                os.remove(self._ruta_artefacto(nombre, anterior["clave"]))
+            except OSError:
+                pass
+
+    def etapa(self, nombre, entradas, calcular, archivos=()):
+        """Devuelve el resultado guardado de la etapa si su huella no cambió; si no, llama a `calcular()`.
+
+        `entradas` es una tupla con todo lo que determina el resultado (datos, parámetros,
+        la función misma y las `fuentes` de los módulos que usa) y `archivos` las rutas que
+        la etapa escribe.
+        """
+        clave = huella(*entradas)
+        if self.vigente(nombre, clave):
+            self.omitidas.append(nombre)
+            return self.cargar(nombre, clave)
+        resultado = calcular()
+        self.guardar(nombre, clave, resultado, archivos)
+        return resultado
+
+    def imprimir_resumen(self):
+        if self.omitidas:
+            print(f"Etapas sin cambios (desde {self.carpeta}): {', '.join(self.omitidas)}")
+        if self.ejecutadas:
+            print(f"Etapas ejecutadas: {', '.join(self.ejecutadas)}")
@@ -0,0 +1,364 @@
+import time
+
+import numpy as np
+
+from pelicula import Pelicula, mascara_generos, generos_de_mascara, GENERO_OTRO
+
+# Para desempatar películas con la misma similitud se suma la puntuación escalada por este
+# factor: dos similitudes de Jaccard distintas entre máscaras de 19 géneros difieren en
+# al menos 1 / 19², bastante más que 10 puntos * 1e-4
+_DESEMPATE = 1e-4
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    # NumPy < 2.0: se cuentan los bits de cada byte con una tabla
+    _BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x):
+        x = np.ascontiguousarray(x, dtype=np.uint64)
+        return _BITS_POR_BYTE[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def _bits(mascara):
+    """Posiciones de los bits encendidos de una máscara (int)."""
+    return [bit for bit in range(mascara.bit_length()) if mascara >> bit & 1]
+
+
+def nombres_de_generos(generos):
+    """Convierte la lista de TMDbAPI.obtener_generos() en un dict id -> nombre (también acepta un dict); GENERO_OTRO se llama "Otros"."""
+    if isinstance(generos, dict):
+        return {GENERO_OTRO: "Otros", **generos}
+    return {GENERO_OTRO: "Otros", **{g["id"]: g["name"] for g in generos or ()}}
+
+
+class IndiceGeneros:
+    """Índice en memoria para filtrar películas por géneros, fechas y puntuación sin la API.
+
+    Los géneros de cada película son una máscara de bits (la de pelicula.py) y la fecha y
+    la puntuación van en arreglos paralelos, así que cada filtro es una operación
+    vectorizada sobre todo el catálogo; los filtros por género usan además un mapa de
+    bits con un plano por género. `similares` ordena por similitud de Jaccard entre
+    las máscaras: |A ∩ B| / |A ∪ B|, contando bits con popcount.
+
+    Además las películas se agrupan por máscara (hay a lo más unos miles de combinaciones
+    de géneros distintas), cada grupo ordenado de mejor a peor puntuación: las consultas
+    sólo por géneros (`contar`, `buscar` con top_n, `similares` sin filtros) trabajan
+    sobre los grupos y no sobre cada película.
+    """
+
+    def __init__(self, ids, mascaras, fechas, puntuaciones, titulos=None, nombres_generos=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.mascaras = np.asarray(mascaras, dtype=np.uint64)
+        self.fechas = np.asarray(fechas, dtype="datetime64[D]")
+        self.puntuaciones = np.asarray(puntuaciones, dtype=np.float64)
+        self.titulos = titulos
+        self.nombres_generos = nombres_de_generos(nombres_generos)
+        self._posiciones = None
+        # Mapa de bits por género: el plano b tiene un bit por película (packbits) que dice si
+        # tiene el género del bit b. `filtrar` combina los planos de los géneros pedidos
+        # (n/8 bytes cada uno) en lugar de recorrer las n máscaras de 8 bytes
+        bits = int(self.mascaras.max()).bit_length() if len(self) else 0
+        self._planos = np.empty((bits, (len(self) + 7) // 8), dtype=np.uint8)
+        for bit in range(bits):
+            self._planos[bit] = np.packbits((self.mascaras & np.uint64(1 << bit)) != 0)
+        # Cantidad de géneros de cada película, para la unión en Jaccard
+        self._tamanios = _popcount(self.mascaras)
+
+        # Filas ordenadas por (máscara, puntuación descendente); lexsort deja los NaN al final
+        self._orden = np.lexsort((-self.puntuaciones, self.mascaras))
+        self._grupos, self._inicios, self._conteos = np.unique(self.mascaras[self._orden], return_index=True,
+                                                              return_counts=True)
+        self._tamanios_grupo = _popcount(self._grupos)
+        # Películas con puntuación de cada grupo (las primeras del tramo)
+        self._con_puntaje = np.add.reduceat(~np.isnan(self.puntuaciones[self._orden]), self._inicios) \
+            if len(self) else np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def desde_peliculas(cls, peliculas, nombres_generos=None):
+        """Arma el índice desde dicts de TMDb o registros compactos (Pelicula)."""
+        from columnar import fechas_dia
+
+        peliculas = list(peliculas)
+        return cls(
+            ids=[p["id"] for p in peliculas],
+            mascaras=np.array([p.generos if isinstance(p, Pelicula) else mascara_generos(p.get("genre_ids", ()))
+                               for p in peliculas], dtype=np.uint64),
+            fechas=fechas_dia([p.get("release_date") for p in peliculas]),
+            puntuaciones=np.array([p.get("vote_average") for p in peliculas], dtype=np.float64),
+            titulos=[p.get("title") for p in peliculas],
+            nombres_generos=nombres_generos,
+        )
+
+    @classmethod
+    def desde_json(cls, ruta, nombres_generos=None):
+        """Lee un volcado JSON o JSON Lines (como data/peliculas_resultado.json)."""
+        from lectura_json import iterar_peliculas
+
+        return cls.desde_peliculas(iterar_peliculas(ruta), nombres_generos)
+
+    @classmethod
+    def desde_catalogo(cls, catalogo, nombres_generos=None):
+        """Arma el índice con todas las películas del catálogo local (CatalogoPeliculas)."""
+        return cls.desde_peliculas(catalogo.todas(), nombres_generos)
+
+    @classmethod
+    def desde_columnar(cls, ruta, nombres_generos=None):
+        """Usa directamente las columnas de un archivo columnar (los géneros ya vienen como máscara)."""
+        from columnar import TablaColumnar
+
+        tabla = TablaColumnar(ruta)
+        return cls(tabla["id"], tabla["generos"], tabla["release_date"], tabla["vote_average"],
+                   titulos=tabla["title"] if "title" in tabla else None, nombres_generos=nombres_generos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _por_generos(mascaras, alguno=None, todos=None, ninguno=None):
+        seleccion = np.ones(len(mascaras), dtype=bool)
+        if alguno is not None:
+            seleccion &= (mascaras & np.uint64(mascara_generos(alguno))) != 0
+        if todos is not None:
+            buscada = np.uint64(mascara_generos(todos))
+            seleccion &= (mascaras & buscada) == buscada
+        if ninguno is not None:
+            seleccion &= (mascaras & np.uint64(mascara_generos(ninguno))) == 0
+        return seleccion
+
+    def filtrar(self, alguno=None, todos=None, ninguno=None, desde=None, hasta=None,
+                puntaje_min=None, puntaje_max=None):
+        """Máscara booleana de las películas que cumplen todas las condiciones dadas.
+
+        `alguno`: tiene al menos uno de esos géneros; `todos`: los tiene todos; `ninguno`:
+        no tiene ninguno. Las fechas son textos YYYY-MM-DD (o datetime64) inclusive.
+        """
+        seleccion = self._por_planos(alguno, todos, ninguno)
+        if desde is not None:
+            seleccion &= self.fechas >= np.datetime64(desde, "D")
+        if hasta is not None:
+            seleccion &= self.fechas <= np.datetime64(hasta, "D")
+        if puntaje_min is not None:
+            seleccion &= self.puntuaciones >= puntaje_min
+        if puntaje_max is not None:
+            seleccion &= self.puntuaciones <= puntaje_max
+        return seleccion
+
+    def _plano(self, bit, relleno):
+        # Un género que ninguna película tiene no tiene plano: equivale a uno lleno de ceros
+        return self._planos[bit] if bit < len(self._planos) else relleno
+
+    def _por_planos(self, alguno=None, todos=None, ninguno=None):
+        """Lo mismo que `_por_generos(self.mascaras, ...)`, combinando los planos del mapa de bits."""
+        ceros = np.zeros(self._planos.shape[1], dtype=np.uint8)
+        empaquetada = np.full(self._planos.shape[1], 0xFF, dtype=np.uint8)
+        if alguno is not None:
+            alguno_bits = ceros.copy()
+            for bit in _bits(mascara_generos(alguno)):
+                alguno_bits |= self._plano(bit, ceros)
+            empaquetada &= alguno_bits
+        if todos is not None:
+            for bit in _bits(mascara_generos(todos)):
+                empaquetada &= self._plano(bit, ceros)
+        if ninguno is not None:
+            for bit in _bits(mascara_generos(ninguno)):
+                empaquetada &= ~self._plano(bit, ceros)
+        return np.unpackbits(empaquetada, count=len(self)).view(bool)
+
+    @staticmethod
+    def _solo_generos(filtros):
+        return all(clave in ("alguno", "todos", "ninguno") for clave in filtros)
+
+    def contar(self, **filtros):
+        """Cuántas películas pasan `filtrar(**filtros)`."""
+        if self._solo_generos(filtros):
+            return int(self._conteos[self._por_generos(self._grupos, **filtros)].sum())
+        return int(self.filtrar(**filtros).sum())
+
+    def _cabezas(self, grupos, cantidad, desde_final=False):
+        """Filas de las primeras (o últimas con puntuación) `cantidad` películas de cada grupo."""
+        if desde_final:
+            largos = np.minimum(self._con_puntaje[grupos], cantidad)
+            inicios = self._inicios[grupos] + self._con_puntaje[grupos] - largos
+        else:
+            largos = np.minimum(self._conteos[grupos], cantidad)
+            inicios = self._inicios[grupos]
+        # Posiciones inicio, inicio+1, ... de cada tramo, sin recorrer los grupos en Python
+        desplazamientos = np.arange(largos.sum()) - np.repeat(np.cumsum(largos) - largos, largos)
+        return self._orden[np.repeat(inicios, largos) + desplazamientos]
+
+    def buscar(self, top_n=None, mejor=True, **filtros):
+        """Filas de las películas que pasan `filtrar(**filtros)`, de mejor a peor puntuación."""
+        if top_n is not None and self._solo_generos(filtros):
+            # Ningún grupo aporta más de top_n películas, y sólo pueden aportar los top_n
+            # grupos cuya mejor (o peor) película es la más extrema
+            grupos = np.flatnonzero(self._por_generos(self._grupos, **filtros) & (self._con_puntaje > 0))
+            extremos = self._inicios[grupos] + (0 if mejor else self._con_puntaje[grupos] - 1)
+            claves = self.puntuaciones[self._orden[extremos]] * (1 if mejor else -1)
+            if len(grupos) > top_n:
+                grupos = grupos[claves >= np.partition(claves, len(claves) - top_n)[len(claves) - top_n]]
+            filas = self._cabezas(grupos, top_n, desde_final=not mejor)
+        else:
+            filas = np.flatnonzero(self.filtrar(**filtros))
+        filas = filas[~np.isnan(self.puntuaciones[filas])]
+        return self._top(filas, self.puntuaciones[filas] if mejor else -self.puntuaciones[filas], top_n)
+
+    @staticmethod
+    def _top(filas, claves, k):
+        # argpartition deja los k mayores en O(n); sólo esos se ordenan
+        if k is not None and k < len(filas):
+            parte = np.argpartition(-claves, k)[:k]
+            filas, claves = filas[parte], claves[parte]
+        return filas[np.argsort(-claves, kind="stable")]
+
+    def fila(self, id_pelicula):
+        if self._posiciones is None:
+            self._posiciones = {int(i): fila for fila, i in enumerate(self.ids)}
+        try:
+            return self._posiciones[int(id_pelicula)]
+        except KeyError:
+            raise KeyError(f"No hay ninguna película con id {id_pelicula} en el índice") from None
+
+    @staticmethod
+    def _jaccard(mascaras, tamanios, mascara):
+        mascara = np.uint64(mascara)
+        comunes = _popcount(mascaras & mascara).astype(np.float64)
+        union = tamanios.astype(np.float64) + float(_popcount(mascara)) - comunes
+        return np.divide(comunes, union, out=np.zeros(len(mascaras)), where=union > 0)
+
+    def jaccard(self, mascara):
+        """Similitud de Jaccard entre la máscara dada y la de cada película (0 si ambas están vacías)."""
+        return self._jaccard(self.mascaras, self._tamanios, mascara)
+
+    def similares(self, id_pelicula=None, generos=None, k=10, **filtros):
+        """Las `k` películas con géneros más parecidos a los de `id_pelicula` (o a la lista `generos`).
+
+        Devuelve `(filas, similitudes)`; a igual similitud gana la mejor puntuación. La
+        película de referencia no se incluye. Acepta los mismos filtros que `filtrar`.
+        """
+        if id_pelicula is not None:
+            referencia = self.fila(id_pelicula)
+            mascara = self.mascaras[referencia]
+        else:
+            referencia = None
+            mascara = mascara_generos(generos or ())
+
+        if self._solo_generos(filtros):
+            similitud_grupos = self._jaccard(self._grupos, self._tamanios_grupo, mascara)
+            candidatos = self._por_generos(self._grupos, **filtros)
+            # Se recorren los grupos de más a menos parecidos hasta juntar k + 1 películas;
+            # los grupos empatados con el último también entran (desempata la puntuación)
+            orden = np.flatnonzero(candidatos)[np.argsort(-similitud_grupos[candidatos], kind="stable")]
+            acumuladas = np.cumsum(self._conteos[orden])
+            corte = min(int(np.searchsorted(acumuladas, k + 1)), len(orden) - 1)
+            if len(orden):
+                candidatos &= similitud_grupos >= similitud_grupos[orden[corte]]
+            filas = self._cabezas(np.flatnonzero(candidatos), k + 1)
+        else:
+            filas = np.flatnonzero(self.filtrar(**filtros))
+        if referencia is not None:
+            filas = filas[filas != referencia]
+        similitud = self._jaccard(self.mascaras[filas], self._tamanios[filas], mascara)
+        claves = similitud + np.nan_to_num(self.puntuaciones[filas]) * _DESEMPATE
+        orden = self._top(np.arange(len(filas)), claves, k)
+        return filas[orden], similitud[orden]
+
+    def describir(self, filas, similitudes=None):
+        """Convierte filas del índice en dicts con los nombres de los géneros (de obtener_generos)."""
+        filas = np.asarray(filas, dtype=np.int64)
+        resultado = []
+        for n, fila in enumerate(filas.tolist()):
+            generos = generos_de_mascara(int(self.mascaras[fila]))
+            fecha = self.fechas[fila]
+            registro = {
+                "id": int(self.ids[fila]),
+                "title": self.titulos[fila] if self.titulos is not None else None,
+                "release_date": None if np.isnat(fecha) else str(fecha),
+                "vote_average": float(self.puntuaciones[fila]),
+                "generos": [self.nombres_generos.get(g, g) for g in generos],
+            }
+            if similitudes is not None:
+                registro["similitud"] = float(similitudes[n])
+            resultado.append(registro)
+        return resultado
+
+
+def imprimir_similares(indice, id_pelicula, k=10):
+    """Muestra las `k` películas del índice con géneros más parecidos a los de `id_pelicula`."""
+    try:
+        filas, similitudes = indice.similares(id_pelicula, k=k)
+    except KeyError as e:
+        print(e.args[0])
+        return
+    referencia = indice.describir([indice.fila(id_pelicula)])[0]
+    print(f"\nPelículas parecidas a {referencia['title']} ({', '.join(map(str, referencia['generos']))}), "
+          f"entre {len(indice)} del catálogo local:")
+    for i, p in enumerate(indice.describir(filas, similitudes), 1):
+        print(f"{i}. {p['title']} ({p['release_date']}, puntuación {p['vote_average']}) - "
+              f"similitud {p['similitud']:.2f}: {', '.join(map(str, p['generos']))}")
+
+
+def benchmark(n=1_000_000, consultas=200, semilla=0):
+    """Mide filtros y búsquedas de similares sobre `n` películas sintéticas (sin la API)."""
+    from servidor_tmdb_local import GENEROS_TMDB
+    from pelicula import IDS_GENEROS_TMDB
+
+    rng = np.random.default_rng(semilla)
+    # Entre 1 y 4 géneros por película, como en servidor_tmdb_local.generar_peliculas
+    bits = np.zeros(n, dtype=np.uint64)
+    for _ in range(4):
+        elegido = np.uint64(1) << rng.integers(0, len(IDS_GENEROS_TMDB), n).astype(np.uint64)
+        bits |= np.where(rng.random(n) < 0.6, elegido, np.uint64(0))
+    bits[bits == 0] = np.uint64(1)
+    inicio = time.perf_counter()
+    indice = IndiceGeneros(np.arange(1, n + 1), bits,
+                           np.datetime64("1950-01-01") + rng.integers(0, 75 * 365, n).astype("timedelta64[D]"),
+                           rng.uniform(1, 9.5, n).round(3), nombres_generos=GENEROS_TMDB)
+    construccion = time.perf_counter() - inicio
+
+    ids = list(IDS_GENEROS_TMDB)
+    tiempos = {"filtrar (máscara completa)": [], "contar": [], "buscar top 20": [], "similares top 10": []}
+    for _ in range(consultas):
+        generos = rng.choice(ids, size=int(rng.integers(1, 4)), replace=False).tolist()
+        tipo = ("alguno", "todos", "ninguno")[int(rng.integers(0, 3))]
+        for nombre, consulta in (("filtrar (máscara completa)", lambda: indice.filtrar(**{tipo: generos})),
+                                 ("contar", lambda: indice.contar(**{tipo: generos})),
+                                 ("buscar top 20", lambda: indice.buscar(20, **{tipo: generos}))):
+            inicio = time.perf_counter()
+            consulta()
+            tiempos[nombre].append(time.perf_counter() - inicio)
+        assert indice.contar(**{tipo: generos}) == int(indice.filtrar(**{tipo: generos}).sum())
+        assert np.array_equal(indice.filtrar(**{tipo: generos}), indice._por_generos(indice.mascaras, **{tipo: generos}))
+        referencia = int(rng.integers(1, n + 1))
+        inicio = time.perf_counter()
+        filas, similitudes = indice.similares(referencia, k=10)
+        tiempos["similares top 10"].append(time.perf_counter() - inicio)
+
+    # Las búsquedas por grupos deben dar lo mismo que recorrer todas las películas
+    todas = np.arange(n)
+    similitud = indice.jaccard(indice.mascaras[referencia - 1])
+    todas = todas[todas != referencia - 1]
+    claves = similitud[todas] + indice.puntuaciones[todas] * _DESEMPATE
+    assert np.array_equal(np.sort(claves)[::-1][:10], np.sort(similitudes + indice.puntuaciones[filas] * _DESEMPATE)[::-1])
+    directo = np.sort(indice.puntuaciones[indice.filtrar(alguno=generos)])
+    assert np.array_equal(indice.puntuaciones[indice.buscar(20, alguno=generos)], directo[::-1][:20])
+    assert np.array_equal(indice.puntuaciones[indice.buscar(20, mejor=False, alguno=generos)], directo[:20])
+
+    # Jaccard con popcount contra sets de Python en una muestra
+    muestra = rng.choice(n, size=2000, replace=False)
+    referencia = set(generos_de_mascara(int(indice.mascaras[0])))
+    for fila in muestra.tolist():
+        otros = set(generos_de_mascara(int(indice.mascaras[fila])))
+        esperado = len(referencia & otros) / len(referencia | otros)
+        assert abs(indice.jaccard(indice.mascaras[0])[fila] - esperado) < 1e-12
+
+    print(f"Índice de {n} películas ({len(indice._grupos)} combinaciones de géneros) armado en "
+          f"{construccion * 1000:.0f} ms; mediana por consulta:")
+    for tipo, valores in tiempos.items():
+        print(f"- {tipo}: {np.median(valores) * 1000:.2f} ms")
+    print(indice.describir(filas[:3], similitudes[:3]))
+    return {tipo: float(np.median(valores)) for tipo, valores in tiempos.items()}
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,202 @@
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Mientras esté desactivada, etapa() devuelve este contexto vacío y medir() llama directo a la función
+_NULO = nullcontext()
+
+
+class _Estado:
+    def __init__(self):
+        self.activa = False
+        self.memoria = False
+        self.perfil = None
+        self.inicio = 0.0
+        self.etapas = {}
+        self.abiertas = []
+        self.peticiones = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.pilas = threading.local()
+
+
+_estado = _Estado()
+
+
+def activa():
+    return _estado.activa
+
+
+def activar(memoria=False, perfil=False):
+    """Empieza a registrar etapas; con `memoria` mide el pico por etapa y con `perfil` corre cProfile.
+
+    La memoria se mide con tracemalloc, que hace bastante más lento el código que reserva
+    mucha memoria (matplotlib, pandas), por eso va aparte de los tiempos.
+    """
+    global _estado
+    _estado = _Estado()
+    _estado.memoria = memoria
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if perfil:
+        _estado.perfil = cProfile.Profile()
+        _estado.perfil.enable()
+    _estado.inicio = time.perf_counter()
+    _estado.activa = True
+
+
+def desactivar():
+    _estado.activa = False
+    if _estado.perfil is not None:
+        _estado.perfil.disable()
+    if _estado.memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _pila():
+    pila = getattr(_estado.pilas, "etapas", None)
+    if pila is None:
+        pila = _estado.pilas.etapas = []
+    return pila
+
+
+@contextmanager
+def _etapa_activa(nombre):
+    registro = {"segundos": 0.0, "peticiones": 0, "bytes": 0, "pico": 0}
+    pila = _pila()
+    if _estado.memoria:
+        actual, pico = tracemalloc.get_traced_memory()
+        # El pico de la etapa de afuera hasta ahora se guarda antes de reiniciar el contador
+        if pila:
+            pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+        tracemalloc.reset_peak()
+        registro["base"] = actual
+    pila.append(registro)
+    with _estado.lock:
+        _estado.abiertas.append(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        segundos = time.perf_counter() - inicio
+        memoria = 0
+        if _estado.memoria:
+            registro["pico"] = max(registro["pico"], tracemalloc.get_traced_memory()[1])
+            memoria = registro["pico"] - registro["base"]
+        pila.pop()
+        if pila:
+            pila[-1]["pico"] = max(pila[-1]["pico"], registro["pico"])
+        with _estado.lock:
+            _estado.abiertas.remove(registro)
+            total = _total(nombre)
+            total["llamadas"] += 1
+            total["segundos"] += segundos
+            total["peticiones"] += registro["peticiones"]
+            total["bytes"] += registro["bytes"]
+            total["memoria_pico"] = max(total["memoria_pico"], memoria)
+
+
+def _total(nombre):
+    return _estado.etapas.setdefault(nombre, {"llamadas": 0, "segundos": 0.0, "peticiones": 0, "bytes": 0,
+                                              "memoria_pico": 0})
+
+
+def etapa(nombre):
+    """Contexto que mide tiempo, peticiones, bytes y pico de memoria de un bloque de código.
+
+    El pico de memoria es lo que llegó a crecer la memoria de Python por encima de la que
+    había al entrar a la etapa.
+
+    Las etapas se pueden anidar; el tiempo y las peticiones de una etapa incluyen las de
+    sus etapas internas. Las peticiones hechas desde otros hilos cuentan para todas las
+    etapas abiertas en ese momento. tracemalloc es global, así que con etapas abiertas en
+    varios hilos a la vez el pico de memoria es aproximado.
+    """
+    if not _estado.activa:
+        return _NULO
+    return _etapa_activa(nombre)
+
+
+def medir(nombre):
+    """Decorador: cada llamada a la función se registra como la etapa `nombre`."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _estado.activa:
+                return funcion(*args, **kwargs)
+            with _etapa_activa(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def contar_peticion(num_bytes):
+    """Suma una petición HTTP (y los bytes de su cuerpo) a las etapas abiertas."""
+    if not _estado.activa:
+        return
+    with _estado.lock:
+        _estado.peticiones += 1
+        _estado.bytes += num_bytes
+        for registro in _estado.abiertas:
+            registro["peticiones"] += 1
+            registro["bytes"] += num_bytes
+
+
+def registrar(nombre, segundos):
+    """Añade un tiempo medido por fuera (por ejemplo, en otro proceso) como una etapa más."""
+    if not _estado.activa:
+        return
+    with _estado.lock:
+        total = _total(nombre)
+        total["llamadas"] += 1
+        total["segundos"] += segundos
+
+
+def reporte(max_funciones=25):
+    """Devuelve las métricas acumuladas (y las funciones más costosas si hubo cProfile)."""
+    with _estado.lock:
+        etapas = [{"nombre": nombre, **datos} for nombre, datos in _estado.etapas.items()]
+    resultado = {
+        "segundos_totales": time.perf_counter() - _estado.inicio,
+        "peticiones": _estado.peticiones,
+        "bytes": _estado.bytes,
+        "memoria_medida": _estado.memoria,
+        "etapas": etapas,
+    }
+    if _estado.perfil is not None:
+        estadisticas = pstats.Stats(_estado.perfil, stream=io.StringIO())
+        funciones = sorted(estadisticas.stats.items(), key=lambda item: item[1][3], reverse=True)
+        resultado["perfil"] = [
+            {"funcion": f"{archivo}:{linea}({nombre})", "llamadas": llamadas,
+             "segundos_propios": propios, "segundos_acumulados": acumulados}
+            for (archivo, linea, nombre), (_, llamadas, propios, acumulados, _) in funciones[:max_funciones]
+        ]
+    return resultado
+
+
+def guardar_reporte(ruta, ruta_perfil=None):
+    """Escribe el reporte JSON; si hubo cProfile y se indica `ruta_perfil`, guarda también el .prof."""
+    if _estado.perfil is not None:
+        _estado.perfil.disable()
+        if ruta_perfil:
+            _estado.perfil.dump_stats(ruta_perfil)
+    datos = reporte()
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=4)
+    return datos
+
+
+def imprimir_resumen():
+    datos = reporte()
+    print(f"\nInstrumentación: {datos['segundos_totales']:.2f}s, {datos['peticiones']} peticiones, "
+          f"{datos['bytes'] / 1024:.0f} KB descargados")
+    for e in datos["etapas"]:
+        memoria = f", pico +{e['memoria_pico'] / 1024 / 1024:.1f} MB" if _estado.memoria else ""
+        print(f"- {e['nombre']}: {e['segundos']:.3f}s en {e['llamadas']} llamada(s), "
+              f"{e['peticiones']} peticiones{memoria}")
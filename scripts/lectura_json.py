@@ -0,0 +1,111 @@
+import json
+from itertools import islice
+
+ESPACIOS = " \t\r\n"
+
+
+def iterar_json_array(ruta, tam_bloque=1 << 16):
+    """Generador que recorre un arreglo JSON grande elemento por elemento.
+
+    Lee el archivo en bloques de `tam_bloque` caracteres, así la memoria no depende del
+    tamaño del archivo sino del elemento más grande.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta, "r", encoding="utf-8") as f:
+        buffer = f.read(tam_bloque).lstrip("\ufeff")
+        pos = 0
+        estado = "inicio"  # inicio -> valor_o_cierre -> coma_o_cierre -> valor -> ... -> fin
+        while True:
+            if pos > tam_bloque:
+                buffer, pos = buffer[pos:], 0
+
+            # Saltar espacios, leyendo más si el buffer se acaba
+            while True:
+                while pos < len(buffer) and buffer[pos] in ESPACIOS:
+                    pos += 1
+                if pos < len(buffer):
+                    break
+                bloque = f.read(tam_bloque)
+                if not bloque:
+                    if estado == "fin":
+                        return
+                    raise ValueError(f"JSON incompleto en {ruta}: falta cerrar el arreglo")
+                buffer, pos = bloque, 0
+
+            caracter = buffer[pos]
+            if estado == "inicio":
+                if caracter != "[":
+                    raise ValueError(f"{ruta} no contiene un arreglo JSON")
+                pos += 1
+                estado = "valor_o_cierre"
+            elif estado == "coma_o_cierre":
+                if caracter == ",":
+                    pos += 1
+                    estado = "valor"
+                elif caracter == "]":
+                    pos += 1
+                    estado = "fin"
+                else:
+                    raise ValueError(f"Se esperaba ',' o ']' en {ruta}")
+            elif estado == "fin":
+                raise ValueError(f"Datos de más después del arreglo JSON en {ruta}")
+            elif caracter == "]" and estado == "valor_o_cierre":
+                pos += 1
+                estado = "fin"
+            else:
+                # Un valor puede quedar partido entre dos bloques (p. ej. "12" de "12.5"):
+                # sólo se acepta si después viene un separador; si no, se lee más y se reintenta
+                while True:
+                    try:
+                        valor, nuevo = decodificador.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        valor, nuevo = None, None
+                    if nuevo is not None and nuevo < len(buffer) and buffer[nuevo] in ESPACIOS + ",]":
+                        break
+                    bloque = f.read(tam_bloque)
+                    if not bloque:
+                        if nuevo is None:
+                            raise ValueError(f"JSON inválido o incompleto en {ruta}")
+                        break
+                    buffer, pos = buffer[pos:] + bloque, 0
+                yield valor
+                pos = nuevo
+                estado = "coma_o_cierre"
+
+
+def iterar_jsonl(ruta):
+    """Generador sobre un archivo JSON Lines (un objeto por línea)."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea:
+                yield json.loads(linea)
+
+
+def iterar_peliculas(ruta):
+    """Recorre un volcado de películas, ya sea un arreglo JSON o JSON Lines."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        inicio = f.read(256).lstrip("\ufeff" + ESPACIOS)
+    if inicio.startswith("["):
+        return iterar_json_array(ruta)
+    return iterar_jsonl(ruta)
+
+
+def agregar_jsonl(ruta, registros):
+    """Añade registros al final de un archivo JSON Lines y devuelve cuántos se escribieron."""
+    total = 0
+    with open(ruta, "a", encoding="utf-8") as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            total += 1
+    return total
+
+
+def en_bloques(registros, tamano):
+    """Agrupa un iterable en listas de a lo más `tamano` elementos."""
+    registros = iter(registros)
+    while True:
+        bloque = list(islice(registros, tamano))
+        if not bloque:
+            return
+        yield bloque
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from lectura_json import iterar_peliculas
+from graficas import renderizar_graficas
+from columnar import guardar_peliculas_columnar
+from detalles import CAMPOS_DETALLE
+
+# "codigo-final" lleva guion, así que se importa con importlib
+codigo_final = importlib.import_module("codigo-final")
+
+CARPETA_LOTE = "resultados_lote"
+
+
+def cargar_consultas(ruta):
+    """Lee las consultas del lote desde un arreglo JSON o un archivo JSON Lines.
+
+    Cada consulta es un objeto como:
+    {"nombre": "accion_90s", "generos": ["Acción", 12] o "todos", "desde": "1990-01-01",
+     "hasta": "1999-12-31", "orden": "mejores" | "peores", "top_n": 10, "modo": "union",
+     "detalles": true}
+    """
+    return list(iterar_peliculas(ruta))
+
+
+def resolver_generos(generos, disponibles):
+    """Convierte nombres o ids de género (o "todos") en ids de TMDb."""
+    if generos == "todos":
+        return [g["id"] for g in disponibles]
+    por_nombre = {g["name"].lower(): g["id"] for g in disponibles}
+    ids_validos = {g["id"] for g in disponibles}
+    ids = []
+    for genero in generos:
+        if isinstance(genero, int) and genero in ids_validos:
+            ids.append(genero)
+        elif isinstance(genero, str) and genero.lower() in por_nombre:
+            ids.append(por_nombre[genero.lower()])
+        else:
+            raise ValueError(f"Género desconocido: {genero!r}")
+    return ids
+
+
+def ejecutar_consulta(api, consulta, generos_disponibles, carpeta, detalles=False):
+    """Ejecuta una consulta del lote y escribe su JSON, CSV, copia columnar y Excel en su propia carpeta.
+
+    Los detalles de cada película se piden sólo con `detalles` o si la consulta trae "detalles": true.
+    """
+    nombre = consulta["nombre"]
+    tiempos = {"nombre": nombre}
+    inicio = time.perf_counter()
+
+    desde, hasta = consulta["desde"], consulta["hasta"]
+    if not codigo_final.RE_FECHA.match(desde) or not codigo_final.RE_FECHA.match(hasta):
+        raise ValueError(f"Fechas inválidas en la consulta {nombre!r}")
+    generos = resolver_generos(consulta["generos"], generos_disponibles)
+    mejor = consulta.get("orden", "mejores") != "peores"
+
+    peliculas = api.obtener_peliculas(generos, desde, hasta, int(consulta.get("top_n", 10)),
+                                      concurrente=True, modo=consulta.get("modo", "union"), mejor=mejor)
+    tiempos["descarga"] = time.perf_counter() - inicio
+    # Las películas que ya salieron en otra consulta del lote no se vuelven a pedir
+    marca = time.perf_counter()
+    if consulta.get("detalles", detalles):
+        peliculas = api.enriquecer(peliculas)
+    tiempos["detalles"] = time.perf_counter() - marca
+    tiempos["peliculas"] = len(peliculas)
+
+    destino = os.path.join(carpeta, nombre)
+    os.makedirs(destino, exist_ok=True)
+    marca = time.perf_counter()
+    with open(os.path.join(destino, "peliculas.json"), "w", encoding="utf-8") as f:
+        json.dump(peliculas, f, ensure_ascii=False, indent=4)
+    guardar_peliculas_columnar(os.path.join(destino, "peliculas.columnar"), peliculas)
+    if peliculas:
+        df = pd.DataFrame(peliculas)
+        df = df[['title', 'vote_average', 'release_date'] + [c for c in CAMPOS_DETALLE if c in df.columns]]
+        df.to_csv(os.path.join(destino, "peliculas.csv"), index=False, encoding="utf-8")
+        # Las consultas ya corren en paralelo: cada una dibuja sus gráficas en su propio hilo
+        imagenes, _ = renderizar_graficas(df, procesos=1)
+        codigo_final.guardar_en_excel(peliculas, imagenes, ruta=os.path.join(destino, "peliculas_analisis.xlsx"))
+    tiempos["exportacion"] = time.perf_counter() - marca
+    tiempos["total"] = time.perf_counter() - inicio
+    return tiempos
+
+
+def ejecutar_lote(ruta_consultas, carpeta=CARPETA_LOTE, max_consultas=4, offline=False, detalles=False):
+    """Ejecuta todas las consultas de un archivo en un solo proceso.
+
+    Todas comparten la misma instancia de TMDbAPI (sesión HTTP, caché y catálogo) y la
+    lista de géneros se pide una sola vez. Devuelve el resumen de tiempos por consulta,
+    que también se guarda en `carpeta/resumen.json`.
+    """
+    inicio = time.perf_counter()
+    api = codigo_final.TMDbAPI(codigo_final.API_KEY, offline=offline)
+    generos_disponibles = api.obtener_generos()
+    consultas = cargar_consultas(ruta_consultas)
+    os.makedirs(carpeta, exist_ok=True)
+
+    def ejecutar(consulta):
+        try:
+            return ejecutar_consulta(api, consulta, generos_disponibles, carpeta, detalles)
+        except Exception as e:
+            return {"nombre": consulta.get("nombre", "?"), "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max_consultas) as ejecutor:
+        resumen = list(ejecutor.map(ejecutar, consultas))
+
+    print(f"\n=== Lote: {len(consultas)} consultas en {time.perf_counter() - inicio:.2f}s ===")
+    for r in resumen:
+        if "error" in r:
+            print(f"- {r['nombre']}: ERROR {r['error']}")
+        else:
+            print(f"- {r['nombre']}: {r['peliculas']} películas, descarga {r['descarga']:.2f}s, "
+                  f"detalles {r['detalles']:.2f}s, exportación {r['exportacion']:.2f}s, total {r['total']:.2f}s")
+    api.http.imprimir_resumen()
+    api.detalles.imprimir_resumen()
+    if api.cache is not None:
+        api.cache.imprimir_resumen()
+
+    with open(os.path.join(carpeta, "resumen.json"), "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=4)
+    return resumen
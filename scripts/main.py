@@ -1,10 +1,90 @@
-from codigo-final import obtener_datos_peliculas, generar_graficas, guardar_en_excel
+import argparse
+import importlib
+
+import instrumentacion
+from incremental import Incremental
+from cache_respuestas import SinCacheError
+
+# "codigo-final" lleva guion, así que no se puede importar con una sentencia from ... import
+_codigo_final = importlib.import_module("codigo-final")
+obtener_datos_peliculas = _codigo_final.obtener_datos_peliculas
+generar_graficas = _codigo_final.generar_graficas
+guardar_en_excel = _codigo_final.guardar_en_excel
 
 def main():
-    datos = obtener_datos_peliculas()
+    parser = argparse.ArgumentParser(description="Análisis de películas de TMDb")
+    # --offline: sirve todo desde la caché en disco, sin tocar la red
+    parser.add_argument("--offline", action="store_true", help="usar sólo respuestas guardadas en la caché")
+    parser.add_argument("--lote", metavar="ARCHIVO", help="ejecutar sin preguntas las consultas de un archivo JSON/JSONL")
+    parser.add_argument("--flujo", action="store_true", help="descargar todas las películas de la consulta y escribirlas a CSV/JSONL mientras llegan")
+    parser.add_argument("--salida", help="carpeta de resultados del modo lote o flujo")
+    parser.add_argument("--concurrencia", type=int, default=4, help="consultas del lote en paralelo")
+    parser.add_argument("--detalles", action="store_true", help="añadir duración, presupuesto, director, reparto y palabras clave (una petición más por película)")
+    parser.add_argument("--servir", action="store_true", help="atender consultas por HTTP con una TMDbAPI siempre caliente")
+    parser.add_argument("--puerto", type=int, default=8765, help="puerto del modo servicio")
+    parser.add_argument("--similares", type=int, metavar="ID", help="películas del catálogo local con géneros más parecidos a la del id dado (sin la API)")
+    # Sin estas opciones la instrumentación queda apagada y no cuesta nada
+    parser.add_argument("--metricas", metavar="ARCHIVO", help="guardar un reporte JSON con tiempo, peticiones y memoria por etapa")
+    parser.add_argument("--memoria", action="store_true", help="medir también el pico de memoria por etapa (más lento)")
+    parser.add_argument("--perfil", metavar="ARCHIVO", help="perfilar además con cProfile y guardar las estadísticas (.prof)")
+    # Por defecto las gráficas y el Excel que no cambiaron se reutilizan de .etapas
+    parser.add_argument("--rehacer", action="store_true", help="rehacer todas las etapas aunque sus entradas no hayan cambiado")
+    args = parser.parse_args()
+
+    if args.metricas or args.memoria or args.perfil:
+        instrumentacion.activar(memoria=args.memoria, perfil=bool(args.perfil))
+    try:
+        ejecutar(args)
+    finally:
+        if instrumentacion.activa():
+            instrumentacion.imprimir_resumen()
+            instrumentacion.guardar_reporte(args.metricas or "metricas.json", args.perfil)
+            instrumentacion.desactivar()
+
+def ejecutar(args):
+    if args.servir:
+        from servicio_consultas import servir
+        servir(puerto=args.puerto, offline=args.offline)
+        return
+
+    if args.lote:
+        from lote import ejecutar_lote, CARPETA_LOTE
+        ejecutar_lote(args.lote, carpeta=args.salida or CARPETA_LOTE, max_consultas=args.concurrencia,
+                      offline=args.offline, detalles=args.detalles)
+        return
+
+    if args.similares is not None:
+        import requests
+        from indice_generos import IndiceGeneros, imprimir_similares
+        api = _codigo_final.TMDbAPI(_codigo_final.API_KEY, offline=args.offline)
+        # Los nombres de los géneros sólo adornan la salida: sin ellos se muestran los ids
+        try:
+            generos = api.obtener_generos()
+        except (SinCacheError, requests.RequestException):
+            generos = None
+        imprimir_similares(IndiceGeneros.desde_catalogo(api.catalogo, generos), args.similares)
+        return
+
+    if args.flujo:
+        from flujo import flujo_peliculas, imprimir_resumen, CARPETA_FLUJO
+        api = _codigo_final.TMDbAPI(_codigo_final.API_KEY, offline=args.offline)
+        generos, fecha_inicio, fecha_fin = _codigo_final.elegir_consulta(api)
+        resumen = flujo_peliculas(api, generos, fecha_inicio, fecha_fin, carpeta=args.salida or CARPETA_FLUJO,
+                                  hilos_descarga=args.concurrencia)
+        _codigo_final.imprimir_resumen_api(api)
+        imprimir_resumen(resumen)
+        return
+
+    try:
+        datos = obtener_datos_peliculas(offline=args.offline, detalles=args.detalles)
+    except SinCacheError:
+        print("Esta consulta no está en la caché: ejecútala una vez con conexión (sin --offline) antes de usar --offline.")
+        return
     if datos is not None:
-        generar_graficas(datos)
-        guardar_en_excel(datos)
+        etapas = Incremental(activo=not args.rehacer)
+        imagenes = generar_graficas(datos, incremental=etapas)
+        guardar_en_excel(datos, imagenes, incremental=etapas)
+        etapas.imprimir_resumen()
 
 if __name__ == "__main__":
     main()
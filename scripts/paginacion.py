@@ -0,0 +1,79 @@
+import heapq
+from itertools import count
+
+
+def paginar(obtener_pagina, max_paginas=500):
+    """Generador que pide las páginas de /discover bajo demanda y entrega los resultados de cada una."""
+    pagina = 1
+    while pagina <= max_paginas:
+        datos = obtener_pagina(pagina)
+        resultados = datos.get("results", [])
+        if not resultados:
+            return
+        yield resultados
+        if pagina >= datos.get("total_pages", pagina):
+            return
+        pagina += 1
+
+
+class TopN:
+    """Mantiene las N mejores (o peores) películas en un heap, sin duplicados por `id`.
+
+    La memoria es O(n): sólo se guardan las películas que están dentro del top.
+    """
+
+    def __init__(self, n, mejor=True, clave="vote_average"):
+        self.n = n
+        self.mejor = mejor
+        self.clave = clave
+        # La cima del heap es la película que saldría primero del top.
+        # En empates de puntuación pierde la que llegó después, igual que un sort estable.
+        self._heap = []
+        self._ids = set()
+        self._orden = count()
+
+    def _valor(self, pelicula):
+        return pelicula[self.clave] if self.mejor else -pelicula[self.clave]
+
+    def lleno(self):
+        return len(self._heap) >= self.n
+
+    def puede_entrar(self, pelicula):
+        """Indica si una película nueva todavía podría cambiar el top."""
+        return not self.lleno() or self._valor(pelicula) > self._heap[0][0]
+
+    def agregar(self, pelicula):
+        if self.n <= 0 or pelicula["id"] in self._ids or not self.puede_entrar(pelicula):
+            return False
+        entrada = (self._valor(pelicula), -next(self._orden), pelicula)
+        if self.lleno():
+            salida = heapq.heappushpop(self._heap, entrada)
+            self._ids.discard(salida[2]["id"])
+        else:
+            heapq.heappush(self._heap, entrada)
+        self._ids.add(pelicula["id"])
+        return True
+
+    def consumir(self, paginas):
+        """Consume páginas ya ordenadas por la clave y corta en cuanto el top ya no puede cambiar."""
+        for resultados in paginas:
+            for pelicula in resultados:
+                self.agregar(pelicula)
+            if resultados and self.lleno() and not self.puede_entrar(resultados[-1]):
+                # Las páginas siguientes vienen peor ordenadas: no hace falta pedirlas
+                if hasattr(paginas, "close"):
+                    paginas.close()
+                break
+        return self
+
+    def resultado(self):
+        """Devuelve el top ordenado de mejor a peor."""
+        return [entrada[2] for entrada in sorted(self._heap, key=lambda e: (e[0], e[1]), reverse=True)]
+
+    @classmethod
+    def combinar(cls, listas, n, mejor=True, clave="vote_average"):
+        """Une varios tops parciales (en orden) en uno solo de tamaño n."""
+        top = cls(n, mejor=mejor, clave=clave)
+        for lista in listas:
+            top.consumir([lista])
+        return top.resultado()
@@ -0,0 +1,21 @@
+# /discover/movie acepta listas de géneros en un solo parámetro:
+#   with_genres=28|12  -> películas de Acción O Aventura (unión)
+#   with_genres=28,12  -> películas de Acción Y Aventura (intersección)
+SEPARADORES = {"union": "|", "interseccion": ","}
+
+
+def planificar_consultas(generos, modo="union", max_por_consulta=None):
+    """Convierte una selección de géneros en el mínimo de valores `with_genres` para /discover.
+
+    Acepta ids o diccionarios de género ({"id": ..., "name": ...}). En modo "union" se puede
+    limitar cuántos géneros van en cada consulta; la intersección siempre es una sola consulta.
+    """
+    if modo not in SEPARADORES:
+        raise ValueError(f"Modo de consulta desconocido: {modo!r} (usa 'union' o 'interseccion')")
+
+    ids = list(dict.fromkeys(str(g["id"] if isinstance(g, dict) else g) for g in generos))
+    if not ids:
+        return []
+    if modo == "interseccion" or not max_por_consulta:
+        return [SEPARADORES[modo].join(ids)]
+    return ["|".join(ids[i:i + max_por_consulta]) for i in range(0, len(ids), max_por_consulta)]
@@ -69,6 +69,11 @@ def mostrar_menu():
         json.dump(peliculas, f, ensure_ascii=False, indent=4)
     print("\nResultados guardados en 'peliculas_resultado.json'.")
 
+    # Copia columnar (binaria, una columna por archivo) para que el análisis la abra sin parsear texto
+    from columnar import guardar_peliculas_columnar
+    guardar_peliculas_columnar("peliculas_resultado.columnar", peliculas)
+    print("Copia columnar guardada en 'peliculas_resultado.columnar'.")
+
      # Exportar a TXT
     with open("peliculas_resultado.txt", "w", encoding="utf-8") as f:
         for i, peli in enumerate(peliculas, 1):
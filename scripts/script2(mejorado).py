@@ -1,12 +1,19 @@
 import os
+import sys
 import json
 import re
+import importlib
 import requests
-import matplotlib.pyplot as plt
-import numpy as np
-import statistics
-import pandas as pd
-import openpyxl
+from cache_respuestas import SinCacheError
+from lectura_json import iterar_peliculas, agregar_jsonl, en_bloques
+
+# El cliente de TMDb (sesión, límite de tasa, caché, planificador, catálogo, registros
+# compactos...) es el de codigo-final.py; "codigo-final" lleva guion, así que se importa
+# con importlib. Aquí sólo se añade lo propio de este script
+_codigo_final = importlib.import_module("codigo-final")
+
+# pandas, numpy, matplotlib y openpyxl (y los módulos que dependen de ellos) se importan
+# dentro de las funciones que los usan, para que el menú aparezca sin esperar a cargarlos
 
 # URL para la API TMDb (Movie Database)
 API_KEY = "8672905b631a8a0b3a41a62affffec7f"  # Tu API key
@@ -15,42 +22,18 @@ API_KEY = "8672905b631a8a0b3a41a62affffec7f"  # Tu API key
 RE_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}$")  # Validar formato YYYY-MM-DD
 RE_TITULO = re.compile(r"^[A-Za-z0-9\s]+$")  # Validar títulos solo con caracteres alfanuméricos y espacios
 
-class TMDbAPI:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.base_url = "https://api.themoviedb.org/3"
-
-    def obtener_generos(self):
-        """Obtiene la lista de géneros de películas disponibles."""
-        url = f"{self.base_url}/genre/movie/list?api_key={self.api_key}&language=es"
-        response = requests.get(url)
-        return response.json()["genres"]
-
-    def buscar_peliculas(self, genero, desde, hasta, top_n=10, orden="desc"):
-        """Busca las mejores películas de un género dentro de un rango de fechas."""
-        url = (
-            f"{self.base_url}/discover/movie?api_key={self.api_key}&language=es"
-            f"&sort_by=vote_average.{orden}&vote_count.gte=100"
-            f"&with_genres={genero}"
-            f"&primary_release_date.gte={desde}&primary_release_date.lte={hasta}" +
-            f"&page=1"
-        )
-        response = requests.get(url)
-        return response.json()["results"][:top_n]
-
-    def obtener_mejores_peores(self, generos, desde, hasta, top_n=10, mejor=True):
-        """Obtiene las mejores o peores películas de los géneros dados."""
-        peliculas_totales = []
-        for genero in generos:
-            peliculas = self.buscar_peliculas(genero, desde, hasta, top_n=top_n*3)
-            peliculas_totales.extend(peliculas)
-
-        peliculas_unicas = {p['id']: p for p in peliculas_totales}.values()
-        peliculas_ordenadas = sorted(peliculas_unicas, key=lambda x: x['vote_average'], reverse=mejor)
-        return peliculas_ordenadas[:top_n]
+class TMDbAPI(_codigo_final.TMDbAPI):
+    def obtener_mejores_peores(self, generos, desde, hasta, top_n=10, mejor=True, concurrente=False, modo="union",
+                               local=False):
+        """Obtiene las mejores o peores películas de los géneros dados (local=True: sólo del catálogo)."""
+        return self.obtener_peliculas(generos, desde, hasta, top_n, concurrente=concurrente, modo=modo, local=local,
+                                      mejor=mejor)
 
     def graficar_peliculas(self, peliculas):
         """Genera una gráfica de barras horizontales con las puntuaciones de las películas."""
+        import numpy as np
+        from estadisticas import AcumuladorEstadisticas
+
         nombres = [pelicula['title'] for pelicula in peliculas]
         puntuaciones = np.array([pelicula['vote_average'] for pelicula in peliculas])
 
@@ -58,79 +41,120 @@ class TMDbAPI:
         mostrar_grafica = input("\n¿Quieres ver una gráfica de las puntuaciones? (si/no): ").strip().lower()
 
         if mostrar_grafica == "si":
-            plt.figure(figsize=(10, 6))
-            plt.barh(nombres, puntuaciones, color='lightgreen')
-            plt.xlabel('Puntuación')
-            plt.title('Puntuación de las Películas')
-            plt.xlim(0, 10)
+            import matplotlib.pyplot as plt
+            from graficas import datos_de_grafica
 
-            # Añadir las puntuaciones sobre las barras
-            for i, v in enumerate(puntuaciones):
-                plt.text(v + 0.1, i, f'{v:.2f}', va='center', fontsize=10)
+            plt.figure(figsize=(10, 6))
+            # Con muchas películas una barra por título no se lee y tarda minutos: se muestra el histograma
+            modo, datos = datos_de_grafica("grafico_barras.png", nombres, puntuaciones)
+            if modo == "agregado":
+                conteos, bordes, total = datos
+                plt.bar(bordes[:-1], conteos, width=np.diff(bordes), align='edge', color='lightgreen', edgecolor='white')
+                plt.xlabel('Puntuación')
+                plt.ylabel('Películas')
+                plt.title(f'Distribución de Puntuaciones ({total} películas)')
+            else:
+                plt.barh(nombres, puntuaciones, color='lightgreen')
+                plt.xlabel('Puntuación')
+                plt.title('Puntuación de las Películas')
+                plt.xlim(0, 10)
+
+                # Añadir las puntuaciones sobre las barras
+                for i, v in enumerate(puntuaciones):
+                    plt.text(v + 0.1, i, f'{v:.2f}', va='center', fontsize=10)
 
             plt.tight_layout()
             plt.show()
 
         # Calcular la media de las puntuaciones
-        media = statistics.mean(puntuaciones)
+        media = AcumuladorEstadisticas().agregar(puntuaciones).media
         print(f"Media de las puntuaciones: {media:.2f}")
 
+def validar_bloques(crudos, max_avisos=20):
+    """Generador: valida cada bloque (DataFrame) por columnas y entrega el bloque limpio."""
+    from validacion import validar_columnas
+
+    avisos = 0
+    for crudo in crudos:
+        # Los géneros (máscara de bits) no se validan, pero acompañan a las filas válidas
+        limpio, rechazados = validar_columnas(crudo, patron_titulo=RE_TITULO,
+                                              conservar=[c for c in ("generos",) if c in crudo])
+        for fila in rechazados.itertuples(index=False):
+            if avisos < max_avisos:
+                print(f" Dato inválido descartado ({fila.motivo}): {fila.title!r} {fila.release_date!r} {fila.vote_average!r}")
+            avisos += 1
+        yield limpio
+    if avisos > max_avisos:
+        print(f" ... y {avisos - max_avisos} datos inválidos más.")
+
 def cargar_json(path="peliculas_resultado.json"):
-    """Carga y valida las películas desde un archivo JSON."""
-    if not os.path.exists(path):
-        print(f"Archivo no encontrado: {path}")
+    """Carga y valida las películas desde un archivo JSON o JSON Lines."""
+    df = cargar_dataframe(path)
+    print(f"\n {len(df)} películas válidas cargadas.")
+    if df.empty:
         return []
+    df["release_date"] = df["release_date"].dt.strftime("%Y-%m-%d")
+    return df.to_dict("records")
 
-    with open(path, "r", encoding="utf-8") as f:
-        datos = json.load(f)
-
-    datos_validos = []
-    for peli in datos:
-        titulo = peli.get("title", "").strip()
-        fecha = peli.get("release_date", "").strip()
-        puntuacion = peli.get("vote_average", None)
-
-        # Validación usando expresiones regulares
-        if RE_FECHA.match(fecha) and RE_TITULO.match(titulo) and isinstance(puntuacion, (int, float)):
-            datos_validos.append({
-                "title": titulo,
-                "release_date": fecha,
-                "vote_average": float(puntuacion)
-            })
-        else:
-            print(f" Dato inválido descartado: {peli}")
+def _con_mascara_generos(bloque):
+    """Cambia la columna genre_ids (listas) por la máscara de bits `generos` que usan el cubo y el columnar."""
+    import numpy as np
+    from pelicula import mascara_generos
+
+    ids = bloque.pop("genre_ids")
+    bloque["generos"] = np.array([mascara_generos(g) if isinstance(g, list) else 0 for g in ids], dtype=np.uint64)
+    return bloque
 
-    print(f"\n {len(datos_validos)} películas válidas cargadas.")
-    return datos_validos
+def cargar_dataframe(path="peliculas_resultado.json", tam_bloque=50_000):
+    """Carga un volcado (JSON, JSON Lines o columnar) por bloques, sin tener todo el archivo en memoria."""
+    import pandas as pd
+    from columnar import es_columnar, bloques_columnar, TablaColumnar
+
+    columnas = ["title", "release_date", "vote_average"]
+    if not os.path.exists(path):
+        print(f"Archivo no encontrado: {path}")
+        return pd.DataFrame(columns=columnas)
+
+    # El archivo se lee de forma incremental, cada bloque se valida por columnas
+    # y los bloques limpios se concatenan al final
+    if es_columnar(path):
+        # Las columnas salen del memmap con las fechas ya convertidas: no hay texto que parsear
+        generos = ["generos"] if "generos" in TablaColumnar(path) else []
+        crudos = bloques_columnar(path, columnas + generos, tam_bloque)
+    else:
+        crudos = (_con_mascara_generos(pd.DataFrame.from_records(bloque, columns=columnas + ["genre_ids"]))
+                  for bloque in en_bloques(iterar_peliculas(path), tam_bloque))
+    bloques = [b for b in validar_bloques(crudos) if not b.empty]
+    return pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=columnas)
 
 # Transformar en DataFrame
 def preparar_dataframe(peliculas):
     """Prepara los datos para análisis y visualización."""
+    import pandas as pd
+
     df = pd.DataFrame(peliculas)
-    df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
+    # Si las fechas ya vienen validadas y convertidas (cargar_dataframe) no se vuelven a parsear
+    if not pd.api.types.is_datetime64_any_dtype(df["release_date"]):
+        df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
     df = df.dropna(subset=["release_date", "vote_average"])
     df["año"] = df["release_date"].dt.year
     return df
 
 # Análisis estadístico
-def analisis_estadistico(df):
+def analisis_estadistico(df, tam_bloque=100_000):
     """Realiza un análisis estadístico sobre las puntuaciones de las películas."""
-    puntuaciones = df["vote_average"].tolist()
+    from estadisticas import AcumuladorEstadisticas
 
-    media = np.mean(puntuaciones)
-    mediana = np.median(puntuaciones)
-    try:
-        moda = statistics.mode(puntuaciones)
-    except statistics.StatisticsError:
-        moda = "No única"
-
-    std_dev = np.std(puntuaciones)
+    # Una sola pasada por bloques, sin copiar la columna a una lista
+    acumulador = AcumuladorEstadisticas()
+    puntuaciones = df["vote_average"].to_numpy()
+    for inicio in range(0, len(puntuaciones), tam_bloque):
+        acumulador.agregar(puntuaciones[inicio:inicio + tam_bloque])
 
-    print("\n Estadísticas de puntuaciones:")
-    print(f"- Media: {media:.2f}")
-    print(f"- Mediana: {mediana}")
-    print(f"- Moda: {moda}")
-    print(f"- Desviación estándar: {std_dev:.2f}")
+    media = acumulador.media
+    mediana = acumulador.mediana
+    moda = acumulador.moda if acumulador.moda is not None else "No única"
+    std_dev = acumulador.desviacion
 
     return {
         "media": media,
@@ -139,6 +163,20 @@ def analisis_estadistico(df):
         "desviacion": std_dev
     }
 
+def imprimir_estadisticas(estadisticas):
+    print("\n Estadísticas de puntuaciones:")
+    print(f"- Media: {estadisticas['media']:.2f}")
+    print(f"- Mediana: {estadisticas['mediana']}")
+    print(f"- Moda: {estadisticas['moda']}")
+    print(f"- Desviación estándar: {estadisticas['desviacion']:.2f}")
+
+def construir_cubo(df):
+    """Cubo de estadísticas por (año, géneros) para cortar sin volver a descargar ni recalcular."""
+    from cubo import CuboPeliculas
+
+    mascaras = df["generos"].to_numpy() if "generos" in df else 0
+    return CuboPeliculas.construir(df["año"].to_numpy(), mascaras, df["vote_average"].to_numpy())
+
 def preparar_para_visualizacion(df):
     """Prepara los datos para visualización (top 5)."""
     df_viz = df[["title", "año", "vote_average"]].copy()
@@ -149,14 +187,42 @@ def preparar_para_visualizacion(df):
     return df_viz
 
 # Guardar en CSV para herramientas externas
-def exportar_csv(df, nombre="peliculas_preparadas.csv"):
-    """Exporta los datos a un archivo CSV."""
+def exportar_csv(df, nombre="peliculas_preparadas.csv", columnar=True):
+    """Exporta los datos a un archivo CSV y, con `columnar`, también en formato columnar."""
     df.to_csv(nombre, index=False, encoding="utf-8")
     print(f"\n Datos exportados para visualización en: {nombre}")
+    if columnar:
+        from columnar import guardar_columnar, EXTENSION
+
+        ruta = os.path.splitext(nombre)[0] + EXTENSION
+        guardar_columnar(ruta, df)
+        print(f" Copia columnar (memmap) en: {ruta}")
 
 # Función para exportar a Excel
-def exportar_excel(df, estadisticas, nombre_archivo="peliculas_analisis.xlsx"):
-    """Exporta los datos a un archivo Excel con dos hojas: datos y estadísticas."""
+def exportar_excel(df, estadisticas, nombre_archivo="peliculas_analisis.xlsx", streaming=None, hojas_extra=None):
+    """Exporta los datos a un archivo Excel con dos hojas: datos y estadísticas.
+
+    `df` puede ser un DataFrame o un iterable de bloques (DataFrames); los bloques, o un
+    DataFrame de más de UMBRAL_STREAMING filas, se escriben en modo streaming.
+    `hojas_extra` (nombre -> lista de filas, la primera de encabezados) añade más hojas,
+    por ejemplo las del cubo por año y género.
+    """
+    import pandas as pd
+    from excel_streaming import exportar_excel_streaming, bloques_de, UMBRAL_STREAMING
+
+    if not isinstance(df, pd.DataFrame):
+        streaming, bloques = True, df
+    else:
+        bloques = bloques_de(df)
+        if streaming is None:
+            streaming = len(df) > UMBRAL_STREAMING
+
+    if streaming:
+        hojas = {"Estadísticas": [list(estadisticas.keys()), list(estadisticas.values())], **(hojas_extra or {})}
+        filas = exportar_excel_streaming(nombre_archivo, bloques, "Películas", hojas)
+        print(f"\n Archivo Excel exportado en modo streaming ({filas} filas) como: {nombre_archivo}")
+        return
+
     with pd.ExcelWriter(nombre_archivo, engine="openpyxl") as writer:
         # Hoja 1: Datos preparados para visualización
         df.to_excel(writer, sheet_name="Películas", index=False)
@@ -165,12 +231,15 @@ def exportar_excel(df, estadisticas, nombre_archivo="peliculas_analisis.xlsx"):
         df_estadisticas = pd.DataFrame([estadisticas])
         df_estadisticas.to_excel(writer, sheet_name="Estadísticas", index=False)
 
+        for nombre, filas in (hojas_extra or {}).items():
+            pd.DataFrame(filas[1:], columns=filas[0]).to_excel(writer, sheet_name=nombre, index=False)
+
     print(f"\n Archivo Excel exportado correctamente como: {nombre_archivo}")
 
 
-def main():
+def main(offline=False):
     api_key = API_KEY  # Tu clave API
-    api = TMDbAPI(api_key)
+    api = TMDbAPI(api_key, offline=offline)
 
     generos = api.obtener_generos()
 
@@ -212,15 +281,20 @@ def main():
 
     # Ahora sí hacemos la búsqueda
     if opcion_orden == "mejores":
-        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=True)
+        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=True, concurrente=True)
         print("\nMejores Películas:")
     elif opcion_orden == "peores":
-        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=False)
+        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=False, concurrente=True)
         print("\nPeores Películas:")
     else:
         print("Opción inválida. Mostrando las mejores por defecto.")
-        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=True)
+        peliculas = api.obtener_mejores_peores(generos_seleccionados, fecha_desde, fecha_hasta, top_n=num_peliculas, mejor=True, concurrente=True)
 
+    api.http.imprimir_resumen()
+    if api.consultas_ahorradas:
+        print(f"Planificador: {api.consultas_ahorradas} consultas a /discover ahorradas")
+    if api.cache is not None:
+        api.cache.imprimir_resumen()
 
     # Pregunta el número de películas a mostrar
     try:
@@ -242,7 +316,7 @@ def main():
 
     guardar = input("\n¿Quieres guardar los resultados en un archivo? (sí/no): ").strip().lower()
     if guardar == "sí" or guardar == "si":
-        formatos = input("¿En qué formato deseas guardarlo? (txt/json/ambos): ").strip().lower()
+        formatos = input("¿En qué formato deseas guardarlo? (txt/json/jsonl/columnar/ambos): ").strip().lower()
 
         if formatos in ("txt", "ambos"):
             with open("resultados_peliculas.txt", "w", encoding="utf-8") as f:
@@ -255,18 +329,67 @@ def main():
                 json.dump(peliculas, f, ensure_ascii=False, indent=4)
             print("Archivo guardado como 'resultados_peliculas.json'.")
 
+        if formatos == "jsonl":
+            # JSON Lines: cada ejecución añade sus películas al mismo archivo
+            total = agregar_jsonl("resultados_peliculas.jsonl", peliculas)
+            print(f"{total} películas añadidas a 'resultados_peliculas.jsonl'.")
+
+        if formatos in ("json", "columnar", "ambos"):
+            # Copia binaria por columnas: el análisis la abre con memmap sin volver a parsear el JSON
+            from columnar import guardar_peliculas_columnar
+            guardar_peliculas_columnar("resultados_peliculas.columnar", peliculas)
+            print("Archivo guardado como 'resultados_peliculas.columnar'.")
+
 if __name__ == "__main__":
-    main()
+    # --offline: usa sólo respuestas guardadas en la caché (útil en CI o sin red)
+    offline = "--offline" in sys.argv
+    main(offline=offline)
     
-    # Cargar y validar datos del JSON (si ya se generó previamente)
-    datos = cargar_json("resultados_peliculas.json")
-    if datos:
+    # Cargar y validar los datos guardados (si ya se generaron previamente); la copia
+    # columnar se prefiere al JSON siempre que no sea más vieja que él
+    origen = "resultados_peliculas.json"
+    if os.path.isdir("resultados_peliculas.columnar") and (
+            not os.path.exists(origen) or os.path.getmtime("resultados_peliculas.columnar") >= os.path.getmtime(origen)):
+        origen = "resultados_peliculas.columnar"
+
+    # Cada etapa se salta si su huella (datos de entrada y código, también el de los módulos
+    # que usa) no cambió; --rehacer las fuerza. Lo que se muestra se imprime fuera de las
+    # etapas para que también aparezca cuando salen de la caché
+    from incremental import Incremental, huella_archivo, fuentes
+
+    etapas = Incremental(activo="--rehacer" not in sys.argv)
+    entrada = huella_archivo(origen) if os.path.exists(origen) else None
+    datos = etapas.etapa("validacion", (entrada, cargar_dataframe, validar_bloques, _con_mascara_generos,
+                                        RE_TITULO.pattern, fuentes("validacion", "lectura_json", "columnar", "pelicula")),
+                         lambda: cargar_dataframe(origen))
+    print(f"\n {len(datos)} películas válidas cargadas.")
+    if not datos.empty:
         df = preparar_dataframe(datos)
-        estadisticas = analisis_estadistico(df)
+        estadisticas = etapas.etapa("estadisticas", (df, analisis_estadistico, fuentes("estadisticas")),
+                                    lambda: analisis_estadistico(df))
+        imprimir_estadisticas(estadisticas)
+        # Año x género: se guarda para cortes posteriores (CuboPeliculas.cargar) y va al Excel
+        cubo = etapas.etapa("cubo", (df, construir_cubo, fuentes("cubo", "estadisticas", "pelicula")),
+                            lambda: construir_cubo(df))
+        cubo.guardar("peliculas_cubo.npz")
         df_viz = preparar_para_visualizacion(df)
 
-        # Exportar a CSV
-        exportar_csv(df_viz, nombre="peliculas_preparadas.csv")
-
-        # Exportar a Excel
-        exportar_excel(df_viz, estadisticas, nombre_archivo="peliculas_analisis.xlsx")
+        # Nombres de los géneros para las hojas del cubo: /genre/movie/list ya quedó en la caché
+        # en disco al mostrar el menú; si no se puede obtener, las hojas muestran los ids
+        try:
+            nombres = {g["id"]: g["name"] for g in TMDbAPI(API_KEY, offline=offline, catalogo=False).obtener_generos()}
+        except (SinCacheError, requests.RequestException):
+            nombres = {}
+        hojas_cubo = cubo.hojas_excel(nombres)
+
+        def exportar():
+            # Exportar a CSV
+            exportar_csv(df_viz, nombre="peliculas_preparadas.csv")
+
+            # Exportar a Excel, con las hojas del cubo por año y por género
+            exportar_excel(df_viz, estadisticas, nombre_archivo="peliculas_analisis.xlsx", hojas_extra=hojas_cubo)
+
+        etapas.etapa("exportacion", (df_viz, estadisticas, hojas_cubo, exportar_csv, exportar_excel,
+                                     fuentes("columnar", "excel_streaming")), exportar,
+                     archivos=["peliculas_preparadas.csv", "peliculas_analisis.xlsx"])
+    etapas.imprimir_resumen()
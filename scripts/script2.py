@@ -1,68 +1,64 @@
-with open('../data/peliculas_resultado.json', encoding='utf-8') as f:
-    peliculas = json.load(f)
-
-import json
-import re
 import os
-import numpy as np
-import statistics as stats
 import pandas as pd
+from lectura_json import iterar_peliculas, en_bloques
+from columnar import es_columnar, bloques_columnar, guardar_columnar
+from validacion import validar_columnas
+from estadisticas import AcumuladorEstadisticas
 
 # Ruta del archivo JSON generado por el primer script
 INPUT_FILE = "data/peliculas_resultado.json"
+INPUT_COLUMNAR = "data/peliculas_resultado.columnar"
 OUTPUT_CSV = "data/peliculas_preparadas.csv"
+OUTPUT_COLUMNAR = "data/peliculas_preparadas.columnar"
 OUTPUT_XLSX = "data/peliculas_analisis.xlsx"
+TAM_BLOQUE = 50_000  # registros válidos por bloque al armar el DataFrame
 
-# Validaciones con expresiones regulares
-def validar_fecha(fecha):
-    return re.match(r"^\d{4}-\d{2}-\d{2}$", fecha) is not None
-
-def validar_titulo(titulo):
-    return isinstance(titulo, str) and len(titulo.strip()) > 0
+# Validación y limpieza por columnas: título no vacío, fecha YYYY-MM-DD real y puntaje entre 0 y 10
+def validar_peliculas(bloques):
+    for crudo in bloques:
+        limpio, rechazados = validar_columnas(crudo, puntaje_min=0, puntaje_max=10)
+        yield limpio.rename(columns={"title": "titulo", "release_date": "fecha", "vote_average": "puntaje"}), rechazados
 
-def validar_puntaje(puntaje):
-    return isinstance(puntaje, (int, float)) and 0 <= puntaje <= 10
+def leer_bloques():
+    # Si la descarga dejó también la copia columnar (y no es más vieja que el JSON) se abre
+    # con memmap en lugar de volver a parsear el texto
+    if es_columnar(INPUT_COLUMNAR) and (not os.path.exists(INPUT_FILE) or
+                                        os.path.getmtime(INPUT_COLUMNAR) >= os.path.getmtime(INPUT_FILE)):
+        return bloques_columnar(INPUT_COLUMNAR, ["title", "release_date", "vote_average"], TAM_BLOQUE)
+    return (pd.DataFrame.from_records(bloque, columns=["title", "release_date", "vote_average"])
+            for bloque in en_bloques(iterar_peliculas(INPUT_FILE), TAM_BLOQUE))
 
-# Cargar datos desde JSON
-with open(INPUT_FILE, encoding='utf-8') as f:
-    peliculas = json.load(f)
-
-# Validación y limpieza
-peliculas_validas = []
-for peli in peliculas:
-    if all([
-        validar_titulo(peli.get("title")),
-        validar_fecha(peli.get("release_date", "")),
-        validar_puntaje(peli.get("vote_average"))
-    ]):
-        peliculas_validas.append({
-            "titulo": peli["title"],
-            "fecha": peli["release_date"],
-            "puntaje": peli["vote_average"]
-        })
+# Cargar datos (columnar, o JSON / JSON Lines) de forma incremental: el archivo
+# nunca se carga completo y los registros válidos llegan al DataFrame por bloques.
+# Las estadísticas se acumulan bloque a bloque en la misma pasada.
+columnas = ["titulo", "fecha", "puntaje"]
+bloques, rechazados = [], 0
+acumulador = AcumuladorEstadisticas()
+for limpio, descartados in validar_peliculas(leer_bloques()):
+    bloques.append(limpio)
+    rechazados += len(descartados)
+    acumulador.agregar(limpio["puntaje"])
+df = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=columnas)
 
 # Análisis estadístico
-puntajes = [p["puntaje"] for p in peliculas_validas]
-
-media = np.mean(puntajes)
-mediana = np.median(puntajes)
-try:
-    moda = stats.mode(puntajes)
-except stats.StatisticsError:
-    moda = "No hay moda única"
-desviacion = np.std(puntajes)
+media = acumulador.media
+mediana = acumulador.mediana
+moda = acumulador.moda if acumulador.moda is not None else "No hay moda única"
+desviacion = acumulador.desviacion
 
 # Mostrar resultados
 print("=== Estadísticas ===")
-print(f"Películas válidas: {len(peliculas_validas)}")
+print(f"Películas válidas: {len(df)}")
+print(f"Registros descartados: {rechazados}")
 print(f"Media: {media:.2f}")
 print(f"Mediana: {mediana:.2f}")
 print(f"Moda: {moda}")
 print(f"Desviación estándar: {desviacion:.2f}")
 
-# Exportar CSV para visualización posterior
-df = pd.DataFrame(peliculas_validas)
+# Exportar CSV para visualización posterior, y la misma tabla en formato columnar
+# para las herramientas que la vuelven a leer
 df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
+guardar_columnar(OUTPUT_COLUMNAR, df)
 
 # Exportar a Excel con hoja de resumen
 with pd.ExcelWriter(OUTPUT_XLSX) as writer:
@@ -73,4 +69,4 @@ with pd.ExcelWriter(OUTPUT_XLSX) as writer:
     })
     resumen.to_excel(writer, sheet_name="Estadísticas", index=False)
 
-print(f"\nDatos exportados a:\n- {OUTPUT_CSV}\n- {OUTPUT_XLSX}")
+print(f"\nDatos exportados a:\n- {OUTPUT_CSV}\n- {OUTPUT_COLUMNAR}\n- {OUTPUT_XLSX}")
@@ -0,0 +1,415 @@
+import math
+import json
+import time
+import asyncio
+import logging
+import argparse
+import importlib
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# El servicio vive mucho tiempo: numpy se carga al arrancar (con graficas) y matplotlib con
+# la primera gráfica; después quedan cargados para todas las peticiones
+from estadisticas import AcumuladorEstadisticas
+from graficas import GRAFICAS, renderizar, anios_de_fechas
+from lote import resolver_generos
+from cache_respuestas import SinCacheError
+
+# "codigo-final" lleva guion, así que se importa con importlib
+codigo_final = importlib.import_module("codigo-final")
+
+PUERTO = 8765
+
+# Límites de la caché de resultados: número de respuestas y bytes de sus cuerpos
+MAX_ENTRADAS = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+# Latencias que se conservan por tipo de consulta para calcular p50/p99
+MAX_LATENCIAS = 10_000
+
+MENSAJES_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+registro = logging.getLogger(__name__)
+
+
+class NoEncontrado(LookupError):
+    """Ruta o gráfica que el servicio no tiene (se responde con 404)."""
+
+
+class ParametroInvalido(ValueError):
+    """Parámetro de la consulta con un valor que no se acepta (se responde con 400)."""
+
+
+class CacheLRU:
+    """Caché LRU de respuestas ya serializadas, limitada en entradas y en bytes."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsadas = 0
+        self._datos = OrderedDict()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def obtener(self, clave):
+        valor = self._datos.get(clave)
+        if valor is None:
+            self.fallos += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        """Guarda `(tipo, cuerpo)`; si se pasa de los límites expulsa las menos usadas."""
+        tam = len(valor[1])
+        if tam > self.max_bytes:
+            return
+        anterior = self._datos.pop(clave, None)
+        if anterior is not None:
+            self.bytes -= len(anterior[1])
+        self._datos[clave] = valor
+        self.bytes += tam
+        while len(self._datos) > self.max_entradas or self.bytes > self.max_bytes:
+            _, expulsada = self._datos.popitem(last=False)
+            self.bytes -= len(expulsada[1])
+            self.expulsadas += 1
+
+    def resumen(self):
+        return {"entradas": len(self._datos), "bytes": self.bytes, "aciertos": self.aciertos,
+                "fallos": self.fallos, "expulsadas": self.expulsadas}
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por el método del rango más cercano."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _json(datos):
+    return "application/json;charset=utf-8", json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+def _sin_nan(valor):
+    return None if isinstance(valor, float) and math.isnan(valor) else valor
+
+
+class ServicioConsultas:
+    """Servicio HTTP (asyncio) que mantiene caliente una instancia de TMDbAPI.
+
+    Rutas (todas GET, con los parámetros de la consulta en la URL):
+    - /peliculas?generos=28,12|todos&desde=AAAA-MM-DD&hasta=AAAA-MM-DD&n=10&orden=mejores&modo=union
+    - /estadisticas?... (mismos parámetros): media, mediana, moda y desviación de las puntuaciones
+    - /grafica/<nombre>?... : una de las gráficas de graficas.GRAFICAS como PNG
+    - /estado: caché, consultas unidas y latencias p50/p99 en caliente y en frío
+
+    Las respuestas se guardan ya serializadas en una caché LRU. Si llegan a la vez varias
+    peticiones iguales, sólo la primera va a TMDb y las demás esperan su resultado.
+    """
+
+    def __init__(self, api=None, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES, hilos=8, offline=False):
+        self.api = api or codigo_final.TMDbAPI(codigo_final.API_KEY, offline=offline)
+        self.cache = CacheLRU(max_entradas, max_bytes)
+        self.unidas = 0
+        self.latencias = {"caliente": deque(maxlen=MAX_LATENCIAS), "fria": deque(maxlen=MAX_LATENCIAS)}
+        self._generos = None
+        self._en_curso = {}
+        # TMDbAPI y matplotlib son síncronos: trabajan en hilos sin bloquear el bucle de eventos
+        self._hilos = ThreadPoolExecutor(max_workers=hilos)
+        self._servidor = None
+
+    # --- consultas ---------------------------------------------------------------------------
+
+    def _consulta(self, parametros):
+        """Normaliza los parámetros de la URL en una consulta (que también es la clave de la caché)."""
+        desde = parametros.get("desde", "")
+        hasta = parametros.get("hasta", "")
+        if not codigo_final.RE_FECHA.match(desde) or not codigo_final.RE_FECHA.match(hasta):
+            raise ParametroInvalido("Los parámetros 'desde' y 'hasta' deben tener formato AAAA-MM-DD")
+        generos = parametros.get("generos", "todos")
+        if generos != "todos":
+            generos = [int(g) if g.strip().isdigit() else g.strip() for g in generos.split(",") if g.strip()]
+        try:
+            generos = resolver_generos(generos, self._generos)
+        except ValueError as e:
+            raise ParametroInvalido(str(e)) from None
+        try:
+            top_n = int(parametros.get("n", 10))
+        except ValueError:
+            raise ParametroInvalido("El parámetro 'n' debe ser un entero") from None
+        if top_n <= 0:
+            raise ParametroInvalido("El parámetro 'n' debe ser mayor que cero")
+        orden = parametros.get("orden", "mejores")
+        if orden not in ("mejores", "peores"):
+            raise ParametroInvalido("El parámetro 'orden' debe ser 'mejores' o 'peores'")
+        modo = parametros.get("modo", "union")
+        if modo not in ("union", "interseccion"):
+            raise ParametroInvalido("El parámetro 'modo' debe ser 'union' o 'interseccion'")
+        return tuple(sorted(set(generos))), desde, hasta, top_n, orden, modo
+
+    def _descargar(self, consulta):
+        generos, desde, hasta, top_n, orden, modo = consulta
+        peliculas = self.api.obtener_peliculas(list(generos), desde, hasta, top_n, concurrente=True,
+                                               modo=modo, mejor=orden == "mejores")
+        return _json(peliculas)
+
+    async def _resolver(self, clave, calcular):
+        """Devuelve `((tipo, cuerpo), caliente)` para la clave, calculándola una sola vez.
+
+        `calcular` es una corrutina; si otra petición ya está calculando la misma clave,
+        se espera a esa en lugar de repetir el trabajo.
+        """
+        valor = self.cache.obtener(clave)
+        if valor is not None:
+            return valor, True
+        tarea = self._en_curso.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(calcular())
+            self._en_curso[clave] = tarea
+
+            def terminar(tarea):
+                self._en_curso.pop(clave, None)
+                if not tarea.cancelled() and tarea.exception() is None:
+                    self.cache.guardar(clave, tarea.result())
+
+            tarea.add_done_callback(terminar)
+        else:
+            self.unidas += 1
+        # shield: si se cae el cliente que la pidió primero, las demás siguen esperando el resultado
+        return await asyncio.shield(tarea), False
+
+    async def _en_hilo(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._hilos, funcion, *args)
+
+    async def peliculas(self, consulta):
+        return await self._resolver(("peliculas",) + consulta, lambda: self._en_hilo(self._descargar, consulta))
+
+    async def estadisticas(self, consulta):
+        async def calcular():
+            (_, cuerpo), _ = await self.peliculas(consulta)
+            puntuaciones = [p["vote_average"] for p in json.loads(cuerpo)]
+            resultado = AcumuladorEstadisticas().agregar(puntuaciones).resultado()
+            return _json({clave: _sin_nan(valor) for clave, valor in resultado.items()})
+
+        return await self._resolver(("estadisticas",) + consulta, calcular)
+
+    async def grafica(self, nombre, consulta):
+        if not nombre.endswith(".png"):
+            nombre += ".png"
+        if nombre not in GRAFICAS:
+            raise NoEncontrado(f"Gráfica desconocida: {nombre} (hay {', '.join(GRAFICAS)})")
+
+        async def calcular():
+            (_, cuerpo), _ = await self.peliculas(consulta)
+            peliculas = json.loads(cuerpo)
+            titulos = [p["title"] for p in peliculas]
+            puntuaciones = [p["vote_average"] for p in peliculas]
+            anios = anios_de_fechas([p.get("release_date") for p in peliculas])
+            _, png, _ = await self._en_hilo(renderizar, nombre, titulos, puntuaciones, anios)
+            return "image/png", png
+
+        return await self._resolver(("grafica", nombre) + consulta, calcular)
+
+    def estado(self):
+        latencias = {}
+        for tipo, valores in self.latencias.items():
+            valores = list(valores)
+            latencias[tipo] = {"peticiones": len(valores),
+                               "p50_ms": _ms(percentil(valores, 50)), "p99_ms": _ms(percentil(valores, 99))}
+        return {"cache": self.cache.resumen(), "consultas_unidas": self.unidas, "en_curso": len(self._en_curso),
+                "latencias": latencias, "tmdb": self.api.http.resumen()}
+
+    # --- HTTP --------------------------------------------------------------------------------
+
+    async def _atender(self, ruta, parametros):
+        """Resuelve una ruta; devuelve `(codigo, tipo, cuerpo, caliente)`."""
+        if ruta == "/estado":
+            return (200, *_json(self.estado()), None)
+        partes = ruta.strip("/").split("/")
+        if partes == ["peliculas"]:
+            (tipo, cuerpo), caliente = await self.peliculas(self._consulta(parametros))
+        elif partes == ["estadisticas"]:
+            (tipo, cuerpo), caliente = await self.estadisticas(self._consulta(parametros))
+        elif len(partes) == 2 and partes[0] == "grafica":
+            (tipo, cuerpo), caliente = await self.grafica(partes[1], self._consulta(parametros))
+        else:
+            raise NoEncontrado(f"Ruta desconocida: {ruta}")
+        return 200, tipo, cuerpo, caliente
+
+    async def _conexion(self, lector, escritor):
+        # HTTP/1.1 mínimo: sólo GET, sin cuerpo, con conexiones persistentes
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                cabeceras = {}
+                while (cabecera := await lector.readline()) not in (b"\r\n", b"\n", b""):
+                    nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                inicio = time.perf_counter()
+                metodo, destino, version = (linea.decode("latin-1").split() + ["", "", ""])[:3]
+                url = urllib.parse.urlsplit(destino)
+                caliente = None
+                try:
+                    if metodo != "GET":
+                        codigo, tipo, cuerpo = 405, *_json({"error": "Sólo se admite GET"})
+                    else:
+                        codigo, tipo, cuerpo, caliente = await self._atender(
+                            url.path, dict(urllib.parse.parse_qsl(url.query)))
+                # Sólo NoEncontrado es un 404: un KeyError o IndexError es un error del servicio
+                except NoEncontrado as e:
+                    codigo, tipo, cuerpo = 404, *_json({"error": str(e)})
+                except SinCacheError as e:
+                    codigo, tipo, cuerpo = 503, *_json({"error": str(e)})
+                except requests.RequestException as e:
+                    codigo, tipo, cuerpo = 502, *_json({"error": f"Fallo al consultar TMDb: {e}"})
+                except ParametroInvalido as e:
+                    codigo, tipo, cuerpo = 400, *_json({"error": str(e)})
+                except Exception as e:
+                    registro.exception("Error inesperado en %s %s", metodo, destino)
+                    codigo, tipo, cuerpo = 500, *_json({"error": f"Error interno: {type(e).__name__}"})
+
+                cerrar = cabeceras.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                escritor.write(
+                    f"HTTP/1.1 {codigo} {MENSAJES_HTTP[codigo]}\r\nContent-Type: {tipo}\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\nConnection: {'close' if cerrar else 'keep-alive'}\r\n\r\n"
+                    .encode("latin-1") + cuerpo)
+                await escritor.drain()
+                if caliente is not None:
+                    self.latencias["caliente" if caliente else "fria"].append(time.perf_counter() - inicio)
+                if cerrar:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host="127.0.0.1", puerto=PUERTO):
+        """Pide la lista de géneros y empieza a escuchar; devuelve el puerto (útil con puerto=0)."""
+        self._generos = await self._en_hilo(self.api.obtener_generos)
+        self._servidor = await asyncio.start_server(self._conexion, host, puerto)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+        self._hilos.shutdown(wait=False)
+
+    def imprimir_resumen(self):
+        estado = self.estado()
+        cache = estado["cache"]
+        print(f"\nServicio: caché {cache['entradas']} respuestas ({cache['bytes'] / 1024:.0f} KB), "
+              f"{cache['aciertos']} aciertos, {cache['fallos']} fallos, {cache['expulsadas']} expulsadas, "
+              f"{estado['consultas_unidas']} peticiones unidas a otra en curso")
+        for tipo, datos in estado["latencias"].items():
+            if datos["peticiones"]:
+                print(f"- {tipo}: {datos['peticiones']} peticiones, p50 {datos['p50_ms']:.1f} ms, "
+                      f"p99 {datos['p99_ms']:.1f} ms")
+
+
+def _ms(segundos):
+    return None if segundos is None else segundos * 1000
+
+
+def servir(host="127.0.0.1", puerto=PUERTO, offline=False, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+    """Arranca el servicio y atiende peticiones hasta Ctrl+C."""
+    async def correr():
+        servicio = ServicioConsultas(offline=offline, max_entradas=max_entradas, max_bytes=max_bytes)
+        puerto_real = await servicio.iniciar(host, puerto)
+        print(f"Servicio de consultas en http://{host}:{puerto_real} (Ctrl+C para salir)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            servicio.imprimir_resumen()
+            await servicio.detener()
+
+    try:
+        asyncio.run(correr())
+    except KeyboardInterrupt:
+        pass
+
+
+async def _pedir(puerto, ruta):
+    """Cliente mínimo para el benchmark: una petición GET por conexión."""
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    escritor.write(f"GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    await escritor.drain()
+    respuesta = await lector.read()
+    escritor.close()
+    cabecera, _, cuerpo = respuesta.partition(b"\r\n\r\n")
+    return int(cabecera.split()[1]), cuerpo
+
+
+def benchmark(n_peliculas=20_000, consultas=20, repeticiones=20, simultaneas=5, latencia=0.01):
+    """Mide p50/p99 de consultas en frío y en caliente contra el servidor TMDb local.
+
+    Cada consulta nueva se pide `simultaneas` veces a la vez (sólo una debe llegar a TMDb)
+    y luego `repeticiones` veces más, que ya salen de la caché.
+    """
+    from servidor_tmdb_local import ServidorTMDbLocal, GENEROS_TMDB
+
+    ids = [g["id"] for g in GENEROS_TMDB]
+    rutas = []
+    for i in range(consultas):
+        generos = ",".join(map(str, ids[i % len(ids):i % len(ids) + 1 + i % 3]))
+        desde = 1960 + (i * 3) % 50
+        rutas.append(f"/peliculas?generos={generos}&desde={desde}-01-01&hasta={desde + 10}-12-31&n=20")
+
+    async def correr(servidor):
+        api = codigo_final.TMDbAPI(codigo_final.API_KEY, cache=False, catalogo=False, tasa=10_000, rafaga=10_000,
+                                   base_url=servidor.url)
+        servicio = ServicioConsultas(api)
+        puerto = await servicio.iniciar(puerto=0)
+        antes = servidor.peticiones
+        for ruta in rutas:
+            respuestas = await asyncio.gather(*(_pedir(puerto, ruta) for _ in range(simultaneas)))
+            assert all(codigo == 200 for codigo, _ in respuestas)
+            assert len({cuerpo for _, cuerpo in respuestas}) == 1
+        peticiones_frias = servidor.peticiones - antes
+        for _ in range(repeticiones):
+            for ruta in rutas:
+                codigo, _ = await _pedir(puerto, ruta)
+                assert codigo == 200
+        for nombre in GRAFICAS:
+            await _pedir(puerto, f"/grafica/{nombre}?" + rutas[0].partition("?")[2])
+        assert servidor.peticiones - antes == peticiones_frias, "las consultas en caliente llegaron a TMDb"
+        servicio.imprimir_resumen()
+        estado = servicio.estado()
+        await servicio.detener()
+        api.http.cerrar()
+        return estado, peticiones_frias
+
+    with ServidorTMDbLocal(n_peliculas=n_peliculas, latencia=latencia) as servidor:
+        estado, peticiones_frias = asyncio.run(correr(servidor))
+    print(f"{consultas} consultas x {simultaneas} simultáneas: {peticiones_frias} peticiones a TMDb "
+          f"({estado['consultas_unidas']} peticiones unidas a otra en curso)")
+    return estado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio HTTP de consultas con TMDbAPI y caché de resultados.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--offline", action="store_true", help="usar sólo respuestas guardadas en la caché")
+    parser.add_argument("--max-entradas", type=int, default=MAX_ENTRADAS, help="respuestas en la caché LRU")
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 1024 / 1024, help="tamaño máximo de la caché LRU")
+    parser.add_argument("--benchmark", action="store_true", help="medir p50/p99 contra un servidor TMDb local")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        servir(args.host, args.puerto, args.offline, args.max_entradas, int(args.max_mb * 1024 * 1024))
@@ -0,0 +1,245 @@
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.parse
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Los mismos géneros (y nombres en español) que devuelve TMDb con language=es
+GENEROS_TMDB = [
+    {"id": 28, "name": "Acción"}, {"id": 12, "name": "Aventura"}, {"id": 16, "name": "Animación"},
+    {"id": 35, "name": "Comedia"}, {"id": 80, "name": "Crimen"}, {"id": 99, "name": "Documental"},
+    {"id": 18, "name": "Drama"}, {"id": 10751, "name": "Familia"}, {"id": 14, "name": "Fantasía"},
+    {"id": 36, "name": "Historia"}, {"id": 27, "name": "Terror"}, {"id": 10402, "name": "Música"},
+    {"id": 9648, "name": "Misterio"}, {"id": 10749, "name": "Romance"}, {"id": 878, "name": "Ciencia ficción"},
+    {"id": 10770, "name": "Película de TV"}, {"id": 53, "name": "Suspense"}, {"id": 10752, "name": "Bélica"},
+    {"id": 37, "name": "Western"},
+]
+
+# TMDb no deja pasar de la página 500 en /discover
+MAX_PAGINAS_TMDB = 500
+
+_NOMBRES = ["Ana", "Luis", "Carmen", "Jorge", "Lucía", "Pablo", "Elena", "Diego", "Sofía", "Martín"]
+_APELLIDOS = ["García", "López", "Martínez", "Sánchez", "Romero", "Torres", "Vega", "Castro", "Ortiz"]
+
+_PALABRAS = ["Noche", "Ciudad", "Sombra", "Viaje", "Regreso", "Secreto", "Último", "Camino", "Fuego",
+             "Río", "Luna", "Guerra", "Sueño", "Tormenta", "Hielo", "Corazón", "Reino", "Eco"]
+
+
+def generar_peliculas(n, semilla=0, desde=1950, hasta=2024):
+    """Genera `n` películas sintéticas con la misma forma que data/peliculas_resultado.json."""
+    rnd = random.Random(semilla)
+    ids_generos = [g["id"] for g in GENEROS_TMDB]
+    peliculas = []
+    for i in range(n):
+        titulo = f"{rnd.choice(_PALABRAS)} {rnd.choice(_PALABRAS).lower()} {i + 1}"
+        peliculas.append({
+            "adult": False,
+            "backdrop_path": f"/fondo{i + 1}.jpg",
+            "genre_ids": rnd.sample(ids_generos, rnd.randint(1, 4)),
+            "id": i + 1,
+            "original_language": rnd.choice(["en", "es", "fr", "ja", "ko"]),
+            "original_title": titulo,
+            "overview": f"Sinopsis de {titulo}. " * rnd.randint(8, 16),
+            "popularity": round(rnd.uniform(0.5, 300), 3),
+            "poster_path": f"/poster{i + 1}.jpg",
+            "release_date": f"{rnd.randint(desde, hasta)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "title": titulo,
+            "video": False,
+            "vote_average": round(rnd.uniform(1, 9.5), 3),
+            "vote_count": int(rnd.paretovariate(1.2) * 60),
+        })
+    return peliculas
+
+
+def generar_detalle(pelicula, subrecursos=()):
+    """Detalle sintético de /movie/{id}, siempre el mismo para cada película.
+
+    `subrecursos` imita append_to_response: "credits" y "keywords" se anidan en la respuesta.
+    """
+    rnd = random.Random(pelicula["id"])
+    persona = lambda: f"{rnd.choice(_NOMBRES)} {rnd.choice(_APELLIDOS)}"
+    presupuesto = rnd.choice([0, rnd.randint(1, 300) * 1_000_000])
+    detalle = {
+        **pelicula,
+        "genres": [g for g in GENEROS_TMDB if g["id"] in pelicula["genre_ids"]],
+        "runtime": rnd.randint(75, 190),
+        "budget": presupuesto,
+        "revenue": int(presupuesto * rnd.uniform(0, 6)),
+        "status": "Released",
+        "tagline": "",
+    }
+    if "credits" in subrecursos:
+        detalle["credits"] = {
+            "cast": [{"id": rnd.randint(1, 10**6), "name": persona(), "character": f"Personaje {i + 1}", "order": i}
+                     for i in range(rnd.randint(3, 12))],
+            "crew": [{"id": rnd.randint(1, 10**6), "name": persona(), "job": "Director", "department": "Directing"},
+                     {"id": rnd.randint(1, 10**6), "name": persona(), "job": "Screenplay", "department": "Writing"}],
+        }
+    if "keywords" in subrecursos:
+        detalle["keywords"] = {"keywords": [{"id": rnd.randint(1, 10**5), "name": palabra.lower()}
+                                            for palabra in rnd.sample(_PALABRAS, rnd.randint(0, 4))]}
+    return detalle
+
+
+class ServidorTMDbLocal:
+    """Servidor HTTP local que imita /genre/movie/list, /discover/movie y /movie/{id} de TMDb.
+
+    Sirve películas sintéticas (o las que se le pasen) con paginación de 20 resultados,
+    filtros de género (`|` unión, `,` intersección), fechas, votos mínimos y orden por
+    puntuación. `latencia` añade segundos a cada respuesta y `prob_429` es la probabilidad
+    de contestar 429 con la cabecera Retry-After, para medir los reintentos.
+    """
+
+    def __init__(self, peliculas=None, n_peliculas=1000, latencia=0.0, prob_429=0.0, retry_after=1,
+                 por_pagina=20, semilla=0, puerto=0):
+        self.peliculas = peliculas if peliculas is not None else generar_peliculas(n_peliculas, semilla)
+        self.latencia = latencia
+        self.prob_429 = prob_429
+        self.retry_after = retry_after
+        self.por_pagina = por_pagina
+        self.puerto = puerto
+        self.peticiones = 0
+        self.respuestas_429 = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = None
+        # La misma consulta con otra página no vuelve a filtrar ni ordenar todo el catálogo
+        self._filtrar = lru_cache(maxsize=256)(self._filtrar_sin_cache)
+        self._por_id = {p["id"]: p for p in self.peliculas}
+
+    @property
+    def url(self):
+        """URL base equivalente a https://api.themoviedb.org/3."""
+        return f"http://127.0.0.1:{self._servidor.server_port}/3"
+
+    def _filtrar_sin_cache(self, con_generos, desde, hasta, votos_minimos, ascendente):
+        if "|" in con_generos:
+            buscados = set(map(int, con_generos.split("|")))
+            coincide = lambda p: not buscados.isdisjoint(p["genre_ids"])
+        elif con_generos:
+            buscados = set(map(int, con_generos.split(",")))
+            coincide = lambda p: buscados.issubset(p["genre_ids"])
+        else:
+            coincide = lambda p: True
+        resultado = [
+            p for p in self.peliculas
+            if coincide(p) and desde <= p["release_date"] <= hasta and p["vote_count"] >= votos_minimos
+        ]
+        resultado.sort(key=lambda p: p["vote_average"], reverse=not ascendente)
+        return resultado
+
+    def discover(self, parametros):
+        """Responde una página de /discover/movie para los parámetros de la consulta."""
+        filtradas = self._filtrar(
+            parametros.get("with_genres", ""),
+            parametros.get("primary_release_date.gte", "0000-00-00"),
+            parametros.get("primary_release_date.lte", "9999-99-99"),
+            int(parametros.get("vote_count.gte", 0)),
+            parametros.get("sort_by", "").endswith(".asc"),
+        )
+        pagina = int(parametros.get("page", 1))
+        total_paginas = min(max(1, -(-len(filtradas) // self.por_pagina)), MAX_PAGINAS_TMDB)
+        inicio = (pagina - 1) * self.por_pagina
+        return {
+            "page": pagina,
+            "results": filtradas[inicio:inicio + self.por_pagina] if pagina <= total_paginas else [],
+            "total_pages": total_paginas,
+            "total_results": len(filtradas),
+        }
+
+    def _ruta_detalle(self, ruta, parametros):
+        base, _, id_pelicula = ruta.rpartition("/")
+        if not base.endswith("/movie") or not id_pelicula.isdigit():
+            return None
+        return self.detalle(int(id_pelicula), parametros)
+
+    def detalle(self, id_pelicula, parametros):
+        """Responde /movie/{id}, o None si no existe esa película."""
+        pelicula = self._por_id.get(id_pelicula)
+        if pelicula is None:
+            return None
+        return generar_detalle(pelicula, parametros.get("append_to_response", "").split(","))
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.peticiones += 1
+                    limitar = servidor._azar.random() < servidor.prob_429
+                    if limitar:
+                        servidor.respuestas_429 += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                ruta = urllib.parse.urlparse(self.path)
+                parametros = dict(urllib.parse.parse_qsl(ruta.query))
+                if limitar:
+                    self._responder(429, {"status_code": 25, "status_message": "Límite de peticiones superado."},
+                                    {"Retry-After": str(servidor.retry_after)})
+                elif ruta.path.endswith("/genre/movie/list"):
+                    self._responder(200, {"genres": GENEROS_TMDB})
+                elif ruta.path.endswith("/discover/movie"):
+                    self._responder(200, servidor.discover(parametros))
+                elif (detalle := servidor._ruta_detalle(ruta.path, parametros)) is not None:
+                    self._responder(200, detalle)
+                else:
+                    self._responder(404, {"status_code": 34, "status_message": "Recurso no encontrado."})
+
+            def _responder(self, codigo, cuerpo, cabeceras=None):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                for nombre, valor in (cabeceras or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, formato, *args):
+                pass
+
+        return Manejador
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo de fondo y devuelve su URL base."""
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self.url
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de TMDb con datos sintéticos.")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--peliculas", type=int, default=10_000, help="tamaño del catálogo sintético")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos añadidos a cada respuesta")
+    parser.add_argument("--prob-429", type=float, default=0.0, help="probabilidad de responder 429")
+    args = parser.parse_args()
+
+    servidor = ServidorTMDbLocal(n_peliculas=args.peliculas, latencia=args.latencia, prob_429=args.prob_429,
+                                 puerto=args.puerto)
+    print(f"Sirviendo {len(servidor.peliculas)} películas en {servidor.iniciar()} (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.detener()
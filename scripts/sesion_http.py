@@ -0,0 +1,144 @@
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentacion
+
+# Códigos de estado que vale la pena reintentar (límite de peticiones y errores del servidor)
+CODIGOS_REINTENTO = {429, 500, 502, 503, 504}
+
+
+class LimitadorTasa:
+    """Token bucket: permite ráfagas de hasta `capacidad` peticiones y repone `tasa` por segundo."""
+
+    def __init__(self, tasa=4.0, capacidad=40):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                faltante = (1 - self.tokens) / self.tasa
+            time.sleep(faltante)
+
+
+class SesionHTTP:
+    """Sesión HTTP persistente (keep-alive) con pool de conexiones, timeouts y reintentos."""
+
+    def __init__(self, pool=10, timeout=(3.05, 10), reintentos=3, espera_base=0.5, espera_maxima=30.0,
+                 limitador=None):
+        self.timeout = timeout
+        self.limitador = limitador
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+        self._lock = threading.Lock()
+        self.latencias = []
+        self.reintentos_hechos = 0
+        self.errores = 0
+
+    def _espera(self, intento, retry_after=None):
+        """Calcula cuánto esperar antes del siguiente intento (Retry-After o backoff exponencial)."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.espera_maxima)
+            except ValueError:
+                try:
+                    fecha = parsedate_to_datetime(retry_after)
+                    segundos = (fecha - datetime.now(timezone.utc)).total_seconds()
+                    return min(max(segundos, 0.0), self.espera_maxima)
+                except (TypeError, ValueError):
+                    pass
+        espera = self.espera_base * (2 ** intento)
+        return min(espera + random.uniform(0, self.espera_base), self.espera_maxima)
+
+    def _registrar(self, inicio):
+        with self._lock:
+            self.latencias.append(time.perf_counter() - inicio)
+
+    def get(self, url, params=None):
+        """Hace un GET reutilizando conexiones y reintentando ante 429/5xx o fallos de red."""
+        for intento in range(self.reintentos + 1):
+            if self.limitador is not None:
+                self.limitador.adquirir()
+            inicio = time.perf_counter()
+            try:
+                respuesta = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._registrar(inicio)
+                with self._lock:
+                    self.errores += 1
+                if intento == self.reintentos:
+                    raise
+                with self._lock:
+                    self.reintentos_hechos += 1
+                time.sleep(self._espera(intento))
+                continue
+
+            self._registrar(inicio)
+            instrumentacion.contar_peticion(len(respuesta.content))
+            if respuesta.status_code in CODIGOS_REINTENTO and intento < self.reintentos:
+                with self._lock:
+                    self.reintentos_hechos += 1
+                time.sleep(self._espera(intento, respuesta.headers.get("Retry-After")))
+                continue
+
+            respuesta.raise_for_status()
+            return respuesta
+
+    def resumen(self):
+        """Devuelve los contadores de latencia de las peticiones hechas hasta ahora."""
+        with self._lock:
+            latencias = list(self.latencias)
+            reintentos, errores = self.reintentos_hechos, self.errores
+
+        if not latencias:
+            return {"peticiones": 0, "reintentos": reintentos, "errores": errores}
+
+        ordenadas = sorted(latencias)
+        resto = latencias[1:]
+        return {
+            "peticiones": len(latencias),
+            "reintentos": reintentos,
+            "errores": errores,
+            "tiempo_total": sum(latencias),
+            # La primera petición paga el handshake TCP+TLS; las demás reutilizan la conexión
+            "primera": latencias[0],
+            "media_resto": sum(resto) / len(resto) if resto else None,
+            "p50": ordenadas[len(ordenadas) // 2],
+            "maxima": ordenadas[-1],
+        }
+
+    def imprimir_resumen(self):
+        """Muestra en consola un resumen corto de la latencia de red."""
+        r = self.resumen()
+        if not r["peticiones"]:
+            return
+        linea = f"\nRed: {r['peticiones']} peticiones en {r['tiempo_total']:.2f}s, primera {r['primera'] * 1000:.0f} ms"
+        if r["media_resto"] is not None:
+            linea += f", resto {r['media_resto'] * 1000:.0f} ms de media"
+        print(linea + f" ({r['reintentos']} reintentos)")
+
+    def cerrar(self):
+        self.session.close()
@@ -0,0 +1,117 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+RE_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _texto(serie):
+    """Columna como texto sin espacios a los lados; lo que no es texto queda como NaN."""
+    if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+        return serie.str.strip()
+    return pd.Series(np.nan, index=serie.index, dtype=object)
+
+
+def validar_columnas(df, titulo="title", fecha="release_date", puntaje="vote_average",
+                     patron_titulo=None, puntaje_min=None, puntaje_max=None, conservar=()):
+    """Valida en bloque las columnas de título, fecha y puntuación de un DataFrame.
+
+    Todo se hace por columnas (coincidencia de texto vectorizada, conversión de fechas y
+    máscaras de rango), sin recorrer fila por fila. Devuelve `(limpio, rechazados)`:
+    `limpio` trae el título sin espacios, la fecha ya convertida a datetime y la puntuación
+    como float (los textos numéricos como "7.5" se convierten, a diferencia de la versión
+    fila por fila); `rechazados` conserva las filas originales con una columna `motivo`.
+    Las columnas de `conservar` (por ejemplo, los géneros) pasan tal cual a `limpio`.
+    """
+    titulos = _texto(df[titulo])
+    ok_titulo = titulos.str.len().fillna(0).gt(0).to_numpy()
+    if patron_titulo is not None:
+        ok_titulo = ok_titulo & titulos.str.match(patron_titulo, na=False).to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(df[fecha]):
+        # Ya viene convertida (por ejemplo, de un archivo columnar): sólo se descartan las NaT
+        fechas = df[fecha]
+        ok_fecha = fechas.notna().to_numpy()
+    else:
+        # El formato exacto más el largo de 10 caracteres equivalen a RE_FECHA, sin regex por fila;
+        # además descarta fechas imposibles como 2001-13-45
+        fechas_texto = _texto(df[fecha])
+        fechas = pd.to_datetime(fechas_texto, format="%Y-%m-%d", errors="coerce")
+        ok_fecha = (fechas.notna() & fechas_texto.str.len().eq(10)).to_numpy()
+
+    # Como el bucle anterior (isinstance(x, (int, float))), los booleanos cuentan como 1 y 0.
+    # Una columna mixta se convierte entera con to_numeric, sin revisar fila por fila: lo que
+    # no es número queda NaN y se rechaza, pero un texto numérico como "7.5" sí se acepta
+    puntajes = pd.to_numeric(df[puntaje], errors="coerce").astype(float)
+    ok_puntaje = puntajes.notna().to_numpy()
+    if puntaje_min is not None:
+        ok_puntaje = ok_puntaje & (puntajes >= puntaje_min).to_numpy()
+    if puntaje_max is not None:
+        ok_puntaje = ok_puntaje & (puntajes <= puntaje_max).to_numpy()
+
+    validas = ok_titulo & ok_fecha & ok_puntaje
+    limpio = pd.DataFrame({
+        titulo: titulos[validas],
+        fecha: fechas[validas],
+        puntaje: puntajes[validas],
+        **{nombre: df[nombre][validas] for nombre in conservar},
+    })
+
+    rechazados = df[~validas].copy()
+    motivo = pd.Series("", index=rechazados.index, dtype=object)
+    for nombre, ok in (("título inválido", ok_titulo), ("fecha inválida", ok_fecha), ("puntuación inválida", ok_puntaje)):
+        falla = ~ok[~validas]
+        motivo[falla] = motivo[falla] + nombre + ", "
+    rechazados["motivo"] = motivo.str.rstrip(", ")
+    return limpio.reset_index(drop=True), rechazados
+
+
+def _validar_fila_por_fila(registros, patron_titulo=None):
+    """Versión anterior (bucle con regex por registro), sólo para comparar en el benchmark."""
+    validas = []
+    for peli in registros:
+        titulo = peli.get("title", "").strip()
+        fecha = peli.get("release_date", "").strip()
+        puntuacion = peli.get("vote_average", None)
+        if (RE_FECHA.match(fecha) and (patron_titulo is None or patron_titulo.match(titulo))
+                and isinstance(puntuacion, (int, float))):
+            validas.append({"title": titulo, "release_date": fecha, "vote_average": float(puntuacion)})
+    df = pd.DataFrame(validas)
+    df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
+    return df.dropna(subset=["release_date"])
+
+
+def benchmark(n=1_000_000, semilla=0):
+    """Compara el bucle fila por fila contra la validación por columnas con `n` registros sintéticos."""
+    rng = np.random.default_rng(semilla)
+    anios = rng.integers(1950, 2025, n)
+    meses = rng.integers(1, 13, n)
+    dias = rng.integers(1, 29, n)
+    registros = [
+        {"title": f"Pelicula {i}", "release_date": f"{a}-{m:02d}-{d:02d}", "vote_average": float(v)}
+        for i, (a, m, d, v) in enumerate(zip(anios, meses, dias, rng.uniform(0, 10, n).round(3)))
+    ]
+    # Un 1% de registros rotos para que también haya rechazos
+    for i in rng.choice(n, n // 100, replace=False):
+        registros[i]["release_date"] = "sin fecha"
+    patron = re.compile(r"^[A-Za-z0-9\s]+$")
+
+    inicio = time.perf_counter()
+    por_filas = _validar_fila_por_fila(registros, patron)
+    t_filas = time.perf_counter() - inicio
+
+    crudo = pd.DataFrame.from_records(registros, columns=["title", "release_date", "vote_average"])
+    inicio = time.perf_counter()
+    limpio, rechazados = validar_columnas(crudo, patron_titulo=patron)
+    t_columnas = time.perf_counter() - inicio
+
+    assert len(limpio) == len(por_filas)
+    print(f"{n} registros: fila por fila {t_filas:.2f}s, por columnas {t_columnas:.2f}s "
+          f"({t_filas / t_columnas:.1f}x), {len(rechazados)} rechazados")
+    return {"registros": n, "fila_por_fila": t_filas, "por_columnas": t_columnas}
+
+
+if __name__ == "__main__":
+    benchmark()